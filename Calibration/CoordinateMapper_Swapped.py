@@ -1,5 +1,5 @@
 import numpy as np
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 class CoordinateMapper:
     def __init__(self, swap_axes: bool = False):
@@ -25,8 +25,23 @@ class CoordinateMapper:
             'y_max': 2732
         }
 
+        # Camera pixel positions of the iPad bounds corners (TL, TR, BR, BL),
+        # if the camera has been calibrated
+        self.camera_corners = None
+
+        # Optional least-squares iPad → plotter homography; replaces the
+        # bounds mapping when set (see fit_homography)
+        self.homography: Optional[np.ndarray] = None
+        self.homography_residuals: Optional[Dict] = None
+
         self.calibrated = False
         self.swap_axes = swap_axes
+        self._warned_uncalibrated = False
+
+        # Cached 3x3 iPad → plotter matrix, rebuilt when bounds or swap change
+        self._matrix_key = None
+        self._matrix = None
+        self._inverse = None
         
         if swap_axes:
             print("⚠ Axis swap mode ENABLED")
@@ -62,8 +77,11 @@ class CoordinateMapper:
         - Normal mode: iPad X→Plotter X, iPad Y→Plotter Y
         - Swapped mode: iPad X→Plotter Y, iPad Y→Plotter X
         """
-        if not self.calibrated:
-            print("Warning: CoordinateMapper not calibrated yet.")
+        self._warn_if_uncalibrated()
+        
+        if self.homography is not None:
+            plotter_x, plotter_y = apply_transform(self.transform_matrix(), (ipad_x, ipad_y))[0]
+            return float(plotter_x), float(plotter_y)
         
         # Normalize iPad coords to 0-1 range
         norm_x = (ipad_x - self.ipad_bounds['x_min']) / \
@@ -92,6 +110,10 @@ class CoordinateMapper:
         Convert plotter mm coordinates to iPad pixel coordinates
         Handles axis swapping if enabled
         """
+        if self.homography is not None:
+            ipad_x, ipad_y = self.plotter_to_ipad_batch((plotter_x, plotter_y))[0]
+            return int(ipad_x), int(ipad_y)
+        
         if self.swap_axes:
             # SWAPPED: Plotter X maps to iPad Y, Plotter Y maps to iPad X
             norm_x = (plotter_y - self.plotter_bounds['y_min']) / \
@@ -113,6 +135,102 @@ class CoordinateMapper:
         
         return ipad_x, ipad_y
     
+    def fit_homography(self, ipad_points: np.ndarray, plotter_points: np.ndarray) -> Dict:
+        """
+        Fit the iPad → plotter mapping to N measured point pairs
+        
+        A homography models rotation, skew and perspective as well as the
+        per-axis scale/swap/inversion of the bounds mapping. Once fitted it
+        is used by every transform method.
+        
+        Args:
+            ipad_points: (N, 2) iPad pixel positions, N >= 4
+            plotter_points: (N, 2) plotter mm positions of the same points
+        
+        Returns:
+            Residual report: points, rms_error_mm, max_error_mm, errors_mm
+        """
+        H, errors = fit_homography(ipad_points, plotter_points)
+        self.homography = H
+        self.homography_residuals = {
+            'points': len(errors),
+            'rms_error_mm': float(np.sqrt(np.mean(errors ** 2))),
+            'max_error_mm': float(errors.max()),
+            'errors_mm': errors.tolist()
+        }
+        self.calibrated = True
+        return self.homography_residuals
+    
+    def _warn_if_uncalibrated(self):
+        if not self.calibrated and not self._warned_uncalibrated:
+            print("Warning: CoordinateMapper not calibrated yet.")
+            self._warned_uncalibrated = True
+    
+    def transform_matrix(self) -> np.ndarray:
+        """
+        3x3 matrix mapping homogeneous iPad pixels to plotter mm
+        
+        Folds normalization, axis swap and inversion (bounds stored
+        max < min) into one affine matrix, or returns the fitted homography
+        if there is one. Cached until the bounds, swap_axes or homography
+        change.
+        """
+        if self.homography is not None:
+            key = ('homography', np.asarray(self.homography, dtype=np.float64).tobytes())
+            if key != self._matrix_key:
+                self._matrix = np.asarray(self.homography, dtype=np.float64)
+                self._inverse = np.linalg.inv(self._matrix)
+                self._matrix_key = key
+            return self._matrix
+        
+        key = (tuple(self.ipad_bounds[k] for k in ('x_min', 'x_max', 'y_min', 'y_max')),
+               tuple(self.plotter_bounds[k] for k in ('x_min', 'x_max', 'y_min', 'y_max')),
+               self.swap_axes)
+        if key != self._matrix_key:
+            (ix_min, ix_max, iy_min, iy_max), (px_min, px_max, py_min, py_max), swap = key
+            
+            # iPad pixels → normalized 0-1
+            normalize = np.array([[1 / (ix_max - ix_min), 0, -ix_min / (ix_max - ix_min)],
+                                  [0, 1 / (iy_max - iy_min), -iy_min / (iy_max - iy_min)],
+                                  [0, 0, 1]])
+            # Swapped: normalized iPad X drives plotter Y and vice versa
+            permute = np.array([[0, 1, 0], [1, 0, 0], [0, 0, 1]]) if swap else np.eye(3)
+            # Normalized → plotter mm
+            scale = np.array([[px_max - px_min, 0, px_min],
+                              [0, py_max - py_min, py_min],
+                              [0, 0, 1]])
+            
+            self._matrix = scale @ permute @ normalize
+            self._inverse = np.linalg.inv(self._matrix)
+            self._matrix_key = key
+        return self._matrix
+    
+    def ipad_to_plotter_batch(self, points: np.ndarray) -> np.ndarray:
+        """
+        Convert many iPad pixel coordinates to plotter mm at once
+        
+        Args:
+            points: (N, 2) array of iPad (x, y)
+        
+        Returns:
+            (N, 2) float array of plotter (x, y)
+        """
+        self._warn_if_uncalibrated()
+        return apply_transform(self.transform_matrix(), points)
+    
+    def plotter_to_ipad_batch(self, points: np.ndarray) -> np.ndarray:
+        """
+        Convert many plotter mm coordinates to iPad pixels at once
+        
+        Args:
+            points: (N, 2) array of plotter (x, y)
+        
+        Returns:
+            (N, 2) float array of iPad (x, y) (not rounded, unlike plotter_to_ipad)
+        """
+        self.transform_matrix()
+        return apply_transform(self._inverse, points)
+    
     def test_mapping(self):
         """Test corner mappings"""
         print("\n=== Testing Coordinate Mapping ===")
@@ -134,3 +252,72 @@ class CoordinateMapper:
         for name, ix, iy in test_points:
             px, py = self.ipad_to_plotter(ix, iy)
             print(f"{name:12s}: iPad({ix:4d}, {iy:4d}) -> Plotter({px:6.2f}, {py:6.2f})")
+
+
+
+def apply_transform(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Apply a 3x3 affine or projective matrix to an (N, 2) array of points"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    mapped = points @ matrix[:2, :2].T + matrix[:2, 2]
+    w = points @ matrix[2, :2] + matrix[2, 2]
+    if not np.all(w == 1.0):
+        mapped /= w[:, None]
+    return mapped
+
+
+def _normalizing_transform(points: np.ndarray) -> np.ndarray:
+    """Similarity moving the centroid to 0 and the mean distance to sqrt(2)"""
+    centroid = points.mean(axis=0)
+    mean_dist = np.linalg.norm(points - centroid, axis=1).mean()
+    scale = np.sqrt(2) / mean_dist if mean_dist > 0 else 1.0
+    return np.array([[scale, 0, -scale * centroid[0]],
+                     [0, scale, -scale * centroid[1]],
+                     [0, 0, 1]])
+
+
+def fit_homography(src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares homography from src to dst (normalized DLT)
+    
+    Args:
+        src: (N, 2) source points, N >= 4, not all collinear
+        dst: (N, 2) corresponding destination points
+    
+    Returns:
+        (3x3 matrix, per-point residual distances in dst units). With
+        exactly 4 points the fit is exact and residuals are ~0; use more
+        points for a meaningful error estimate.
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(-1, 2)
+    if len(src) != len(dst):
+        raise ValueError("src and dst must have the same number of points")
+    if len(src) < 4:
+        raise ValueError("At least 4 point pairs are needed for a homography")
+    
+    # Normalizing both point sets keeps the system well conditioned when
+    # pixel and mm magnitudes differ by orders of magnitude
+    t_src = _normalizing_transform(src)
+    t_dst = _normalizing_transform(dst)
+    s = apply_transform(t_src, src)
+    d = apply_transform(t_dst, dst)
+    
+    n = len(s)
+    A = np.zeros((2 * n, 9))
+    A[0::2, 0:2] = -s
+    A[0::2, 2] = -1
+    A[0::2, 6:8] = s * d[:, :1]
+    A[0::2, 8] = d[:, 0]
+    A[1::2, 3:5] = -s
+    A[1::2, 5] = -1
+    A[1::2, 6:8] = s * d[:, 1:]
+    A[1::2, 8] = d[:, 1]
+    
+    _, singular_values, vt = np.linalg.svd(A)
+    if singular_values[7] < 1e-10 * singular_values[0]:
+        raise ValueError("Degenerate calibration points (collinear or repeated)")
+    H = np.linalg.inv(t_dst) @ vt[-1].reshape(3, 3) @ t_src
+    H /= H[2, 2]
+    
+    errors = np.linalg.norm(apply_transform(H, src) - dst, axis=1)
+    return H, errors
@@ -1,4 +1,5 @@
 import json
+import numpy as np
 from Calibration.CoordinateMapper_Swapped import CoordinateMapper
 
 def load_calibration(filename='calibration.json'):
@@ -17,6 +18,11 @@ def load_calibration(filename='calibration.json'):
         mapper = CoordinateMapper(swap_axes=axes_swapped)
         mapper.plotter_bounds = data['plotter_bounds']
         mapper.ipad_bounds = data['ipad_bounds']
+        mapper.camera_corners = data.get('camera_corners')
+        if 'homography' in data:
+            mapper.homography = np.array(data['homography']['matrix'], dtype=np.float64)
+            mapper.homography_residuals = {k: v for k, v in data['homography'].items()
+                                           if k not in ('matrix', 'point_pairs')}
         mapper.calibrated = True
         
         print(f"✓ Loaded calibration from {filename}")
@@ -28,6 +34,12 @@ def load_calibration(filename='calibration.json'):
             print("  ⚠ X-axis inversion noted in calibration")
         if 'y_inverted' in data and data['y_inverted']:
             print("  ⚠ Y-axis inversion noted in calibration")
+        if mapper.homography is not None:
+            residuals = mapper.homography_residuals
+            print(f"  ✓ Homography mapping ({residuals.get('points')} points, "
+                  f"RMS error {residuals.get('rms_error_mm', 0):.2f} mm)")
+        if mapper.camera_corners is not None:
+            print("  ✓ Camera game area corners present")
         
         return mapper
     except FileNotFoundError:
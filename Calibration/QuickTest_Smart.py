@@ -1,4 +1,3 @@
-import time
 from Calibration.LoadCalibration_Smart import load_calibration
 from Calibration.SmartPlotterCalibration import PenPlotter
 
@@ -53,9 +52,7 @@ def quick_test():
     # Ask to tap
     tap = input("\n👆 Execute tap at this position? (y/n): ").lower()
     if tap == 'y':
-        plotter.pen_down()
-        time.sleep(0.2)
-        plotter.pen_up()
+        plotter.tap()
         print("✓ Tap complete!")
     else:
         print("Tap skipped")
@@ -1,4 +1,5 @@
 import time
+import numpy as np
 from Calibration.plotter_controller import PenPlotter
 from Calibration.CoordinateMapper_Swapped import CoordinateMapper
 
@@ -11,6 +12,7 @@ class SmartPlotterCalibrator:
         self.axes_swapped = False
         self.x_inverted = False
         self.y_inverted = False
+        self.calibration_points = []  # (ipad_x, ipad_y, plotter_x, plotter_y)
     
     def test_axis_directions(self):
         """
@@ -239,9 +241,7 @@ class SmartPlotterCalibrator:
             self.plotter.move_to(x, y)
             input("    Press Enter to mark this corner...")
             
-            self.plotter.pen_down()
-            time.sleep(0.3)
-            self.plotter.pen_up()
+            self.plotter.tap(hold=0.3)
             
             print(f"    ✓ Marked {name} corner")
         
@@ -294,6 +294,62 @@ class SmartPlotterCalibrator:
             print("❌ Invalid input! Please enter numbers only.")
             return False
     
+    def fit_homography_points(self, grid: int = 3, inset: float = 0.1):
+        """
+        Refine the mapping with a least-squares homography over a grid of marks
+        
+        The plotter marks grid x grid dots; the operator measures each one on
+        a screenshot. Unlike the bounds mapping this captures rotation and
+        skew of the iPad under the plotter.
+        
+        Args:
+            grid: Points per side (grid**2 points, at least 4 in total)
+            inset: Fraction of the plotter bounds left free at each edge
+        """
+        print("\n" + "="*60)
+        print(f"HOMOGRAPHY REFINEMENT ({grid}x{grid} POINTS)")
+        print("="*60)
+        
+        pb = self.mapper.plotter_bounds
+        x_margin = (pb['x_max'] - pb['x_min']) * inset
+        y_margin = (pb['y_max'] - pb['y_min']) * inset
+        xs = np.linspace(pb['x_min'] + x_margin, pb['x_max'] - x_margin, grid)
+        ys = np.linspace(pb['y_min'] + y_margin, pb['y_max'] - y_margin, grid)
+        plotter_points = [(float(x), float(y)) for y in ys for x in xs]
+        
+        self.plotter.pen_up()
+        for i, (x, y) in enumerate(plotter_points, 1):
+            print(f"  Marking point {i}/{len(plotter_points)} at X={x:.1f}, Y={y:.1f}")
+            self.plotter.tap(x, y, hold=0.3)
+        
+        print("\n📸 Take a screenshot and enter the pixel position of each dot")
+        print("   (numbered in the order they were marked)\n")
+        points = []
+        try:
+            for i, (x, y) in enumerate(plotter_points, 1):
+                ipad_x = float(input(f"  Point {i} iPad X (pixels): "))
+                ipad_y = float(input(f"  Point {i} iPad Y (pixels): "))
+                points.append((ipad_x, ipad_y, x, y))
+        except ValueError:
+            print("❌ Invalid input! Please enter numbers only.")
+            return False
+        
+        pairs = np.array(points)
+        try:
+            residuals = self.mapper.fit_homography(pairs[:, :2], pairs[:, 2:])
+        except ValueError as e:
+            print(f"❌ Homography fit failed: {e}")
+            return False
+        
+        self.calibration_points = points
+        print(f"\n📐 Fit over {residuals['points']} points:")
+        print(f"   RMS error: {residuals['rms_error_mm']:.2f} mm")
+        print(f"   Max error: {residuals['max_error_mm']:.2f} mm")
+        for (ix, iy, px, py), err in zip(points, residuals['errors_mm']):
+            flag = "  ⚠" if err > 3 * max(residuals['rms_error_mm'], 0.1) else ""
+            print(f"   iPad({ix:6.0f}, {iy:6.0f}) → Plotter({px:6.1f}, {py:6.1f}): {err:.2f} mm{flag}")
+        return True
+    
     def test_calibration(self):
         """Test the calibration by moving to test points"""
         print("\n" + "="*60)
@@ -330,9 +386,7 @@ class SmartPlotterCalibrator:
             
             mark = input("  Mark this position? (y/n): ").lower()
             if mark == 'y':
-                self.plotter.pen_down()
-                time.sleep(0.2)
-                self.plotter.pen_up()
+                self.plotter.tap()
     
     def run_full_calibration(self):
         """Run the complete smart calibration process"""
@@ -362,6 +416,11 @@ class SmartPlotterCalibrator:
         if not self.set_ipad_coordinates():
             return False
         
+        # Optional: multi-point homography refinement
+        refine = input("\nRefine with multi-point homography (corrects rotation/skew)? (y/n): ").lower()
+        if refine == 'y':
+            self.fit_homography_points()
+        
         # Step 5: Test mapping
         self.mapper.test_mapping()
         
@@ -0,0 +1,179 @@
+"""
+asyncio driver for the GRBL pen plotter
+
+Every command returns an awaitable that resolves when GRBL acknowledges it
+(or, with wait_motion=True, when the plotter is idle again), so the caller
+can keep working - e.g. analyze the next camera frame - while the arm moves:
+
+    plotter = AsyncPenPlotter(PenPlotter('COM3'))
+    move = plotter.move_to(40, 60, wait_motion=True)
+    cards = detector.detect_cards(frame)   # runs while the arm travels
+    await move
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from Calibration.plotter_controller import PenPlotter
+
+
+class AsyncPenPlotter:
+    def __init__(self, plotter: PenPlotter, poll_interval: float = 0.02,
+                 idle_timeout: float = 30.0):
+        """
+        Wrap a connected PenPlotter (switches it to streaming mode)
+
+        Args:
+            plotter: Connected PenPlotter
+            poll_interval: Seconds between '?' status polls while waiting
+                           for motion to complete
+            idle_timeout: Default seconds wait_until_idle() waits before
+                          giving up (e.g. while GRBL is in Hold)
+        """
+        self.plotter = plotter
+        self.streamer = plotter.start_streaming()
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+
+        # One thread hands lines to the streamer so commands keep their
+        # order, and a full RX buffer never blocks the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="GrblSend")
+
+    def send(self, command: str, wait_motion: bool = False) -> asyncio.Future:
+        """
+        Queue a G-code command
+
+        Must be called from a running event loop. Commands are sent in the
+        order this method is called, whether or not the results are awaited.
+        A failure is also logged, so it isn't lost if the future is dropped.
+
+        Args:
+            command: G-code line
+            wait_motion: Resolve only once the plotter reports Idle
+
+        Returns:
+            Future resolving to GRBL's response ('ok' or 'error:N')
+        """
+        loop = asyncio.get_running_loop()
+        timeout = self.plotter.command_timeout
+        queued = loop.run_in_executor(self._executor, self.streamer.send, command, timeout)
+        future = asyncio.ensure_future(self._complete(command, queued, wait_motion))
+        future.add_done_callback(_log_failure)
+        return future
+
+    async def _complete(self, command: str, queued: asyncio.Future, wait_motion: bool) -> str:
+        timeout = self.plotter.command_timeout
+        try:
+            ack = await asyncio.wait_for(asyncio.wrap_future(await queued), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No response from GRBL to {command!r} within {timeout}s") from None
+        if wait_motion:
+            await self.wait_until_idle()
+        return ack
+
+    async def wait_until_idle(self, timeout: Optional[float] = None):
+        """
+        Poll the real-time status report until every command has run
+
+        Args:
+            timeout: Seconds to wait (default idle_timeout)
+
+        Raises:
+            RuntimeError: GRBL is in Alarm state (it won't move until unlocked)
+            TimeoutError: The plotter did not go idle in time
+        """
+        timeout = self.idle_timeout if timeout is None else timeout
+        status = None
+
+        async def poll():
+            nonlocal status
+            while True:
+                if self.streamer.pending == 0:
+                    status = await asyncio.to_thread(self.streamer.query_status)
+                    if status is not None:
+                        if status.startswith('<Idle'):
+                            return
+                        if status.startswith('<Alarm'):
+                            raise RuntimeError(f"GRBL is in Alarm state: {status}")
+                await asyncio.sleep(self.poll_interval)
+
+        try:
+            await asyncio.wait_for(poll(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Plotter not idle after {timeout}s "
+                               f"(last status {status})") from None
+
+    def home(self, wait_motion: bool = True) -> asyncio.Future:
+        """Home the plotter (requires limit switches)"""
+        print("Homing...")
+        return self.send("$H", wait_motion)
+
+    def move_to(self, x: float, y: float, feed_rate: int = 1000,
+                wait_motion: bool = False) -> asyncio.Future:
+        """Move to absolute position (pen up)"""
+        print(f"Moving to X{x} Y{y}")
+        return self.send(f"G0 X{x} Y{y} F{feed_rate}", wait_motion)
+
+    def draw_to(self, x: float, y: float, feed_rate: int = 500,
+                wait_motion: bool = False) -> asyncio.Future:
+        """Draw line to position (pen down)"""
+        print(f"Drawing to X{x} Y{y}")
+        return self.send(f"G1 X{x} Y{y} F{feed_rate}", wait_motion)
+
+    def _send_all(self, commands, wait_motion: bool) -> asyncio.Future:
+        """Queue several commands; the returned future covers them all"""
+        futures = [self.send(command) for command in commands[:-1]]
+        futures.append(self.send(commands[-1], wait_motion))
+        combined = asyncio.ensure_future(_last_result(futures))
+        combined.add_done_callback(_retrieve)  # Failures are logged per command
+        return combined
+
+    def pen_up(self, wait_motion: bool = False) -> asyncio.Future:
+        """Raise the pen; the servo settle time runs as a dwell on the plotter"""
+        print("Pen up")
+        return self._send_all(self.plotter.pen_commands(self.plotter.settle_model.up_value),
+                              wait_motion)
+
+    def pen_down(self, wait_motion: bool = False) -> asyncio.Future:
+        """Lower the pen; the servo settle time runs as a dwell on the plotter"""
+        print("Pen down")
+        return self._send_all(self.plotter.pen_commands(self.plotter.settle_model.down_value),
+                              wait_motion)
+
+    def tap(self, x: float, y: float, hold: float = 0.0, feed_rate: int = 1000,
+            wait_motion: bool = False) -> asyncio.Future:
+        """Move to (x, y) and tap; resolves when the pen is back up"""
+        model = self.plotter.settle_model
+        commands = [f"G0 X{x} Y{y} F{feed_rate}"]
+        commands += self.plotter.pen_commands(model.down_value)
+        if hold > 0:
+            commands.append(f"G4 P{hold:.3f}")
+        commands += self.plotter.pen_commands(model.up_value)
+        print(f"Tap at X{x} Y{y}")
+        return self._send_all(commands, wait_motion)
+
+    async def close(self):
+        """Wait for outstanding commands and leave streaming mode"""
+        try:
+            await self.wait_until_idle()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.plotter.stop_streaming()
+
+
+async def _last_result(futures) -> str:
+    """Wait for every future; raises the first failure, else returns the last result"""
+    results = await asyncio.gather(*futures)
+    return results[-1]
+
+
+def _retrieve(future: asyncio.Future):
+    """Done-callback: mark an exception as retrieved without reporting it"""
+    if not future.cancelled():
+        future.exception()
+
+
+def _log_failure(future: asyncio.Future):
+    """Done-callback: report (and so retrieve) a command's exception"""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"❌ Plotter command failed: {future.exception()}")
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Automatic Camera-Based Calibration
+The plotter taps a grid of points while the camera watches; the pen tip is
+located in each frame and the plotter ↔ camera ↔ iPad transforms are solved
+without any prompts or screenshot measurements
+
+Usage (from the repository root):
+    python -m Calibration.auto_calibration --park X Y [--port COM3] [--camera 0]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from CardDetection.card_detector import CardDetector
+from Calibration.CoordinateMapper_Swapped import CoordinateMapper, apply_transform, fit_homography
+from Calibration.plotter_controller import PenPlotter
+
+
+def find_screen_quad(frame: np.ndarray, min_area_fraction: float = 0.05) -> Optional[np.ndarray]:
+    """
+    Find the lit iPad screen in a camera frame
+
+    The screen is taken to be the largest bright convex quadrilateral.
+
+    Returns:
+        (4, 2) camera corners in order top-left, top-right, bottom-right,
+        bottom-left (portrait iPad coordinates), or None if not found
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((15, 15), np.uint8))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    contour = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(contour) < min_area_fraction * gray.shape[0] * gray.shape[1]:
+        return None
+
+    hull = cv2.convexHull(contour)
+    quad = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+    if len(quad) != 4:
+        return None
+    return order_corners(quad.reshape(4, 2).astype(np.float64))
+
+
+def order_corners(corners: np.ndarray) -> np.ndarray:
+    """Order four points top-left, top-right, bottom-right, bottom-left"""
+    sums = corners.sum(axis=1)
+    diffs = corners[:, 1] - corners[:, 0]
+    return np.array([corners[np.argmin(sums)], corners[np.argmin(diffs)],
+                     corners[np.argmax(sums)], corners[np.argmax(diffs)]])
+
+
+def locate_pen(frame_up: np.ndarray, frame_down: np.ndarray, diff_threshold: int = 30,
+               min_blob_area: int = 30) -> Optional[Tuple[float, float]]:
+    """
+    Camera position of the pen tip from a pen-up / pen-down frame pair
+
+    Only the pen moves between the two frames, so the largest changed
+    region is the tip.
+
+    Returns:
+        (x, y) centroid of the changed region, or None if nothing changed
+    """
+    up = cv2.cvtColor(frame_up, cv2.COLOR_BGR2GRAY) if frame_up.ndim == 3 else frame_up
+    down = cv2.cvtColor(frame_down, cv2.COLOR_BGR2GRAY) if frame_down.ndim == 3 else frame_down
+    diff = cv2.GaussianBlur(cv2.absdiff(up, down), (5, 5), 0)
+    _, mask = cv2.threshold(diff, diff_threshold, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(mask)
+    if count < 2:
+        return None
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    if stats[largest, cv2.CC_STAT_AREA] < min_blob_area:
+        return None
+    return float(centroids[largest, 0]), float(centroids[largest, 1])
+
+
+class AutoCalibrator:
+    """Solves the plotter ↔ camera ↔ iPad transforms from observed taps"""
+
+    def __init__(self, plotter: PenPlotter, detector: CardDetector,
+                 plotter_bounds: Dict[str, float], park_position: Tuple[float, float],
+                 screen_size: Optional[Tuple[int, int]] = None,
+                 reference: Optional[CoordinateMapper] = None, max_mismatch: float = 0.05):
+        """
+        Initialize auto calibrator
+
+        Args:
+            plotter: Connected plotter
+            detector: Detector whose camera sees the whole iPad
+            plotter_bounds: Plotter area (mm) covering the iPad, as in
+                            CoordinateMapper.plotter_bounds
+            park_position: Plotter position (mm) outside plotter_bounds that
+                           keeps the arm out of the camera's view of the screen
+            screen_size: iPad screen size (portrait width, height) in the
+                         pixel space of the calibration's ipad_bounds. Derived
+                         from reference when None
+            reference: Existing bounds mapping (ipad_bounds ↔ plotter_bounds)
+                       that fixes the iPad pixel space
+            max_mismatch: Largest disagreement between the camera and the
+                          reference mapping, as a fraction of ipad_bounds
+        """
+        if screen_size is None and reference is None:
+            raise ValueError("Need a screen size or a reference mapping for the iPad pixel space")
+        self.plotter = plotter
+        self.detector = detector
+        self.plotter_bounds = dict(plotter_bounds)
+        self.park_position = park_position
+        self.screen_size = screen_size
+        self.reference = reference
+        self.max_mismatch = max_mismatch
+
+        self.plotter_points: List[Tuple[float, float]] = []
+        self.camera_points: List[Tuple[float, float]] = []
+        self.screen_quad: Optional[np.ndarray] = None
+        self.screen_fractions: Optional[np.ndarray] = None
+        self.screen_to_camera: Optional[np.ndarray] = None
+        self.ipad_points: Optional[np.ndarray] = None
+
+    def _fresh_frame(self) -> Optional[np.ndarray]:
+        """A frame whose exposure started after the last motion finished"""
+        self.detector.capture_frame()  # May have been exposed mid-move
+        return self.detector.capture_frame()
+
+    def grid_points(self, grid: int = 4, inset: float = 0.1) -> List[Tuple[float, float]]:
+        """Plotter positions of a grid x grid pattern inside the bounds"""
+        pb = self.plotter_bounds
+        x_margin = (pb['x_max'] - pb['x_min']) * inset
+        y_margin = (pb['y_max'] - pb['y_min']) * inset
+        xs = np.linspace(pb['x_min'] + x_margin, pb['x_max'] - x_margin, grid)
+        ys = np.linspace(pb['y_min'] + y_margin, pb['y_max'] - y_margin, grid)
+
+        # Serpentine order keeps travel between points short
+        points = []
+        for row, y in enumerate(ys):
+            for x in (xs if row % 2 == 0 else xs[::-1]):
+                points.append((float(x), float(y)))
+        return points
+
+    def observe_taps(self, points: Sequence[Tuple[float, float]]) -> int:
+        """
+        Tap every point and locate the pen tip in the camera
+
+        Returns:
+            Number of points located
+        """
+        self.plotter.pen_up()
+        for i, (x, y) in enumerate(points, 1):
+            self.plotter.move_to(x, y)
+            self.plotter.sync()
+            frame_up = self._fresh_frame()
+            self.plotter.pen_down()  # Returns once the servo has settled
+            frame_down = self._fresh_frame()
+            self.plotter.pen_up()
+
+            if frame_up is None or frame_down is None:
+                print(f"  ⚠ Point {i}: no camera frame")
+                continue
+            tip = locate_pen(frame_up, frame_down)
+            if tip is None:
+                print(f"  ⚠ Point {i}: pen not found at X={x:.1f}, Y={y:.1f}")
+                continue
+            self.plotter_points.append((x, y))
+            self.camera_points.append(tip)
+            print(f"  ✓ Point {i}: plotter ({x:.1f}, {y:.1f}) → camera ({tip[0]:.1f}, {tip[1]:.1f})")
+        return len(self.camera_points)
+
+    def locate_on_screen(self) -> Optional[np.ndarray]:
+        """
+        Screen positions of the located taps, as fractions of width and height
+
+        Returns:
+            (N, 2) positions in the unit square, or None without a screen quad
+        """
+        if self.screen_quad is None or not self.camera_points:
+            return None
+        unit = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float64)
+        unit_to_camera, _ = fit_homography(unit, self.screen_quad)
+        self.screen_fractions = apply_transform(np.linalg.inv(unit_to_camera),
+                                                np.array(self.camera_points))
+        return self.screen_fractions
+
+    def resolve_screen_size(self) -> Tuple[float, float]:
+        """
+        Screen size in the pixel space of the reference ipad_bounds
+
+        The reference bounds mapping puts each tapped plotter position at an
+        iPad pixel; the camera puts it at a fraction of the screen. Their
+        per-axis ratio is the screen size in that pixel space.
+
+        Returns:
+            (width, height) in iPad pixels
+
+        Raises:
+            ValueError: If the camera and the reference mapping (or the given
+                        screen_size) disagree by more than max_mismatch
+        """
+        if self.reference is None:
+            return self.screen_size
+
+        fractions = self.screen_fractions
+        expected = self.reference.plotter_to_ipad_batch(np.array(self.plotter_points))
+        size = (fractions * expected).sum(axis=0) / (fractions ** 2).sum(axis=0)
+
+        ib = self.reference.ipad_bounds
+        extent = np.abs([ib['x_max'] - ib['x_min'], ib['y_max'] - ib['y_min']])
+        mismatch = float(np.max(np.abs(fractions * size - expected).max(axis=0) / extent))
+        if mismatch > self.max_mismatch:
+            raise ValueError(f"camera sees the taps up to {mismatch:.0%} of ipad_bounds away from "
+                             f"where the calibration's bounds put them - recalibrate the bounds")
+        if self.screen_size is not None:
+            off = float(np.max(np.abs(size - self.screen_size) / size))
+            if off > self.max_mismatch:
+                raise ValueError(f"screen size {self.screen_size[0]}x{self.screen_size[1]} is not the "
+                                 f"pixel space of ipad_bounds (measured {size[0]:.0f}x{size[1]:.0f})")
+        return float(size[0]), float(size[1])
+
+    def solve(self, mapper: CoordinateMapper) -> Optional[Dict]:
+        """
+        Fit the iPad → plotter homography from the observed taps
+
+        Camera detections are mapped to iPad pixels through the detected
+        screen quad, then fitted against the commanded plotter positions,
+        so the residuals are in plotter mm.
+
+        Returns:
+            Residual report from CoordinateMapper.fit_homography, or None
+        """
+        if self.screen_fractions is None or len(self.camera_points) < 4:
+            return None
+
+        w, h = self.screen_size
+        screen_corners = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float64)
+        self.screen_to_camera, _ = fit_homography(screen_corners, self.screen_quad)
+
+        self.ipad_points = self.screen_fractions * np.array([w, h])
+        return mapper.fit_homography(self.ipad_points, np.array(self.plotter_points))
+
+    def camera_corners(self, ipad_bounds: Dict[str, float]) -> List[List[float]]:
+        """Camera positions of the ipad_bounds corners (TL, TR, BR, BL)"""
+        corners = np.array([[ipad_bounds['x_min'], ipad_bounds['y_min']],
+                            [ipad_bounds['x_max'], ipad_bounds['y_min']],
+                            [ipad_bounds['x_max'], ipad_bounds['y_max']],
+                            [ipad_bounds['x_min'], ipad_bounds['y_max']]], dtype=np.float64)
+        return apply_transform(self.screen_to_camera, corners).tolist()
+
+    def park(self):
+        """
+        Move the arm to the park position, outside the screen area
+
+        Raises:
+            ValueError: If the park position is inside plotter_bounds
+        """
+        x, y = self.park_position
+        pb = self.plotter_bounds
+        x_lo, x_hi = sorted((pb['x_min'], pb['x_max']))
+        y_lo, y_hi = sorted((pb['y_min'], pb['y_max']))
+        if x_lo <= x <= x_hi and y_lo <= y <= y_hi:
+            raise ValueError(f"park position ({x:.1f}, {y:.1f}) is over the screen "
+                             f"(plotter bounds X {x_lo}-{x_hi}, Y {y_lo}-{y_hi})")
+        self.plotter.pen_up()
+        self.plotter.move_to(x, y)
+        self.plotter.sync()
+
+    def run(self, grid: int = 4) -> Optional[Tuple[CoordinateMapper, Dict]]:
+        """
+        Run the unattended calibration
+
+        Returns:
+            (calibrated mapper, residual report), or None on failure
+
+        Raises:
+            ValueError: If the park position is over the screen
+        """
+        start = time.perf_counter()
+
+        # Find the screen with the arm out of the way
+        self.park()
+        frame = self._fresh_frame()
+        if frame is None:
+            print("❌ No camera frame")
+            return None
+        self.screen_quad = find_screen_quad(frame)
+        if self.screen_quad is None:
+            print("❌ iPad screen not found in camera image")
+            return None
+        print("✓ iPad screen found in camera image")
+
+        points = self.grid_points(grid)
+        print(f"\n🤖 Tapping {len(points)} calibration points...")
+        located = self.observe_taps(points)
+        if located < 4:
+            print(f"❌ Only {located} points located - need at least 4")
+            return None
+
+        self.locate_on_screen()
+        try:
+            self.screen_size = self.resolve_screen_size()
+        except ValueError as e:
+            print(f"❌ iPad pixel space mismatch: {e}")
+            return None
+        print(f"✓ Screen is {self.screen_size[0]:.0f}x{self.screen_size[1]:.0f} iPad pixels")
+
+        mapper = CoordinateMapper()
+        mapper.plotter_bounds = dict(self.plotter_bounds)
+        mapper.ipad_bounds = {'x_min': 0, 'x_max': self.screen_size[0],
+                              'y_min': 0, 'y_max': self.screen_size[1]}
+        residuals = self.solve(mapper)
+        if residuals is None:
+            print("❌ Homography fit failed")
+            return None
+
+        print(f"\n📐 Fit over {residuals['points']} points in {time.perf_counter() - start:.1f}s:")
+        print(f"   RMS error: {residuals['rms_error_mm']:.2f} mm")
+        print(f"   Max error: {residuals['max_error_mm']:.2f} mm")
+        return mapper, residuals
+
+
+def save_auto_calibration(calibrator: AutoCalibrator, mapper: CoordinateMapper,
+                          filename: str = 'calibration.json'):
+    """
+    Write the solved transforms into a calibration file
+
+    An existing file keeps its bounds and axis settings; the homography,
+    camera corners, park position and date are replaced.
+
+    Raises:
+        ValueError: If the file's ipad_bounds are not the reference the
+                    calibrator checked its pixel space against
+    """
+    if os.path.exists(filename):
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if calibrator.reference is None or calibrator.reference.ipad_bounds != data['ipad_bounds']:
+            raise ValueError(f"{filename} ipad_bounds were not checked against the camera - "
+                             f"calibrate with this file as the reference")
+    else:
+        data = {
+            'plotter_bounds': mapper.plotter_bounds,
+            'ipad_bounds': mapper.ipad_bounds,
+            'axes_swapped': False,
+            'orientation': 'portrait',
+            'device': 'iPad'
+        }
+
+    data['homography'] = {
+        'matrix': mapper.homography.tolist(),
+        **mapper.homography_residuals,
+        'source': 'camera',
+        'point_pairs': [{'ipad': [float(ix), float(iy)], 'plotter': [px, py]}
+                        for (ix, iy), (px, py) in zip(calibrator.ipad_points.tolist(),
+                                                      calibrator.plotter_points)]
+    }
+    data['camera_corners'] = calibrator.camera_corners(data['ipad_bounds'])
+    data['park_position'] = list(calibrator.park_position)
+    data['calibration_date'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"💾 Saved to {filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unattended camera-based plotter calibration")
+    parser.add_argument('--port', default='COM3', help="Plotter serial port")
+    parser.add_argument('--camera', type=int, default=0, help="Camera index")
+    parser.add_argument('--calibration', default='calibration.json',
+                        help="Calibration file to update (plotter bounds are read from it)")
+    parser.add_argument('--bounds', type=float, nargs=4, metavar=('X_MIN', 'X_MAX', 'Y_MIN', 'Y_MAX'),
+                        help="Plotter bounds in mm (default: from the calibration file)")
+    parser.add_argument('--screen-size', type=int, nargs=2, default=None,
+                        metavar=('WIDTH', 'HEIGHT'),
+                        help="iPad portrait size in the pixel space of ipad_bounds "
+                             "(default: measured against the calibration file's bounds)")
+    parser.add_argument('--grid', type=int, default=4, help="Calibration points per side")
+    parser.add_argument('--park', type=float, nargs=2, required=True, metavar=('X', 'Y'),
+                        help="Plotter position (mm) outside the plotter bounds, where the "
+                             "arm is out of the camera's view of the screen")
+    args = parser.parse_args()
+
+    reference = None
+    if os.path.exists(args.calibration):
+        with open(args.calibration, 'r') as f:
+            data = json.load(f)
+        reference = CoordinateMapper(swap_axes=data.get('axes_swapped', False))
+        reference.plotter_bounds = data['plotter_bounds']
+        reference.ipad_bounds = data['ipad_bounds']
+        reference.calibrated = True
+    elif not args.bounds or not args.screen_size:
+        print(f"❌ No {args.calibration} - pass --bounds X_MIN X_MAX Y_MIN Y_MAX "
+              f"and --screen-size WIDTH HEIGHT")
+        return
+
+    if args.bounds:
+        x_min, x_max, y_min, y_max = args.bounds
+        plotter_bounds = {'x_min': x_min, 'x_max': x_max, 'y_min': y_min, 'y_max': y_max}
+    else:
+        plotter_bounds = reference.plotter_bounds
+
+    detector = CardDetector(camera_index=args.camera, quiet=True)
+    if not detector.start_camera(threaded=True, latest_only=False):
+        return
+    plotter = PenPlotter(port=args.port)
+
+    try:
+        calibrator = AutoCalibrator(plotter, detector, plotter_bounds, tuple(args.park),
+                                    screen_size=tuple(args.screen_size) if args.screen_size else None,
+                                    reference=reference)
+        result = calibrator.run(grid=args.grid)
+        if result is not None:
+            save_auto_calibration(calibrator, result[0], args.calibration)
+    except ValueError as e:
+        print(f"❌ {e}")
+    finally:
+        plotter.close()
+        detector.close()
+
+
+if __name__ == "__main__":
+    main()
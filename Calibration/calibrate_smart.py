@@ -83,6 +83,12 @@ def main():
         print(f"   X: {ib['x_min']} to {ib['x_max']} pixels")
         print(f"   Y: {ib['y_min']} to {ib['y_max']} pixels")
         
+        if mapper.homography is not None:
+            residuals = mapper.homography_residuals
+            print(f"\n📐 Homography ({residuals['points']} points):")
+            print(f"   RMS error: {residuals['rms_error_mm']:.2f} mm, "
+                  f"max {residuals['max_error_mm']:.2f} mm")
+        
         # Save calibration
         print("\n" + "-"*60)
         save = input("💾 Save calibration to file? (y/n): ").lower()
@@ -97,6 +103,13 @@ def main():
                 'device': 'iPad',
                 'calibration_date': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+            if mapper.homography is not None:
+                calibration_data['homography'] = {
+                    'matrix': mapper.homography.tolist(),
+                    **mapper.homography_residuals,
+                    'point_pairs': [{'ipad': [ix, iy], 'plotter': [px, py]}
+                                    for ix, iy, px, py in calibrator.calibration_points]
+                }
             
             filename = input("   Filename [calibration.json]: ").strip()
             if not filename:
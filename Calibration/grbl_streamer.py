@@ -0,0 +1,257 @@
+"""
+Streaming G-code sender for GRBL using character-counting flow control
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterable, List, Optional
+
+# GRBL's serial receive buffer (bytes)
+RX_BUFFER_SIZE = 128
+
+
+class GrblStreamer:
+    """
+    Keeps GRBL's planner full by sending commands ahead of their acknowledgements
+
+    GRBL acknowledges every line with 'ok' or 'error:N' once it has been
+    pulled out of its 128-byte RX buffer. By counting the characters of
+    unacknowledged lines we know how much room is left, so new lines can be
+    sent while earlier moves are still executing - instead of one serial
+    round trip per command.
+    """
+
+    def __init__(self, ser, rx_buffer_size: int = RX_BUFFER_SIZE, verbose: bool = False):
+        """
+        Initialize streamer
+
+        Args:
+            ser: Open serial.Serial connected to GRBL
+            rx_buffer_size: GRBL RX buffer size in bytes
+            verbose: Print every response line
+        """
+        self.ser = ser
+        self.rx_buffer_size = rx_buffer_size
+        self.verbose = verbose
+
+        # Unacknowledged commands, oldest first: (length, command, future)
+        self._pending = deque()
+        self._buffered = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+
+        self._status_event = threading.Event()
+        self.last_status = None
+        self._banner_event = threading.Event()
+
+        self._thread = None
+        self._running = False
+
+        self.commands_sent = 0
+        self.commands_acked = 0
+        self.errors = 0
+        self._first_send = None
+        self._last_ack = None
+
+    def start(self) -> 'GrblStreamer':
+        """Start the background response reader"""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._reader_loop,
+                                            name="GrblReader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the reader thread (unacknowledged commands are failed)"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def send(self, command: str, timeout: Optional[float] = None) -> Future:
+        """
+        Queue a command, blocking only while GRBL's RX buffer is full
+
+        Args:
+            command: G-code line (without newline)
+            timeout: Maximum seconds to wait for buffer room
+
+        Returns:
+            Future resolving to GRBL's response line ('ok' or 'error:N')
+        """
+        line = command.strip() + '\n'
+        length = len(line)
+        if length > self.rx_buffer_size:
+            raise ValueError(f"Command longer than GRBL RX buffer: {command!r}")
+
+        future = Future()
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self._buffered + length <= self.rx_buffer_size or not self._running,
+                    timeout):
+                raise TimeoutError(f"GRBL RX buffer stayed full sending {command!r}")
+            if not self._running:
+                raise RuntimeError("Streamer is not running")
+
+            self._pending.append((length, command, future))
+            self._buffered += length
+            with self._write_lock:
+                self.ser.write(line.encode())
+
+            self.commands_sent += 1
+            if self._first_send is None:
+                self._first_send = time.perf_counter()
+        return future
+
+    def stream(self, commands: Iterable[str], timeout: Optional[float] = None) -> List[Future]:
+        """
+        Send many commands back to back, skipping blanks and comments
+
+        Args:
+            commands: G-code lines
+            timeout: Maximum seconds to wait for buffer room per command
+        """
+        futures = []
+        for command in commands:
+            command = command.strip()
+            if command and not command.startswith(';') and not command.startswith('('):
+                futures.append(self.send(command, timeout))
+        return futures
+
+    def wait_all(self, timeout: Optional[float] = None,
+                 stall_timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every sent command has been acknowledged
+
+        Args:
+            timeout: Maximum seconds to wait in total
+            stall_timeout: Give up when no acknowledgement arrives for this
+                           long (a long program keeps waiting as long as
+                           GRBL makes progress)
+
+        Returns:
+            False if a timeout expired with commands still pending
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                wait = stall_timeout
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                acked = self.commands_acked
+                if not self._cond.wait_for(
+                        lambda: not self._pending or self.commands_acked != acked, wait):
+                    return False
+            return True
+
+    def realtime(self, byte: bytes):
+        """Send a real-time command ('?', '!', '~', 0x18) - bypasses the RX buffer"""
+        with self._write_lock:
+            self.ser.write(byte)
+
+    def query_status(self, timeout: float = 1.0) -> Optional[str]:
+        """
+        Ask for a real-time status report
+
+        Returns:
+            Status line such as '<Idle|MPos:0.000,0.000,0.000|FS:0,0>',
+            or None on timeout
+        """
+        self._status_event.clear()
+        self.realtime(b'?')
+        if not self._status_event.wait(timeout):
+            return None
+        return self.last_status
+
+    def abort_pending(self, reason: str = "aborted"):
+        """Fail all unacknowledged commands (e.g. after a soft reset)"""
+        with self._cond:
+            while self._pending:
+                _, command, future = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(RuntimeError(f"{command!r} {reason}"))
+            self._buffered = 0
+            self._cond.notify_all()
+
+    def soft_reset(self, timeout: float = 5.0) -> bool:
+        """
+        Send Ctrl-X and wait for GRBL's startup banner
+
+        Returns:
+            True if GRBL restarted within the timeout
+        """
+        # GRBL flushes its buffers; those commands will never be acked
+        self.abort_pending("lost in soft reset")
+        self._banner_event.clear()
+        self.realtime(b'\x18')
+        return self._banner_event.wait(timeout)
+
+    @property
+    def pending(self) -> int:
+        """Commands sent but not yet acknowledged"""
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def commands_per_sec(self) -> float:
+        """Acknowledged commands per second since the first send"""
+        if self._first_send is None or self._last_ack is None:
+            return 0.0
+        elapsed = self._last_ack - self._first_send
+        return self.commands_acked / elapsed if elapsed > 0 else 0.0
+
+    def reset_stats(self):
+        self.commands_sent = 0
+        self.commands_acked = 0
+        self.errors = 0
+        self._first_send = None
+        self._last_ack = None
+
+    def _reader_loop(self):
+        """Match 'ok'/'error' lines to pending commands in order"""
+        while self._running:
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                print(f"❌ Serial read failed: {e}")
+                self._running = False
+                break
+
+            line = raw.decode(errors='replace').strip()
+            if not line:
+                continue
+            if self.verbose:
+                print(f"<- {line}")
+
+            if line == 'ok' or line.startswith('error'):
+                self._acknowledge(line)
+            elif line.startswith('<'):
+                self.last_status = line
+                self._status_event.set()
+            elif line.startswith('Grbl'):
+                self._banner_event.set()
+            elif line.startswith('ALARM'):
+                print(f"⚠ GRBL {line}")
+
+        # Nothing will acknowledge the outstanding commands any more: fail
+        # their futures and wake senders blocked on buffer room
+        self.abort_pending("never acknowledged (serial reader stopped)")
+
+    def _acknowledge(self, response: str):
+        with self._cond:
+            if not self._pending:
+                return  # Stray ack (e.g. from before streaming started)
+            length, command, future = self._pending.popleft()
+            self._buffered -= length
+            self.commands_acked += 1
+            self._last_ack = time.perf_counter()
+            if response.startswith('error'):
+                self.errors += 1
+                print(f"❌ GRBL {response} for: {command}")
+            self._cond.notify_all()
+        future.set_result(response)
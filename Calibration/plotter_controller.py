@@ -3,18 +3,65 @@ Python controller for Chinese pen plotter with GRBL firmware
 """
 import serial
 import time
-from typing import List, Tuple
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from Calibration.grbl_streamer import GrblStreamer
+
+
+@dataclass
+class ServoSettleModel:
+    """
+    Time the pen servo needs to reach a new position and stop moving
+    
+    Settle time = base_time + seconds_per_unit * |S travel|; it is executed
+    as a G4 dwell on the controller, so the 'ok' for the dwell means the pen
+    is in place.
+    """
+    up_value: int = 0  # M3 S value with the pen raised
+    down_value: int = 90  # M3 S value with the pen touching the screen
+    base_time: float = 0.08  # Seconds before the servo starts moving
+    seconds_per_unit: float = 0.002  # Travel time per unit of S
+    
+    def settle_time(self, start: Optional[int], end: int) -> float:
+        """Seconds to go from start to end (start None = unknown, assume full travel)"""
+        if start is None:
+            travel = abs(self.down_value - self.up_value)
+        else:
+            travel = abs(end - start)
+        if travel == 0:
+            return 0.0
+        return self.base_time + self.seconds_per_unit * travel
+    
+    def commands(self, start: Optional[int], end: int) -> List[str]:
+        """Servo command plus the G4 dwell until it has settled"""
+        commands = [f"M3 S{end}"]
+        settle = self.settle_time(start, end)
+        if settle > 0:
+            commands.append(f"G4 P{settle:.3f}")
+        return commands
 
 
 class PenPlotter:
-    def __init__(self, port: str = 'COM3', baudrate: int = 115200):
+    def __init__(self, port: str = 'COM3', baudrate: int = 115200,
+                 settle_model: Optional[ServoSettleModel] = None,
+                 command_timeout: float = 30.0):
         """
         Initialize connection to the plotter
         
         Args:
             port: Serial port (e.g., 'COM3' on Windows, '/dev/ttyUSB0' on Linux)
             baudrate: Communication speed (default 115200 for GRBL)
+            settle_model: Pen servo timing (default ServoSettleModel())
+            command_timeout: Seconds to wait for GRBL to acknowledge a
+                             command (for a streamed program: between two
+                             acknowledgements)
         """
+        self.settle_model = settle_model or ServoSettleModel()
+        self.command_timeout = command_timeout
+        self.pen_position: Optional[int] = None  # Last commanded servo S value
+        
         self.ser = serial.Serial(port, baudrate, timeout=1)
         time.sleep(2)  # Wait for Arduino to reset
         
@@ -24,25 +71,106 @@ class PenPlotter:
         self.ser.flushInput()
         
         print("Plotter connected!")
-        self._read_response()
+        self._read_response(until_ack=False)  # Startup banner, no 'ok'
+        
+        # Set by start_streaming(); owns all serial reads while active
+        self.streamer: Optional[GrblStreamer] = None
+    
+    def start_streaming(self, verbose: bool = False) -> GrblStreamer:
+        """
+        Switch to streaming mode: commands are sent ahead of their 'ok'
+        using GRBL's character-counting flow control
+        """
+        if self.streamer is None:
+            self.streamer = GrblStreamer(self.ser, verbose=verbose).start()
+            print("Streaming mode on")
+        return self.streamer
+    
+    def stop_streaming(self):
+        """Wait for outstanding commands and return to send/wait mode"""
+        if self.streamer is not None:
+            self.streamer.wait_all(timeout=30)
+            self.streamer.stop()
+            self.streamer = None
+            print("Streaming mode off")
     
     def _send_command(self, command: str) -> str:
         """Send a G-code command and wait for response"""
+        if self.streamer is not None:
+            future = self.streamer.send(command, timeout=self.command_timeout)
+            try:
+                return future.result(timeout=self.command_timeout)
+            except FutureTimeoutError:
+                raise TimeoutError(f"No response from GRBL to {command!r} "
+                                   f"within {self.command_timeout}s") from None
         self.ser.write((command + '\n').encode())
         return self._read_response()
     
-    def _read_response(self) -> str:
-        """Read response from GRBL"""
+    def stream_commands(self, commands: Iterable[str]) -> float:
+        """
+        Stream G-code lines without waiting for each acknowledgement
+        
+        Args:
+            commands: G-code lines (blank lines and comments are skipped)
+        
+        Returns:
+            Throughput in commands/sec
+        
+        Raises:
+            TimeoutError: GRBL stopped acknowledging commands
+            RuntimeError: A command was never acknowledged (e.g. the
+                          serial reader stopped)
+        """
+        streamer = self.streamer
+        temporary = streamer is None
+        if temporary:
+            streamer = GrblStreamer(self.ser).start()
+        
+        streamer.reset_stats()
+        try:
+            futures = streamer.stream(commands, timeout=self.command_timeout)
+            if not streamer.wait_all(stall_timeout=self.command_timeout):
+                raise TimeoutError(f"GRBL stopped acknowledging: {streamer.pending} commands "
+                                   f"pending after {self.command_timeout}s")
+            for future in futures:
+                future.result()  # Raises for aborted commands
+        finally:
+            if temporary:
+                streamer.stop()
+        
+        rate = streamer.commands_per_sec
+        print(f"Streamed {streamer.commands_acked} commands "
+              f"({rate:.1f} commands/sec, {streamer.errors} errors)")
+        return rate
+    
+    def _read_response(self, until_ack: bool = True) -> str:
+        """
+        Read response from GRBL
+        
+        GRBL holds the 'ok' for a dwell until queued motion has finished,
+        which can take longer than the 1 s port timeout, so an empty read
+        does not end the response.
+        
+        Args:
+            until_ack: Read until 'ok' or 'error:N'; False stops at the
+                       first empty read (startup banner)
+        
+        Raises:
+            TimeoutError: No 'ok'/'error' within command_timeout
+        """
         response = []
+        deadline = time.monotonic() + self.command_timeout
         while True:
             line = self.ser.readline().decode().strip()
             if line:
                 response.append(line)
                 print(f"<- {line}")
-                if 'ok' in line or 'error' in line:
+                if line == 'ok' or line.startswith('error'):
                     break
-            else:
+            elif not until_ack:
                 break
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f"No response from GRBL within {self.command_timeout}s")
         return '\n'.join(response)
     
     def home(self):
@@ -76,17 +204,70 @@ class PenPlotter:
         print(f"Drawing to X{x} Y{y}")
         self._send_command(command)
     
+    def pen_commands(self, value: int) -> List[str]:
+        """
+        G-code to move the pen servo and dwell until it has settled
+        
+        Args:
+            value: Servo S value (settle_model.up_value / down_value)
+        """
+        commands = self.settle_model.commands(self.pen_position, value)
+        self.pen_position = value
+        return commands
+    
     def pen_up(self):
-        """Raise the pen (servo up)"""
+        """Raise the pen (servo up); returns once the servo has settled"""
         print("Pen up")
-        self._send_command("M3 S0")  # Servo to up position
-        time.sleep(0.5)  # Wait for servo to move
+        for command in self.pen_commands(self.settle_model.up_value):
+            self._send_command(command)
     
     def pen_down(self):
-        """Lower the pen (servo down)"""
+        """Lower the pen (servo down); returns once the servo has settled"""
         print("Pen down")
-        self._send_command("M3 S90")  # Servo to down position
-        time.sleep(0.5)  # Wait for servo to move
+        for command in self.pen_commands(self.settle_model.down_value):
+            self._send_command(command)
+    
+    def tap(self, x: Optional[float] = None, y: Optional[float] = None,
+            hold: float = 0.0, feed_rate: int = 1000):
+        """
+        Tap the screen, optionally moving there first
+        
+        Args:
+            x, y: Position in mm (None = tap where the pen is)
+            hold: Seconds to keep the pen down
+            feed_rate: Movement speed in mm/min
+        """
+        if x is not None and y is not None:
+            self.move_to(x, y, feed_rate)
+        self.pen_down()
+        if hold > 0:
+            self._send_command(f"G4 P{hold:.3f}")
+        self.pen_up()
+    
+    def sync(self) -> str:
+        """
+        Block until all queued motion has finished
+        
+        GRBL only acknowledges a dwell once the planner buffer is empty,
+        so the 'ok' for G4 P0 marks motion complete.
+        """
+        return self._send_command("G4 P0")
+    
+    def wait_until_idle(self, timeout: float = 30.0, poll_interval: float = 0.02) -> bool:
+        """
+        Poll the real-time status report until GRBL is Idle
+        
+        Returns:
+            True if the plotter went idle within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.streamer is None or self.streamer.pending == 0:
+                status = self.get_status()
+                if status and status.startswith('<Idle'):
+                    return True
+            time.sleep(poll_interval)
+        return False
     
     
     
@@ -96,28 +277,47 @@ class PenPlotter:
         """Execute G-code from a file"""
         print(f"Executing G-code file: {filename}")
         with open(filename, 'r') as f:
-            for line in f:
-                line = line.strip()
-                # Skip empty lines and comments
-                if line and not line.startswith(';') and not line.startswith('('):
-                    self._send_command(line)
-                    time.sleep(0.01)  # Small delay between commands
-    
-    def get_status(self):
-        """Get current plotter status"""
+            self.stream_commands(f)
+    
+    def get_status(self) -> Optional[str]:
+        """Get current plotter status, e.g. '<Idle|MPos:0.000,0.000,0.000|FS:0,0>'"""
+        if self.streamer is not None:
+            return self.streamer.query_status()
         self.ser.write(b'?')
-        return self._read_response()
+        while True:
+            line = self.ser.readline().decode().strip()
+            if not line:
+                return None
+            if line.startswith('<'):
+                return line
     
-    def reset(self):
-        """Soft reset the plotter"""
+    def reset(self, timeout: float = 5.0):
+        """Soft reset the plotter and wait for GRBL to restart"""
         print("Resetting...")
-        self.ser.write(b'\x18')  # Ctrl-X
-        time.sleep(2)
-        self._read_response()
+        if self.streamer is not None:
+            restarted = self.streamer.soft_reset(timeout)
+        else:
+            self.ser.write(b'\x18')  # Ctrl-X
+            restarted = self._wait_for_banner(timeout)
+        self.pen_position = None
+        if not restarted:
+            print("⚠ No GRBL startup message after reset")
+    
+    def _wait_for_banner(self, timeout: float) -> bool:
+        """Read until GRBL's 'Grbl x.y' startup line"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            line = self.ser.readline().decode().strip()
+            if line:
+                print(f"<- {line}")
+                if line.startswith('Grbl'):
+                    return True
+        return False
     
     def close(self):
         """Close the serial connection"""
         self.pen_up()
+        self.stop_streaming()
         self.ser.close()
         print("Connection closed")
 
@@ -0,0 +1,146 @@
+"""
+Klondike layout lookup table
+Precomputes the plotter position of every tap target (tableau slots,
+foundations, stock and waste) from the loaded calibration
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Calibration.LoadCalibration_Smart import load_calibration
+
+TABLEAU_COLUMNS = 7
+FOUNDATIONS = 4
+
+
+@dataclass
+class LayoutGeometry:
+    """
+    Slot positions as fractions of the calibrated game area (ipad_bounds)
+
+    The game area is split into 7 equal columns; top-row piles sit in
+    those columns too. Adjust to match the Solitaire app in use.
+    """
+    top_row_y: float = 0.08  # Center of stock / waste / foundations
+    tableau_top_y: float = 0.30  # Center of the first (deepest) tableau card's visible strip
+    fan_offset_y: float = 0.035  # Vertical spacing of fanned tableau cards
+    max_depth: int = 19  # Cards per column: 6 face down + 13 face up
+    stock_column: int = 0
+    waste_column: int = 1
+    foundation_columns: Tuple[int, ...] = (3, 4, 5, 6)
+
+
+class SolitaireLayout:
+    """Table of plotter coordinates for every Klondike tap target"""
+
+    def __init__(self, calibration_file: str = 'calibration.json',
+                 geometry: Optional[LayoutGeometry] = None):
+        """
+        Initialize layout and build the table
+
+        Args:
+            calibration_file: Calibration the table is computed from
+            geometry: Slot positions (default LayoutGeometry())
+        """
+        self.calibration_file = calibration_file
+        self.geometry = geometry or LayoutGeometry()
+        self.mapper = None
+        self._mtime = None
+
+        self._tableau: List[List[Tuple[float, float]]] = []
+        self._foundations: List[Tuple[float, float]] = []
+        self._stock: Tuple[float, float] = (0.0, 0.0)
+        self._waste: Tuple[float, float] = (0.0, 0.0)
+        self.ipad_points: Dict[str, np.ndarray] = {}
+
+        if not self.refresh_if_changed():
+            raise FileNotFoundError(f"Cannot build layout without {calibration_file}")
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Rebuild the table if the calibration file changed since it was built
+
+        Cheap enough to call before every move (one os.stat).
+
+        Returns:
+            True if the table is valid
+        """
+        try:
+            mtime = os.stat(self.calibration_file).st_mtime_ns
+        except FileNotFoundError:
+            return self.mapper is not None
+        if mtime == self._mtime:
+            return True
+
+        mapper = load_calibration(self.calibration_file)
+        if mapper is None:
+            return self.mapper is not None
+        self.mapper = mapper
+        self._mtime = mtime
+        self._build()
+        return True
+
+    def _build(self):
+        """Map every slot through the calibration in one batch"""
+        g = self.geometry
+        ib = self.mapper.ipad_bounds
+        width = ib['x_max'] - ib['x_min']
+        height = ib['y_max'] - ib['y_min']
+
+        column_x = ib['x_min'] + (np.arange(TABLEAU_COLUMNS) + 0.5) / TABLEAU_COLUMNS * width
+        top_y = ib['y_min'] + g.top_row_y * height
+        depth_y = ib['y_min'] + (g.tableau_top_y + np.arange(g.max_depth) * g.fan_offset_y) * height
+
+        tableau = np.stack(np.meshgrid(column_x, depth_y, indexing='ij'), axis=-1)  # (7, depth, 2)
+        foundations = np.stack([column_x[list(g.foundation_columns)],
+                                np.full(len(g.foundation_columns), top_y)], axis=-1)
+        stock = np.array([[column_x[g.stock_column], top_y]])
+        waste = np.array([[column_x[g.waste_column], top_y]])
+        self.ipad_points = {'tableau': tableau, 'foundations': foundations,
+                            'stock': stock[0], 'waste': waste[0]}
+
+        # One batch transform for all slots
+        ipad = np.concatenate([tableau.reshape(-1, 2), foundations, stock, waste])
+        plotter = self.mapper.ipad_to_plotter_batch(ipad).tolist()
+
+        n_tableau = TABLEAU_COLUMNS * g.max_depth
+        flat = [tuple(p) for p in plotter]
+        self._tableau = [flat[c * g.max_depth:(c + 1) * g.max_depth] for c in range(TABLEAU_COLUMNS)]
+        self._foundations = flat[n_tableau:n_tableau + len(foundations)]
+        self._stock = flat[-2]
+        self._waste = flat[-1]
+        print(f"✓ Layout table built ({len(flat)} slots)")
+
+    def tableau(self, column: int, depth: int) -> Tuple[float, float]:
+        """Plotter position of the card at depth (0 = bottom of the pile) in a column"""
+        return self._tableau[column][min(depth, self.geometry.max_depth - 1)]
+
+    def foundation(self, index: int) -> Tuple[float, float]:
+        return self._foundations[index]
+
+    def stock(self) -> Tuple[float, float]:
+        return self._stock
+
+    def waste(self) -> Tuple[float, float]:
+        return self._waste
+
+    def slot(self, pile: str, index: int = 0, depth: int = 0) -> Tuple[float, float]:
+        """
+        Plotter position of a tap target by name
+
+        Args:
+            pile: 'tableau', 'foundation', 'stock' or 'waste'
+            index: Column or foundation index
+            depth: Card depth within a tableau column
+        """
+        if pile == 'tableau':
+            return self.tableau(index, depth)
+        if pile == 'foundation':
+            return self._foundations[index]
+        if pile == 'stock':
+            return self._stock
+        if pile == 'waste':
+            return self._waste
+        raise ValueError(f"Unknown pile: {pile}")
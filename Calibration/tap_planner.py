@@ -0,0 +1,168 @@
+"""
+Tap sequence planner
+Turns a list of iPad taps into a single G-code program for the plotter
+"""
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from Calibration.CoordinateMapper_Swapped import CoordinateMapper
+from Calibration.plotter_controller import PenPlotter, ServoSettleModel
+
+
+@dataclass
+class TapPlan:
+    """A planned tap sequence"""
+    order: List[int]  # Indices into the requested taps, in execution order
+    points: List[Tuple[float, float]]  # Plotter coordinates (mm), in execution order
+    gcode: List[str]
+    travel_mm: float  # Pen-up travel, including from the start position
+
+
+class TapPlanner:
+    def __init__(self, mapper: CoordinateMapper, settle_model: Optional[ServoSettleModel] = None,
+                 hold: float = 0.0, feed_rate: Optional[int] = None):
+        """
+        Initialize planner
+
+        Args:
+            mapper: Calibrated iPad → plotter mapper
+            settle_model: Pen servo timing; None follows the plotter's
+                          settle_model (ServoSettleModel() when planning
+                          without a plotter)
+            hold: Seconds to keep the pen down on each tap
+            feed_rate: None moves between taps as G0 rapids at GRBL's
+                       configured maximum rates ($110/$111 - GRBL ignores F
+                       on G0); a value in mm/min uses G1 at that feed instead,
+                       for machines whose rapids are too violent
+        """
+        self.mapper = mapper
+        self.settle_model = settle_model
+        self.hold = hold
+        self.feed_rate = feed_rate
+
+    def plan(self, taps: Sequence[Tuple[float, float]], optimize_order: bool = False,
+             start: Optional[Tuple[float, float]] = None,
+             pen_position: Optional[int] = None,
+             plotter: Optional[PenPlotter] = None) -> TapPlan:
+        """
+        Plan a tap sequence
+
+        Args:
+            taps: iPad pixel coordinates
+            optimize_order: Reorder taps to minimize travel. Leave off when
+                            order matters (a solitaire move taps the source
+                            card before the destination).
+            start: Plotter position (mm) before the sequence, if known
+            pen_position: Current servo S value (None = unknown)
+            plotter: Plotter the sequence is for (supplies the settle model)
+
+        Returns:
+            TapPlan with the G-code program
+        """
+        points = [tuple(p) for p in self.mapper.ipad_to_plotter_batch(taps).tolist()]
+        return self.plan_plotter(points, optimize_order, start, pen_position, plotter)
+
+    def plan_plotter(self, points: Sequence[Tuple[float, float]], optimize_order: bool = False,
+                     start: Optional[Tuple[float, float]] = None,
+                     pen_position: Optional[int] = None,
+                     plotter: Optional[PenPlotter] = None) -> TapPlan:
+        """Plan a tap sequence given directly in plotter mm (e.g. from SolitaireLayout)"""
+        order = list(range(len(points)))
+        if optimize_order and len(points) > 2:
+            order = _optimize_order(points, start)
+        points = [points[i] for i in order]
+
+        model = self.model_for(plotter)
+        gcode = []
+        if pen_position != model.up_value:
+            gcode += model.commands(pen_position, model.up_value)
+
+        for x, y in points:
+            if self.feed_rate is None:
+                gcode.append(f"G0 X{x:.2f} Y{y:.2f}")
+            else:
+                gcode.append(f"G1 X{x:.2f} Y{y:.2f} F{self.feed_rate}")
+            gcode += model.commands(model.up_value, model.down_value)
+            if self.hold > 0:
+                gcode.append(f"G4 P{self.hold:.3f}")
+            gcode += model.commands(model.down_value, model.up_value)
+
+        return TapPlan(order=order, points=points, gcode=gcode,
+                       travel_mm=_path_length(points, start))
+
+    def execute(self, plotter: PenPlotter, taps: Sequence[Tuple[float, float]],
+                optimize_order: bool = False,
+                start: Optional[Tuple[float, float]] = None) -> TapPlan:
+        """
+        Plan a tap sequence and stream it to the plotter in one go
+
+        Returns once the last tap has finished (the final dwell is acknowledged).
+        """
+        plan = self.plan(taps, optimize_order, start, plotter.pen_position, plotter)
+        return self.execute_plan(plotter, plan)
+
+    def execute_plan(self, plotter: PenPlotter, plan: TapPlan) -> TapPlan:
+        """Stream an already planned sequence; returns once the last tap has finished"""
+        print(f"Tapping {len(plan.points)} points ({plan.travel_mm:.1f} mm travel)")
+        plotter.stream_commands(plan.gcode)
+        plotter.pen_position = self.model_for(plotter).up_value
+        return plan
+
+    def model_for(self, plotter: Optional[PenPlotter] = None) -> ServoSettleModel:
+        """Settle model used when planning for plotter"""
+        if self.settle_model is not None:
+            return self.settle_model
+        return plotter.settle_model if plotter is not None else ServoSettleModel()
+
+
+def _path_length(points: Sequence[Tuple[float, float]],
+                 start: Optional[Tuple[float, float]] = None) -> float:
+    path = ([start] if start is not None else []) + list(points)
+    return sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+
+
+def _optimize_order(points: Sequence[Tuple[float, float]],
+                    start: Optional[Tuple[float, float]] = None) -> List[int]:
+    """
+    Short open path through all points: nearest neighbour, then 2-opt
+
+    Returns:
+        Point indices in visiting order
+    """
+    remaining = list(range(len(points)))
+    if start is None:
+        order = [remaining.pop(0)]
+        current = points[order[0]]
+    else:
+        order = []
+        current = start
+    while remaining:
+        nearest = min(remaining, key=lambda i: math.dist(current, points[i]))
+        remaining.remove(nearest)
+        order.append(nearest)
+        current = points[nearest]
+
+    # 2-opt: reverse segments while that shortens the path. The first
+    # point stays fixed when there is no start position to anchor to.
+    def dist(a, b):
+        # Index -1 is the start position
+        pa = start if a < 0 else points[order[a]]
+        return math.dist(pa, points[order[b]])
+
+    first = 0 if start is not None else 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(first, len(order) - 1):
+            for j in range(i + 1, len(order)):
+                # Edges (i-1 → i) and (j → j+1) become (i-1 → j) and (i → j+1)
+                before = dist(i - 1, i)
+                after = dist(i - 1, j)
+                if j + 1 < len(order):
+                    before += dist(j, j + 1)
+                    after += math.dist(points[order[i]], points[order[j + 1]])
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+    return order
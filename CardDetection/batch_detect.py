@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Offline Batch Card Detection
+Runs CardDetector over a directory of captured frames with a process pool
+and writes the detections as newline-delimited JSON
+
+Usage (from the repository root):
+    python -m CardDetection.batch_detect <image_dir> [-o detections.ndjson]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+from multiprocessing import Pool
+from typing import Dict, Optional
+
+import cv2
+
+from CardDetection.card_detector import CardDetector
+from CardDetection.card_recognizer import CardRecognizer
+from CardDetection.instrumentation import Instrumentation
+
+
+# One detector per worker process, created by _init_worker
+_detector = None
+
+
+def _init_worker(template_cache: Optional[str], marked_dir: Optional[str],
+                 pyramid_levels: int, verbose: bool):
+    """Create this worker's detector"""
+    global _detector
+    recognizer = None
+    if template_cache:
+        recognizer = CardRecognizer.load(template_cache, marked_dir)
+    _detector = CardDetector(recognizer=recognizer, pyramid_levels=pyramid_levels,
+                             instrumentation=Instrumentation(window=1), quiet=not verbose)
+
+
+def _process_image(path: str) -> Dict:
+    """Load one image and detect its cards"""
+    start = time.perf_counter()
+    frame = cv2.imread(path)
+    loaded = time.perf_counter()
+
+    if frame is None:
+        return {'image': path, 'error': 'could not read image',
+                'timings_ms': {'load': (loaded - start) * 1000}}
+
+    _detector.instrumentation.reset()
+    cards = _detector.detect_cards(frame)
+
+    timings = {'load': (loaded - start) * 1000}
+    timings.update(_detector.instrumentation.last_ms())
+    return {
+        'image': path,
+        'image_size': {'width': frame.shape[1], 'height': frame.shape[0]},
+        'cards': [asdict(card) for card in cards],
+        'timings_ms': timings
+    }
+
+
+def run_batch(image_dir: str, output: str, pattern: str = 'captured_frame_*.jpg',
+              workers: Optional[int] = None, template_cache: Optional[str] = None,
+              marked_dir: Optional[str] = None, pyramid_levels: int = 0,
+              chunksize: int = 4, verbose: bool = False) -> Dict:
+    """
+    Detect cards in every matching image of a directory
+
+    Args:
+        image_dir: Directory holding the captured frames
+        output: Newline-delimited JSON file, one line per image
+        pattern: Glob pattern for image names
+        workers: Worker processes (default: CPU count)
+        template_cache: Template bank for rank/suit recognition; None to
+                        detect cards without recognition
+        marked_dir: *_marked.json directory used to build the template bank
+        pyramid_levels: Passed to CardDetector
+        chunksize: Images handed to a worker at a time
+        verbose: Show per-frame detector output
+
+    Returns:
+        Summary dict with throughput and per-stage timings averaged over
+        the images that were read and detected
+    """
+    if template_cache:
+        # Build the bank once here so workers only load the cache
+        CardRecognizer.load(template_cache, marked_dir)
+
+    paths = glob.iglob(os.path.join(image_dir, pattern))
+    totals = {}
+    images = 0
+    failures = 0
+    cards = 0
+
+    start = time.perf_counter()
+    with Pool(workers, initializer=_init_worker,
+              initargs=(template_cache, marked_dir, pyramid_levels, verbose)) as pool, \
+            open(output, 'w') as out:
+        for result in pool.imap_unordered(_process_image, paths, chunksize=chunksize):
+            out.write(json.dumps(result) + '\n')
+            images += 1
+            if 'error' in result:
+                failures += 1
+            else:
+                cards += len(result['cards'])
+                for stage, ms in result['timings_ms'].items():
+                    totals[stage] = totals.get(stage, 0.0) + ms
+
+            if images % 100 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {images} images, {images / elapsed:.1f} images/sec")
+    elapsed = time.perf_counter() - start
+    detected = images - failures
+
+    return {
+        'images': images,
+        'failures': failures,
+        'cards': cards,
+        'elapsed_s': elapsed,
+        'images_per_sec': images / elapsed if elapsed > 0 else 0.0,
+        'mean_stage_ms': {stage: total / detected for stage, total in totals.items()} if detected else {}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect cards in a directory of captured frames")
+    parser.add_argument('image_dir', help="Directory with captured frames")
+    parser.add_argument('-o', '--output', default='detections.ndjson',
+                        help="Output file (newline-delimited JSON)")
+    parser.add_argument('-p', '--pattern', default='captured_frame_*.jpg',
+                        help="Image file glob pattern")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument('--templates', default=None,
+                        help="Template bank cache (.npz) to enable rank/suit recognition")
+    parser.add_argument('--marked-dir', default=None,
+                        help="Directory of *_marked.json files to build templates from")
+    parser.add_argument('--pyramid-levels', type=int, default=0,
+                        help="Coarse-to-fine pyramid levels (0 = full resolution)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Show per-frame detector output")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.image_dir):
+        print(f"❌ Not a directory: {args.image_dir}")
+        sys.exit(1)
+
+    print(f"🎴 Batch detection: {args.image_dir}/{args.pattern} → {args.output}")
+    summary = run_batch(args.image_dir, args.output, pattern=args.pattern,
+                        workers=args.workers, template_cache=args.templates,
+                        marked_dir=args.marked_dir, pyramid_levels=args.pyramid_levels,
+                        verbose=args.verbose)
+
+    print(f"\n✓ Processed {summary['images']} images "
+          f"({summary['failures']} failed), {summary['cards']} cards")
+    print(f"  Throughput: {summary['images_per_sec']:.1f} images/sec "
+          f"({summary['elapsed_s']:.1f}s total)")
+    for stage, ms in summary['mean_stage_ms'].items():
+        print(f"  {stage:>10s}: {ms:7.2f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Card Detection Benchmark
+Replays CardMarker ground truth (*_marked.json) through
+CardDetector.detect_cards and reports accuracy and the detector's own
+per-stage latency, compared against a saved baseline
+
+With recognition enabled, templates are never built from the images being
+scored: they come from --train-dir, or else every --test-every'th marked
+file is held out for scoring and the rest build the template bank.
+
+Usage (from the repository root):
+    python -m CardDetection.benchmark_detection <marked_dir> [--save-baseline]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from CardDetection.card_detector import Card, CardDetector
+from CardDetection.card_recognizer import CardRecognizer, resolve_marked_image
+from CardDetection.game_area import GameArea
+from CardDetection.identity_cache import IdentityCache
+from CardDetection.instrumentation import Instrumentation
+
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+
+def iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_cards(detected: List[Card], truth: List[Dict],
+                min_iou: float = 0.5) -> List[Tuple[Card, Dict, float]]:
+    """Greedy one-to-one matching of detections to ground truth by IoU"""
+    pairs = []
+    for i, card in enumerate(detected):
+        for j, gt in enumerate(truth):
+            score = iou(card.bbox, tuple(gt['bbox']))
+            if score >= min_iou:
+                pairs.append((score, i, j))
+
+    matches = []
+    used_det, used_gt = set(), set()
+    for score, i, j in sorted(pairs, reverse=True):
+        if i in used_det or j in used_gt:
+            continue
+        used_det.add(i)
+        used_gt.add(j)
+        matches.append((detected[i], truth[j], score))
+    return matches
+
+
+def timed_detection(detector: CardDetector, frame: np.ndarray) -> Tuple[List[Card], Dict[str, float]]:
+    """
+    Run detector.detect_cards once and read back its stage timings
+
+    The detector needs an Instrumentation attached (run_benchmark does
+    this). Stages are whatever detect_cards ran: preprocess, threshold,
+    contour, filter, refine (pyramid), identify, and detect for the whole
+    call.
+
+    Returns:
+        (cards, stage timings in ms)
+    """
+    detector.instrumentation.reset()
+    cards = detector.detect_cards(frame)
+    return cards, detector.instrumentation.last_ms()
+
+
+def truth_boxes(detector: CardDetector, truth: List[Dict]) -> List[Dict]:
+    """
+    Ground truth in the detector's output coordinates
+
+    CardMarker boxes are in camera pixels; with a game area detect_cards
+    reports iPad pixels, so each box is mapped corner by corner.
+    """
+    area = detector.game_area
+    if area is None:
+        return truth
+    mapped = []
+    for gt in truth:
+        x, y, w, h = gt['bbox']
+        corners = area.camera_to_ipad([(x, y), (x + w, y), (x + w, y + h), (x, y + h)])
+        (x0, y0), (x1, y1) = corners.min(axis=0), corners.max(axis=0)
+        mapped.append({**gt, 'bbox': [int(round(x0)), int(round(y0)),
+                                      int(round(x1 - x0)), int(round(y1 - y0))]})
+    return mapped
+
+
+def find_marked_files(marked_dir: str) -> List[str]:
+    """Sorted *_marked.json files in a directory"""
+    return sorted(glob.glob(os.path.join(marked_dir, '*_marked.json')))
+
+
+def split_marked_files(marked_files: Sequence[str],
+                       test_every: int = 2) -> Tuple[List[str], List[str]]:
+    """
+    Deterministic train/test split of marked files
+
+    Every test_every'th file (starting with the first) is held out for
+    scoring; the others build the template bank.
+
+    Returns:
+        (train files, test files)
+    """
+    train, test = [], []
+    for i, marked_file in enumerate(sorted(marked_files)):
+        (test if i % test_every == 0 else train).append(marked_file)
+    return train, test
+
+
+def run_benchmark(marked_dir: str, detector: CardDetector, repeat: int = 5,
+                  min_iou: float = 0.5,
+                  marked_files: Optional[Sequence[str]] = None) -> Optional[Dict]:
+    """
+    Benchmark the detector on every *_marked.json in a directory
+
+    Args:
+        marked_dir: Directory with CardMarker output and the marked images
+        detector: Detector to benchmark, as configured for production
+                  (pyramid, game area, identity cache). An Instrumentation
+                  is attached if it has none
+        repeat: Timed runs per image (latency percentiles use all runs)
+        min_iou: IoU needed for a detection to count as a match
+        marked_files: Score only these files (e.g. the test split);
+                      default all of marked_dir
+
+    Returns:
+        Dict of accuracy and latency metrics, or None if nothing was found
+    """
+    if marked_files is None:
+        marked_files = find_marked_files(marked_dir)
+    if not marked_files:
+        print(f"❌ No *_marked.json files in {marked_dir}")
+        return None
+
+    if not detector.instrumentation.enabled:
+        detector.instrumentation = Instrumentation()
+    samples = {}
+    n_detected = n_truth = n_matched = n_labels_correct = 0
+    ious = []
+    images = 0
+
+    for marked_file in marked_files:
+        with open(marked_file, 'r') as f:
+            data = json.load(f)
+        image_path = resolve_marked_image(marked_file, data['image_file'])
+        frame = cv2.imread(image_path) if image_path else None
+        if frame is None:
+            print(f"⚠ Skipping {marked_file}: image not found")
+            continue
+        images += 1
+
+        for run in range(repeat):
+            cards, timings = timed_detection(detector, frame)
+            for stage, ms in timings.items():
+                samples.setdefault(stage, []).append(ms)
+
+        # Accuracy from the last run (detection is deterministic)
+        truth = truth_boxes(detector, data['cards'])
+        matches = match_cards(cards, truth, min_iou)
+        n_detected += len(cards)
+        n_truth += len(truth)
+        n_matched += len(matches)
+        for card, gt, score in matches:
+            ious.append(score)
+            if card.rank == gt['rank'] and card.suit == gt['suit']:
+                n_labels_correct += 1
+
+    if images == 0:
+        return None
+
+    latency = {}
+    for stage, values in samples.items():
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        latency[stage] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+    return {
+        'images': images,
+        'precision': n_matched / n_detected if n_detected else 0.0,
+        'recall': n_matched / n_truth if n_truth else 0.0,
+        'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        'label_accuracy': n_labels_correct / n_matched if n_matched else 0.0,
+        'latency_ms': latency
+    }
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, latency_tolerance: float = 0.2,
+                        latency_slack_ms: float = 0.5,
+                        accuracy_tolerance: float = 0.02) -> List[str]:
+    """
+    List regressions against a baseline
+
+    A stage regresses when its p95 is more than latency_tolerance (fraction)
+    plus latency_slack_ms slower. Accuracy metrics regress when they drop by
+    more than accuracy_tolerance.
+    """
+    regressions = []
+
+    for metric in ('precision', 'recall', 'mean_iou', 'label_accuracy'):
+        if metric in baseline and results[metric] < baseline[metric] - accuracy_tolerance:
+            regressions.append(f"{metric}: {results[metric]:.3f} "
+                               f"(baseline {baseline[metric]:.3f})")
+
+    for stage, stats in results['latency_ms'].items():
+        base = baseline.get('latency_ms', {}).get(stage)
+        if base is None:
+            continue
+        limit = base['p95'] * (1 + latency_tolerance) + latency_slack_ms
+        if stats['p95'] > limit:
+            regressions.append(f"{stage} p95: {stats['p95']:.2f} ms "
+                               f"(baseline {base['p95']:.2f} ms)")
+
+    return regressions
+
+
+def print_results(results: Dict):
+    print(f"\n📊 {results['images']} images")
+    print(f"  Precision:      {results['precision']:.3f}")
+    print(f"  Recall:         {results['recall']:.3f}")
+    print(f"  Mean IoU:       {results['mean_iou']:.3f}")
+    print(f"  Label accuracy: {results['label_accuracy']:.3f}")
+    print(f"\n  {'stage':<16s}{'p50':>9s}{'p95':>9s}{'p99':>9s}  (ms)")
+    for stage, stats in results['latency_ms'].items():
+        print(f"  {stage:<16s}{stats['p50']:9.2f}{stats['p95']:9.2f}{stats['p99']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark card detection against marked ground truth")
+    parser.add_argument('marked_dir', help="Directory with *_marked.json files")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="Baseline results file")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Timed runs per image")
+    parser.add_argument('--templates', default=None,
+                        help="Cache (.npz) for the benchmark's template bank; enables rank/suit "
+                             "recognition. Use a separate file from the production cache")
+    parser.add_argument('--train-dir', default=None,
+                        help="Marked images to build templates from (default: split marked_dir)")
+    parser.add_argument('--test-every', type=int, default=2,
+                        help="Without --train-dir, score every Nth marked file and build "
+                             "templates from the rest")
+    parser.add_argument('--pyramid-levels', type=int, default=0,
+                        help="Coarse-to-fine pyramid levels (0 = full resolution)")
+    parser.add_argument('--calibration', default=None,
+                        help="Calibration with camera_corners: detect inside the game area")
+    parser.add_argument('--identity-cache', action='store_true',
+                        help="Cache identities by corner hash (repeats after the first "
+                             "run per image hit the cache)")
+    args = parser.parse_args()
+
+    marked_files = find_marked_files(args.marked_dir)
+    recognizer = None
+    if args.templates:
+        if args.train_dir:
+            train_files = find_marked_files(args.train_dir)
+            train_paths = {os.path.realpath(f) for f in train_files}
+            marked_files = [f for f in marked_files if os.path.realpath(f) not in train_paths]
+        else:
+            train_files, marked_files = split_marked_files(marked_files, args.test_every)
+        if not train_files or not marked_files:
+            print(f"❌ Need marked images both to build templates from ({len(train_files)}) "
+                  f"and to score ({len(marked_files)}); use --train-dir or add more")
+            sys.exit(1)
+        print(f"🃏 Templates from {len(train_files)} marked images, "
+              f"scoring {len(marked_files)} held-out images")
+        recognizer = CardRecognizer.load(args.templates, marked_files=train_files)
+    detector = CardDetector(recognizer=recognizer, pyramid_levels=args.pyramid_levels,
+                            identity_cache=IdentityCache() if args.identity_cache else None,
+                            instrumentation=Instrumentation(), quiet=True)
+    if args.calibration:
+        game_area = GameArea.from_calibration(args.calibration)
+        if game_area is None:
+            sys.exit(1)
+        detector.set_game_area(game_area)
+
+    results = run_benchmark(args.marked_dir, detector, repeat=args.repeat,
+                            marked_files=marked_files)
+    if results is None:
+        sys.exit(1)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ No baseline at {args.baseline} (use --save-baseline)")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\n✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,12 @@ import numpy as np
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
 
+from CardDetection.card_recognizer import CardRecognizer, card_corner
+from CardDetection.frame_grabber import FrameGrabber, GrabberStats
+from CardDetection.game_area import GameArea
+from CardDetection.identity_cache import IdentityCache, corner_hash
+from CardDetection.instrumentation import Instrumentation, NullInstrumentation
+
 
 @dataclass
 class Card:
@@ -26,22 +32,52 @@ class Card:
 class CardDetector:
     """Detects and identifies playing cards from camera feed"""
     
-    def __init__(self, camera_index: int = 0, debug: bool = False):
+    def __init__(self, camera_index: int = 0, debug: bool = False,
+                 recognizer: Optional[CardRecognizer] = None,
+                 identity_cache: Optional[IdentityCache] = None,
+                 pyramid_levels: int = 0,
+                 instrumentation: Optional[Instrumentation] = None,
+                 quiet: bool = False):
         """
         Initialize card detector
         
         Args:
             camera_index: Camera device index (0 for default webcam)
             debug: If True, show debug windows with detection visualization
+            recognizer: Template-matching rank/suit recognizer. If None, only
+                        the red/black color guess is made (rank "?").
+            identity_cache: LRU cache of identities keyed by corner hash, so
+                            card faces seen before skip recognition
+            pyramid_levels: If > 0, find card candidates on an image
+                            downscaled by 2**pyramid_levels and refine them
+                            at full resolution (2 = quarter scale)
+            instrumentation: Collects per-stage timings (preprocess,
+                             threshold, contour, filter, identify, detect).
+                             None disables timing at negligible cost.
+            quiet: If True, don't print a line for every detect_cards() call
         """
         self.camera_index = camera_index
         self.debug = debug
+        self.recognizer = recognizer
+        self.identity_cache = identity_cache
+        self.pyramid_levels = pyramid_levels
+        self.instrumentation = instrumentation or NullInstrumentation()
+        self.quiet = quiet
+        self.game_area = None
         self.cap = None
+        self.grabber = None
         
         # Card dimensions (will be refined during detection)
         self.expected_card_ratio = 0.7  # Height/width ratio for standard playing cards
         self.min_card_area = 2000  # Minimum pixel area for a card
         self.max_card_area = 50000  # Maximum pixel area for a card
+        self.min_aspect_ratio = 1.2  # Cards are taller than wide
+        self.max_aspect_ratio = 1.8
+        
+        # Preprocessing at full resolution (scaled down for pyramid levels)
+        self.blur_ksize = 5
+        self.threshold_block_size = 11
+        self.threshold_c = 2
         
         # Color ranges for suit detection (HSV)
         self.red_ranges = [
@@ -52,8 +88,20 @@ class CardDetector:
         
         print("🎴 Card Detector initialized")
     
-    def start_camera(self) -> bool:
-        """Initialize camera capture"""
+    def start_camera(self, threaded: bool = False, latest_only: bool = True,
+                     buffer_size: int = 2) -> bool:
+        """
+        Initialize camera capture
+        
+        Args:
+            threaded: If True, read frames on a background thread so
+                      capture_frame() returns the newest frame without
+                      waiting on camera I/O
+            latest_only: (threaded mode) Return the newest frame immediately,
+                         even if it was already returned, instead of waiting
+                         for a fresh one
+            buffer_size: (threaded mode) Ring buffer length
+        """
         self.cap = cv2.VideoCapture(self.camera_index)
         
         if not self.cap.isOpened():
@@ -65,7 +113,17 @@ class CardDetector:
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
         self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
         
+        if threaded:
+            # Keep the driver queue short so the grabber sees fresh frames
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.grabber = FrameGrabber(self.cap, buffer_size=buffer_size,
+                                        latest_only=latest_only)
+            self.grabber.start()
+        
         print(f"✓ Camera {self.camera_index} opened successfully")
+        if threaded:
+            mode = "latest only" if latest_only else "wait for new frame"
+            print(f"  Background capture thread running ({mode})")
         return True
     
     def capture_frame(self) -> Optional[np.ndarray]:
@@ -74,13 +132,36 @@ class CardDetector:
             print("❌ Camera not initialized")
             return None
         
-        ret, frame = self.cap.read()
+        if self.grabber is not None:
+            ret, frame = self.grabber.read()
+        else:
+            ret, frame = self.cap.read()
         if not ret:
             print("❌ Failed to capture frame")
             return None
         
         return frame
     
+    def get_capture_stats(self) -> Optional[GrabberStats]:
+        """Dropped-frame and latency counters (threaded capture only)"""
+        if self.grabber is None:
+            return None
+        return self.grabber.get_stats()
+    
+    def set_game_area(self, game_area: Optional[GameArea]):
+        """
+        Restrict detection to the calibrated iPad game area
+        
+        When set, detect_cards() only processes the perspective-rectified
+        game area, and card positions/bboxes are reported in iPad pixels
+        (ready for CoordinateMapper.ipad_to_plotter). Pass None to go back
+        to full-frame detection in camera pixels.
+        """
+        self.game_area = game_area
+        if game_area is not None:
+            w, h = game_area.size
+            print(f"✓ Game area ROI enabled ({w}x{h} rectified pixels)")
+    
     def detect_cards(self, frame: np.ndarray) -> List[Card]:
         """
         Detect all playing cards in the frame
@@ -89,79 +170,281 @@ class CardDetector:
             frame: BGR image from camera
             
         Returns:
-            List of detected Card objects
+            List of detected Card objects. Coordinates are camera pixels, or
+            iPad pixels when a game area is set (see set_game_area)
         """
         if frame is None:
             return []
         
-        # Preprocess image
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        with self.instrumentation.stage('detect'):
+            image, area_scale = self._working_image(frame)
+            cards = self._detect_in_image(image, area_scale)
+            return self._finish_detection(image, cards)
+    
+    def _working_image(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Image that detection runs on, and the card area scale for it
         
-        # Adaptive thresholding to handle varying lighting
-        thresh = cv2.adaptiveThreshold(
-            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY_INV, 11, 2
-        )
+        Without a game area this is the camera frame itself. With one, only
+        the rectified game area is processed; area thresholds are tuned in
+        camera pixels, so they are converted to rectified pixels.
+        """
+        if self.game_area is None:
+            return frame, 1.0
+        return self.game_area.rectify(frame), 1.0 / self.game_area.area_ratio
+    
+    def _finish_detection(self, image: np.ndarray, cards: List[Card]) -> List[Card]:
+        """Debug output, then convert working-image cards to output coordinates"""
+        if self.debug:
+            self._draw_debug_info(image, cards)
         
-        # Find contours
-        contours, _ = cv2.findContours(
-            thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        if not self.quiet:
+            print(f"🎴 Detected {len(cards)} cards")
+        
+        if self.game_area is not None:
+            cards = [self._roi_card_to_ipad(card) for card in cards]
+        return cards
+    
+    def _roi_card_to_ipad(self, card: Card) -> Card:
+        """Convert a card detected in the rectified game area to iPad pixels"""
+        area = self.game_area
+        x, y, w, h = card.bbox
+        (ix, iy), (cx, cy) = area.rectified_to_ipad([(x, y), card.position])
+        return Card(
+            rank=card.rank,
+            suit=card.suit,
+            position=(int(round(cx)), int(round(cy))),
+            bbox=(int(round(ix)), int(round(iy)),
+                  int(round(w / area.scale)), int(round(h / area.scale))),
+            confidence=card.confidence
         )
+    
+    def _detect_in_image(self, frame: np.ndarray, area_scale: float = 1.0) -> List[Card]:
+        """Run the detection pipeline on an image, in that image's pixels"""
+        if self.pyramid_levels > 0:
+            return self._detect_pyramid(frame, area_scale)
         
-        detected_cards = []
+        timer = self.instrumentation
         
-        # Analyze each contour
-        for contour in contours:
-            card = self._analyze_contour(contour, frame, gray)
-            if card:
-                detected_cards.append(card)
+        with timer.stage('preprocess'):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            blurred = self._blur(gray)
         
-        if self.debug:
-            self._draw_debug_info(frame, detected_cards)
+        with timer.stage('threshold'):
+            thresh = self._threshold(blurred)
+        
+        with timer.stage('contour'):
+            contours = self._contours(thresh)
         
-        print(f"🎴 Detected {len(detected_cards)} cards")
-        return detected_cards
+        # Filter all contours at once, identify only the survivors
+        with timer.stage('filter'):
+            boxes = self._candidate_boxes(contours, area_scale)
+        
+        with timer.stage('identify'):
+            return self._cards_from_boxes(frame, boxes.tolist())
     
-    def _analyze_contour(self, contour, frame: np.ndarray, 
-                        gray: np.ndarray) -> Optional[Card]:
-        """Analyze a contour to determine if it's a card"""
-        area = cv2.contourArea(contour)
+    def _find_contours(self, gray: np.ndarray, level: int = 0) -> list:
+        """
+        Blur, threshold and contour a grayscale image
         
-        # Filter by area
-        if area < self.min_card_area or area > self.max_card_area:
-            return None
+        Args:
+            gray: Grayscale image
+            level: Pyramid level of the image; kernel sizes shrink by 2**level
+        """
+        blurred = self._blur(gray, level)
+        thresh = self._threshold(blurred, level)
+        return self._contours(thresh)
+    
+    def _blur(self, gray: np.ndarray, level: int = 0) -> np.ndarray:
+        """Gaussian blur to suppress sensor noise"""
+        blur_ksize = self._scaled_kernel(self.blur_ksize, level)
+        return cv2.GaussianBlur(gray, (blur_ksize, blur_ksize), 0)
+    
+    def _threshold(self, blurred: np.ndarray, level: int = 0) -> np.ndarray:
+        """Adaptive thresholding to handle varying lighting"""
+        block_size = self._scaled_kernel(self.threshold_block_size, level)
+        return cv2.adaptiveThreshold(
+            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            cv2.THRESH_BINARY_INV, block_size, self.threshold_c
+        )
+    
+    @staticmethod
+    def _contours(thresh: np.ndarray) -> list:
+        """Outer contours of a thresholded image"""
+        contours, _ = cv2.findContours(
+            thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        return contours
+    
+    @staticmethod
+    def _scaled_kernel(size: int, level: int) -> int:
+        """Kernel size for a pyramid level (odd, at least 3)"""
+        scaled = int(round(size / (2 ** level)))
+        if scaled % 2 == 0:
+            scaled += 1
+        return max(3, scaled)
+    
+    def _detect_pyramid(self, frame: np.ndarray, area_scale: float = 1.0) -> List[Card]:
+        """
+        Coarse-to-fine detection
         
-        # Get bounding rectangle
-        x, y, w, h = cv2.boundingRect(contour)
+        Card candidates are found on a downscaled copy of the image. Each
+        candidate's boundary is then refined at full resolution inside its
+        own box, and the corner glyphs are read at full resolution.
+        """
+        timer = self.instrumentation
+        levels = self.pyramid_levels
+        factor = 2 ** levels
+        
+        with timer.stage('preprocess'):
+            small = frame
+            for _ in range(levels):
+                small = cv2.pyrDown(small)
+            gray_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            blurred = self._blur(gray_small, level=levels)
+        
+        with timer.stage('threshold'):
+            thresh = self._threshold(blurred, level=levels)
+        
+        with timer.stage('contour'):
+            contours = self._contours(thresh)
+        
+        # Candidates at coarse scale - areas shrink by factor**2
+        with timer.stage('filter'):
+            candidates = self._candidate_boxes(contours, area_scale / (factor * factor))
+        if len(candidates) == 0:
+            return []
         
-        # Check aspect ratio (cards are taller than wide)
-        aspect_ratio = h / w if w > 0 else 0
-        if aspect_ratio < 1.2 or aspect_ratio > 1.8:
-            return None
+        # Refine each candidate at full resolution
+        with timer.stage('refine'):
+            height, width = frame.shape[:2]
+            pad = 2 * factor
+            boxes = []
+            for x, y, w, h in (candidates * factor).tolist():
+                x0, y0 = max(x - pad, 0), max(y - pad, 0)
+                x1, y1 = min(x + w + pad, width), min(y + h + pad, height)
+                crop = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+                refined = self._candidate_boxes(self._find_contours(crop), area_scale)
+                if len(refined) == 0:
+                    boxes.append((x, y, w, h))
+                    continue
+                # The card outline is the largest contour in its own box
+                rx, ry, rw, rh = max(refined.tolist(), key=lambda b: b[2] * b[3])
+                boxes.append((rx + x0, ry + y0, rw, rh))
+        
+        with timer.stage('identify'):
+            return self._cards_from_boxes(frame, boxes)
+    
+    def _candidate_boxes(self, contours, area_scale: float = 1.0) -> np.ndarray:
+        """Bounding boxes of contours passing the area and aspect ratio filters"""
+        if len(contours) == 0:
+            return np.zeros((0, 4), dtype=np.int64)
+        
+        areas, boxes = self._contour_geometry(contours)
+        
+        w = boxes[:, 2]
+        h = boxes[:, 3]
+        aspect = np.divide(h, w, out=np.zeros(len(w)), where=w > 0)
+        
+        min_area = self.min_card_area * area_scale
+        max_area = self.max_card_area * area_scale
+        keep = ((areas >= min_area) & (areas <= max_area) &
+                (aspect >= self.min_aspect_ratio) & (aspect <= self.max_aspect_ratio))
+        return boxes[keep]
+    
+    def _cards_from_boxes(self, frame: np.ndarray,
+                          boxes: List[Tuple[int, int, int, int]]) -> List[Card]:
+        """Identify the cards in a list of bounding boxes"""
+        identities = self._identify_cards(frame, boxes)
+        
+        cards = []
+        for (x, y, w, h), (rank, suit, confidence) in zip(boxes, identities):
+            cards.append(Card(
+                rank=rank,
+                suit=suit,
+                position=(x + w // 2, y + h // 2),
+                bbox=(x, y, w, h),
+                confidence=confidence
+            ))
+        
+        return cards
+    
+    @staticmethod
+    def _contour_geometry(contours) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Areas and bounding boxes for a list of contours in one pass
         
-        # Get card center
-        center_x = x + w // 2
-        center_y = y + h // 2
+        Equivalent to calling cv2.contourArea and cv2.boundingRect on each
+        contour, but done on the concatenated point array.
         
-        # Extract rank and suit (simplified for now)
-        rank, suit, confidence = self._identify_card(frame, x, y, w, h)
+        Returns:
+            (areas, boxes) - float array of shape (N,) and int array of
+            shape (N, 4) with (x, y, width, height) rows
+        """
+        lengths = np.fromiter((len(c) for c in contours), dtype=np.int64,
+                              count=len(contours))
+        points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+        starts = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        
+        # Bounding boxes: per-contour min/max of the point coordinates
+        mins = np.minimum.reduceat(points, starts, axis=0)
+        maxs = np.maximum.reduceat(points, starts, axis=0)
+        boxes = np.hstack([mins, maxs - mins + 1])
+        
+        # Areas: shoelace formula, each point paired with the next point
+        # of the same contour (wrapping around at the end)
+        nxt = np.arange(1, len(points) + 1)
+        nxt[starts + lengths - 1] = starts
+        xs, ys = points[:, 0], points[:, 1]
+        cross = xs * ys[nxt] - xs[nxt] * ys
+        areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+        
+        return areas, boxes
+    
+    def _identify_cards(self, frame: np.ndarray,
+                        boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[str, str, float]]:
+        """
+        Identify the rank and suit of several cards
         
-        return Card(
-            rank=rank,
-            suit=suit,
-            position=(center_x, center_y),
-            bbox=(x, y, w, h),
-            confidence=confidence
-        )
+        Cards whose corner hash is in the identity cache reuse the cached
+        result. The rest are matched against the template bank in one
+        batched pass (or _identify_card per card without a recognizer).
+        """
+        if self.identity_cache is None:
+            return self._identify_uncached(frame, boxes)
+        
+        # Blank corners have no hash and are always identified afresh
+        keys = [corner_hash(card_corner(frame, *box)) for box in boxes]
+        identities = [self.identity_cache.get(key) if key is not None else None for key in keys]
+        
+        # Called even with nothing missing, so the recognizer's timing
+        # stats describe this frame
+        missing = [i for i, identity in enumerate(identities) if identity is None]
+        fresh = self._identify_uncached(frame, [boxes[i] for i in missing])
+        for i, identity in zip(missing, fresh):
+            self.identity_cache.put(keys[i], identity)
+            identities[i] = identity
+        
+        return identities
+    
+    def _identify_uncached(self, frame: np.ndarray,
+                           boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[str, str, float]]:
+        """Identify cards without consulting the identity cache"""
+        if self.recognizer is None:
+            return [self._identify_card(frame, *box) for box in boxes]
+        
+        is_red = [self._detect_red(cv2.cvtColor(card_corner(frame, *box), cv2.COLOR_BGR2HSV))
+                  for box in boxes]
+        return self.recognizer.identify_batch(frame, boxes, is_red)
     
     def _identify_card(self, frame: np.ndarray, x: int, y: int, 
                       w: int, h: int) -> Tuple[str, str, float]:
         """
         Identify the rank and suit of a card
         
-        This is a simplified version - you'll want to enhance this with
-        template matching or ML-based recognition
+        Uses the template recognizer when one is configured; otherwise only
+        the color is detected and the rank is reported as "?"
         
         Args:
             frame: Full frame image
@@ -170,13 +453,8 @@ class CardDetector:
         Returns:
             (rank, suit, confidence)
         """
-        # Extract card region
-        card_roi = frame[y:y+h, x:x+w]
-        
-        # For now, extract just the top-left corner where rank/suit typically are
-        corner_h = h // 4
-        corner_w = w // 3
-        corner_roi = card_roi[0:corner_h, 0:corner_w]
+        # Extract the top-left corner where rank/suit are printed
+        corner_roi = card_corner(frame, x, y, w, h)
         
         # Convert to HSV for color detection
         hsv = cv2.cvtColor(corner_roi, cv2.COLOR_BGR2HSV)
@@ -184,7 +462,10 @@ class CardDetector:
         # Detect suit by color
         is_red = self._detect_red(hsv)
         
-        # Placeholder rank detection (you'll enhance this)
+        if self.recognizer is not None:
+            return self.recognizer.identify_batch(frame, [(x, y, w, h)], [is_red])[0]
+        
+        # No recognizer - color guess only
         rank = "?"
         suit = "hearts" if is_red else "spades"  # Simplified
         confidence = 0.5  # Placeholder
@@ -199,6 +480,8 @@ class CardDetector:
         
         red_pixels = cv2.countNonZero(red_mask)
         total_pixels = hsv.shape[0] * hsv.shape[1]
+        if total_pixels == 0:
+            return False
         
         return (red_pixels / total_pixels) > 0.05  # >5% red pixels
     
@@ -226,6 +509,9 @@ class CardDetector:
     
     def close(self):
         """Release camera resources"""
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
         if self.cap:
             self.cap.release()
         cv2.destroyAllWindows()
@@ -240,9 +526,16 @@ def test_card_detection():
     print("="*60)
     print("\nPress 'q' to quit, 's' to capture and analyze")
     
-    detector = CardDetector(camera_index=0, debug=True)
+    recognizer = CardRecognizer.load()
+    detector = CardDetector(camera_index=0, debug=True, recognizer=recognizer,
+                            identity_cache=IdentityCache())
+    
+    # Only analyze the iPad game area if the camera has been calibrated
+    game_area = GameArea.from_calibration('calibration.json')
+    if game_area is not None:
+        detector.set_game_area(game_area)
     
-    if not detector.start_camera():
+    if not detector.start_camera(threaded=True):
         return
     
     try:
@@ -263,6 +556,9 @@ def test_card_detection():
                 cards = detector.detect_cards(frame)
                 for card in cards:
                     print(f"  {card}")
+                print(f"  Capture: {detector.get_capture_stats()}")
+                print(f"  Identification: {recognizer.last_ms_per_card:.2f} ms/card")
+                print(f"  {detector.identity_cache}")
                 print()
     
     except KeyboardInterrupt:
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Card Rank/Suit Recognizer
+Matches card corner glyphs against a precomputed template bank using
+normalized cross-correlation
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+SUITS = ['hearts', 'diamonds', 'clubs', 'spades']
+RED_SUITS = ('hearts', 'diamonds')
+
+# Normalized glyph sizes (width, height)
+RANK_GLYPH_SIZE = (24, 32)
+SUIT_GLYPH_SIZE = (24, 24)
+
+# Fraction of the corner ROI height holding the rank, used when no gap
+# between the rank and suit glyphs is visible
+RANK_SPLIT = 0.55
+
+BANK_VERSION = 1
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'card_templates.npz')
+
+
+def card_corner(frame: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
+    """Top-left corner of a card, where the rank and suit are printed"""
+    return frame[y:y + h // 4, x:x + w // 3]
+
+
+def clean_corner(corner: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Grayscale corner with non-glyph ink removed
+
+    Args:
+        corner: BGR or grayscale corner ROI (non-empty)
+
+    Returns:
+        (gray, ink_threshold) - pixels <= ink_threshold are glyph ink
+    """
+    if corner.ndim == 3:
+        corner = cv2.cvtColor(corner, cv2.COLOR_BGR2GRAY)
+
+    # Separate ink from card background
+    ink_threshold, _ = cv2.threshold(corner, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = (corner <= ink_threshold).astype(np.uint8)
+
+    # Dark regions touching the top/left edge are table or card border
+    # (loose bounding boxes), not glyphs - paint them white
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    border = np.zeros(n, dtype=bool)
+    border[1:] = (stats[1:, cv2.CC_STAT_LEFT] == 0) | (stats[1:, cv2.CC_STAT_TOP] == 0)
+    if border.any():
+        corner = corner.copy()
+        corner[border[labels]] = 255
+
+    return corner, ink_threshold
+
+
+def normalize_corner(corner: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Corner cropped to its glyph ink and resized, independent of bbox jitter"""
+    if corner.size == 0:
+        return np.full(size[::-1], 255, np.uint8)
+    gray, ink_threshold = clean_corner(corner)
+    return cv2.resize(_crop_ink(gray, threshold=ink_threshold + 1), size,
+                      interpolation=cv2.INTER_AREA)
+
+
+def split_corner(corner: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalize a corner ROI into rank and suit glyph images
+
+    Args:
+        corner: BGR or grayscale corner ROI
+
+    Returns:
+        (rank_glyph, suit_glyph) - uint8 grayscale images with dark ink on white
+    """
+    if corner.size == 0:
+        return (np.full(RANK_GLYPH_SIZE[::-1], 255, np.uint8),
+                np.full(SUIT_GLYPH_SIZE[::-1], 255, np.uint8))
+
+    corner, ink_threshold = clean_corner(corner)
+
+    # Crop each glyph to its ink so matching ignores position and scale
+    split = _glyph_split(corner <= ink_threshold)
+    rank = _crop_ink(corner[:split], threshold=ink_threshold + 1)
+    suit = _crop_ink(corner[split:] if split < corner.shape[0] else corner,
+                     threshold=ink_threshold + 1)
+    rank = cv2.resize(rank, RANK_GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+    suit = cv2.resize(suit, SUIT_GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+    return rank, suit
+
+
+def _glyph_split(ink: np.ndarray) -> int:
+    """Row between the rank and suit glyphs: the first blank gap after the rank ink"""
+    rows = np.flatnonzero(ink.any(axis=1))
+    if len(rows) > 1:
+        gaps = np.flatnonzero(np.diff(rows) > 1)
+        if len(gaps):
+            return int(rows[gaps[0]] + rows[gaps[0] + 1] + 1) // 2
+    # No visible gap - fall back to the usual layout
+    return max(1, int(ink.shape[0] * RANK_SPLIT))
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-norm rows so a dot product is a normalized cross-correlation"""
+    vectors = vectors.astype(np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class TemplateBank:
+    """Rank and suit glyph templates, stored as uint8 images"""
+
+    def __init__(self, rank_glyphs: np.ndarray, rank_labels: np.ndarray,
+                 suit_glyphs: np.ndarray, suit_labels: np.ndarray,
+                 fingerprint: str = ""):
+        """
+        Args:
+            rank_glyphs: (N, h, w) uint8 rank templates
+            rank_labels: (N,) index into RANKS for each template
+            suit_glyphs: (M, h, w) uint8 suit templates
+            suit_labels: (M,) index into SUITS for each template
+            fingerprint: Identifies the source data the bank was built from
+        """
+        self.rank_glyphs = rank_glyphs
+        self.rank_labels = rank_labels
+        self.suit_glyphs = suit_glyphs
+        self.suit_labels = suit_labels
+        self.fingerprint = fingerprint
+
+        # Matching matrices (templates flattened and normalized once)
+        self.rank_matrix = _normalize_rows(rank_glyphs.reshape(len(rank_glyphs), -1))
+        self.suit_matrix = _normalize_rows(suit_glyphs.reshape(len(suit_glyphs), -1))
+
+    @classmethod
+    def synthetic(cls) -> 'TemplateBank':
+        """Build templates by rendering rank text and drawing suit shapes"""
+        rank_glyphs, rank_labels = [], []
+        for label, rank in enumerate(RANKS):
+            for thickness in (2, 3):
+                rank_glyphs.append(_render_rank(rank, thickness))
+                rank_labels.append(label)
+
+        suit_glyphs, suit_labels = [], []
+        for label, suit in enumerate(SUITS):
+            suit_glyphs.append(_render_suit(suit))
+            suit_labels.append(label)
+
+        return cls(np.array(rank_glyphs), np.array(rank_labels),
+                   np.array(suit_glyphs), np.array(suit_labels),
+                   fingerprint="synthetic")
+
+    @classmethod
+    def from_marked_images(cls, marked_files: Sequence[str]) -> Optional['TemplateBank']:
+        """
+        Build templates from CardMarker ground truth (*_marked.json)
+
+        Every labelled card contributes its corner as one template, so the
+        bank matches the actual font and rendering of the game.
+        """
+        rank_glyphs, rank_labels = [], []
+        suit_glyphs, suit_labels = [], []
+
+        for marked_file in marked_files:
+            with open(marked_file, 'r') as f:
+                data = json.load(f)
+
+            image_path = resolve_marked_image(marked_file, data['image_file'])
+            image = cv2.imread(image_path) if image_path else None
+            if image is None:
+                print(f"⚠ Skipping {marked_file}: image not found")
+                continue
+
+            for card in data['cards']:
+                if card['rank'] not in RANKS or card['suit'] not in SUITS:
+                    continue
+                x, y, w, h = card['bbox']
+                rank, suit = split_corner(card_corner(image, x, y, w, h))
+                rank_glyphs.append(rank)
+                rank_labels.append(RANKS.index(card['rank']))
+                suit_glyphs.append(suit)
+                suit_labels.append(SUITS.index(card['suit']))
+
+        if not rank_glyphs:
+            return None
+
+        return cls(np.array(rank_glyphs), np.array(rank_labels),
+                   np.array(suit_glyphs), np.array(suit_labels),
+                   fingerprint=_fingerprint(marked_files))
+
+    @classmethod
+    def load_or_build(cls, cache_path: str = DEFAULT_CACHE,
+                      marked_dir: Optional[str] = None,
+                      marked_files: Optional[Sequence[str]] = None) -> 'TemplateBank':
+        """
+        Load the template bank from its cache, rebuilding it if the source changed
+
+        Args:
+            cache_path: .npz archive holding the bank
+            marked_dir: Directory with *_marked.json files. If None or empty,
+                        synthetic templates are used.
+            marked_files: Build from exactly these *_marked.json files
+                          instead of all of marked_dir
+        """
+        if marked_files is not None:
+            marked_files = sorted(marked_files)
+        else:
+            marked_files = sorted(glob.glob(os.path.join(marked_dir, '*_marked.json'))) \
+                if marked_dir else []
+        fingerprint = _fingerprint(marked_files) if marked_files else "synthetic"
+
+        if os.path.exists(cache_path):
+            bank = cls.load(cache_path)
+            if bank is not None and bank.fingerprint == fingerprint:
+                return bank
+
+        bank = cls.from_marked_images(marked_files) if marked_files else None
+        if bank is None:
+            bank = cls.synthetic()
+        bank.fingerprint = fingerprint
+        bank.save(cache_path)
+        print(f"✓ Built template bank: {len(bank.rank_glyphs)} rank, "
+              f"{len(bank.suit_glyphs)} suit templates → {cache_path}")
+        return bank
+
+    def save(self, cache_path: str):
+        """Write the bank as a compressed NumPy archive"""
+        np.savez_compressed(
+            cache_path,
+            version=np.array(BANK_VERSION),
+            fingerprint=np.array(self.fingerprint),
+            rank_glyphs=self.rank_glyphs.astype(np.uint8),
+            rank_labels=self.rank_labels.astype(np.uint8),
+            suit_glyphs=self.suit_glyphs.astype(np.uint8),
+            suit_labels=self.suit_labels.astype(np.uint8)
+        )
+
+    @classmethod
+    def load(cls, cache_path: str) -> Optional['TemplateBank']:
+        """Read a bank written by save(), or None if it is stale or unreadable"""
+        try:
+            with np.load(cache_path) as data:
+                if int(data['version']) != BANK_VERSION:
+                    return None
+                return cls(data['rank_glyphs'], data['rank_labels'],
+                           data['suit_glyphs'], data['suit_labels'],
+                           fingerprint=str(data['fingerprint']))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠ Could not read template cache {cache_path}: {e}")
+            return None
+
+
+class CardRecognizer:
+    """Identifies rank and suit of many cards in a single matching pass"""
+
+    def __init__(self, bank: TemplateBank, min_confidence: float = 0.4):
+        """
+        Args:
+            bank: Template bank to match against
+            min_confidence: Rank matches below this score are reported as '?'
+        """
+        self.bank = bank
+        self.min_confidence = min_confidence
+
+        # Latency of the last identify_batch() call
+        self.last_batch_ms = 0.0
+        self.last_ms_per_card = 0.0
+
+    @classmethod
+    def load(cls, cache_path: str = DEFAULT_CACHE, marked_dir: Optional[str] = None,
+             marked_files: Optional[Sequence[str]] = None, **kwargs) -> 'CardRecognizer':
+        """Create a recognizer with a cached template bank"""
+        return cls(TemplateBank.load_or_build(cache_path, marked_dir, marked_files), **kwargs)
+
+    def identify_batch(self, frame: np.ndarray,
+                       boxes: Sequence[Tuple[int, int, int, int]],
+                       is_red: Optional[Sequence[bool]] = None
+                       ) -> List[Tuple[str, str, float]]:
+        """
+        Identify every card in one pass
+
+        Args:
+            frame: Full BGR frame
+            boxes: (x, y, w, h) card bounding boxes
+            is_red: Optional red/black color detection per card, used to
+                    rule out suits of the wrong color
+
+        Returns:
+            List of (rank, suit, confidence) per box
+        """
+        start = time.perf_counter()
+        if len(boxes) == 0:
+            self.last_batch_ms = 0.0
+            self.last_ms_per_card = 0.0
+            return []
+
+        glyphs = [split_corner(card_corner(frame, *box)) for box in boxes]
+        ranks = np.array([g[0] for g in glyphs]).reshape(len(glyphs), -1)
+        suits = np.array([g[1] for g in glyphs]).reshape(len(glyphs), -1)
+
+        results = self.match(ranks, suits, is_red)
+
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        self.last_ms_per_card = self.last_batch_ms / len(boxes)
+        return results
+
+    def match(self, rank_vectors: np.ndarray, suit_vectors: np.ndarray,
+              is_red: Optional[Sequence[bool]] = None) -> List[Tuple[str, str, float]]:
+        """
+        Match flattened rank/suit glyphs against the bank
+
+        One matrix product per glyph type scores every card against every
+        template; a label's score is the best of its templates.
+        """
+        bank = self.bank
+        rank_scores = _normalize_rows(rank_vectors) @ bank.rank_matrix.T
+        suit_scores = _normalize_rows(suit_vectors) @ bank.suit_matrix.T
+
+        rank_best = _best_per_label(rank_scores, bank.rank_labels, len(RANKS))
+        suit_best = _best_per_label(suit_scores, bank.suit_labels, len(SUITS))
+
+        if is_red is not None:
+            red = np.asarray(is_red, dtype=bool)[:, None]
+            suit_is_red = np.array([s in RED_SUITS for s in SUITS])[None, :]
+            suit_best = np.where(red == suit_is_red, suit_best, -1.0)
+
+        rank_idx = rank_best.argmax(axis=1)
+        suit_idx = suit_best.argmax(axis=1)
+        rank_conf = np.clip(rank_best[np.arange(len(rank_idx)), rank_idx], 0.0, 1.0)
+        suit_conf = np.clip(suit_best[np.arange(len(suit_idx)), suit_idx], 0.0, 1.0)
+
+        results = []
+        for r, s, rc, sc in zip(rank_idx, suit_idx, rank_conf, suit_conf):
+            if rc < self.min_confidence:
+                results.append(("?", SUITS[s], float(min(rc, sc))))
+            else:
+                results.append((RANKS[r], SUITS[s], float(min(rc, sc))))
+        return results
+
+
+def _best_per_label(scores: np.ndarray, labels: np.ndarray, n_labels: int) -> np.ndarray:
+    """Reduce (cards, templates) scores to (cards, labels) by taking the max"""
+    best = np.full((scores.shape[0], n_labels), -1.0, dtype=np.float32)
+    for label in range(n_labels):
+        columns = labels == label
+        if columns.any():
+            best[:, label] = scores[:, columns].max(axis=1)
+    return best
+
+
+def _render_rank(rank: str, thickness: int) -> np.ndarray:
+    """Draw a rank character as a normalized glyph"""
+    w, h = RANK_GLYPH_SIZE
+    canvas = np.full((h * 4, w * 4), 255, np.uint8)
+    (tw, th), baseline = cv2.getTextSize(rank, cv2.FONT_HERSHEY_SIMPLEX, 3, thickness * 3)
+    cv2.putText(canvas, rank, ((canvas.shape[1] - tw) // 2, (canvas.shape[0] + th) // 2),
+                cv2.FONT_HERSHEY_SIMPLEX, 3, 0, thickness * 3, cv2.LINE_AA)
+    return cv2.resize(_crop_ink(canvas), RANK_GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def _render_suit(suit: str) -> np.ndarray:
+    """Draw a suit symbol as a normalized glyph"""
+    size = 96
+    canvas = np.full((size, size), 255, np.uint8)
+    c = size // 2
+
+    if suit == 'hearts':
+        cv2.circle(canvas, (c - 18, c - 12), 20, 0, -1)
+        cv2.circle(canvas, (c + 18, c - 12), 20, 0, -1)
+        cv2.fillPoly(canvas, [np.array([[c - 37, c - 6], [c + 37, c - 6], [c, c + 40]])], 0)
+    elif suit == 'diamonds':
+        cv2.fillPoly(canvas, [np.array([[c, c - 42], [c + 30, c], [c, c + 42], [c - 30, c]])], 0)
+    elif suit == 'clubs':
+        cv2.circle(canvas, (c, c - 20), 17, 0, -1)
+        cv2.circle(canvas, (c - 20, c + 8), 17, 0, -1)
+        cv2.circle(canvas, (c + 20, c + 8), 17, 0, -1)
+        cv2.fillPoly(canvas, [np.array([[c - 5, c], [c + 5, c], [c + 12, c + 40], [c - 12, c + 40]])], 0)
+    elif suit == 'spades':
+        cv2.circle(canvas, (c - 17, c + 8), 18, 0, -1)
+        cv2.circle(canvas, (c + 17, c + 8), 18, 0, -1)
+        cv2.fillPoly(canvas, [np.array([[c - 35, c + 2], [c + 35, c + 2], [c, c - 40]])], 0)
+        cv2.fillPoly(canvas, [np.array([[c - 5, c + 10], [c + 5, c + 10], [c + 12, c + 40], [c - 12, c + 40]])], 0)
+
+    return cv2.resize(_crop_ink(canvas), SUIT_GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def _crop_ink(canvas: np.ndarray, pad: int = 1, threshold: float = 128) -> np.ndarray:
+    """Crop a light image to the bounding box of its dark pixels"""
+    ys, xs = np.nonzero(canvas < threshold)
+    if len(xs) == 0:
+        return canvas
+    y0, y1 = max(ys.min() - pad, 0), min(ys.max() + pad + 1, canvas.shape[0])
+    x0, x1 = max(xs.min() - pad, 0), min(xs.max() + pad + 1, canvas.shape[1])
+    return canvas[y0:y1, x0:x1]
+
+
+def resolve_marked_image(marked_file: str, image_file: str) -> Optional[str]:
+    """Find the image referenced by a *_marked.json file"""
+    candidates = [image_file,
+                  os.path.join(os.path.dirname(marked_file), os.path.basename(image_file))]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _fingerprint(files: Sequence[str]) -> str:
+    """Hash of file names and modification times"""
+    digest = hashlib.sha1()
+    for path in files:
+        digest.update(f"{os.path.abspath(path)}:{os.path.getmtime(path)}".encode())
+    return digest.hexdigest()
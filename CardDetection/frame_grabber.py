@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Threaded Frame Grabber
+Reads camera frames on a background thread so detection never waits on camera I/O
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class GrabberStats:
+    """Counters reported by the frame grabber"""
+    frames_captured: int  # Frames read from the camera
+    frames_delivered: int  # Frames handed to the caller
+    frames_dropped: int  # Frames superseded before anyone read them
+    read_failures: int  # Failed cap.read() calls
+    last_latency_ms: float  # Age of the last delivered frame
+    avg_latency_ms: float  # Mean age of delivered frames
+    capture_fps: float  # Camera read rate
+
+    def __repr__(self):
+        return (f"captured={self.frames_captured} delivered={self.frames_delivered} "
+                f"dropped={self.frames_dropped} latency={self.last_latency_ms:.1f}ms "
+                f"fps={self.capture_fps:.1f}")
+
+
+class FrameGrabber:
+    """Continuously reads frames from a cv2.VideoCapture into a small ring buffer"""
+
+    def __init__(self, cap: cv2.VideoCapture, buffer_size: int = 2,
+                 latest_only: bool = True):
+        """
+        Initialize frame grabber
+
+        Args:
+            cap: Opened camera capture
+            buffer_size: Number of frames kept in the ring buffer (2 = double buffer)
+            latest_only: If True, read() returns the newest frame immediately
+                         (possibly the same one twice). If False, read() waits
+                         for a frame that has not been delivered yet.
+        """
+        self.cap = cap
+        self.latest_only = latest_only
+
+        # Ring buffer of (frame_id, timestamp, frame)
+        self._buffer = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        self._next_id = 0
+        self._last_delivered_id = -1
+        self._read_failures = 0
+        self._dropped = 0
+        self._delivered = 0
+        self._latency_total = 0.0
+        self._last_latency = 0.0
+        self._started_at = 0.0
+
+    def start(self):
+        """Start the background capture thread"""
+        if self._running:
+            return
+        self._running = True
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._capture_loop,
+                                        name="FrameGrabber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background capture thread"""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _capture_loop(self):
+        """Read frames as fast as the camera delivers them"""
+        while self._running:
+            ret, frame = self.cap.read()
+            now = time.perf_counter()
+
+            with self._cond:
+                if not ret:
+                    self._read_failures += 1
+                else:
+                    self._buffer.append((self._next_id, now, frame))
+                    self._next_id += 1
+                self._cond.notify_all()
+
+            if not ret:
+                time.sleep(0.01)  # Avoid spinning on a disconnected camera
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Get the newest frame
+
+        Args:
+            timeout: Seconds to wait for a frame when none is available
+
+        Returns:
+            (success, frame) - same shape as cv2.VideoCapture.read()
+        """
+        deadline = time.perf_counter() + timeout
+
+        with self._cond:
+            while True:
+                if self._buffer:
+                    frame_id, timestamp, frame = self._buffer[-1]
+                    if self.latest_only or frame_id > self._last_delivered_id:
+                        break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self._running:
+                    return False, None
+                self._cond.wait(remaining)
+
+            # Frames captured between the previous read and this one are never used
+            if frame_id > self._last_delivered_id:
+                self._dropped += frame_id - self._last_delivered_id - 1
+                self._last_delivered_id = frame_id
+
+            self._delivered += 1
+            self._last_latency = time.perf_counter() - timestamp
+            self._latency_total += self._last_latency
+
+        return True, frame
+
+    def get_stats(self) -> GrabberStats:
+        """Snapshot of the capture counters"""
+        with self._cond:
+            elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+            avg_latency = self._latency_total / self._delivered if self._delivered else 0.0
+            return GrabberStats(
+                frames_captured=self._next_id,
+                frames_delivered=self._delivered,
+                frames_dropped=self._dropped,
+                read_failures=self._read_failures,
+                last_latency_ms=self._last_latency * 1000,
+                avg_latency_ms=avg_latency * 1000,
+                capture_fps=self._next_id / elapsed if elapsed > 0 else 0.0
+            )
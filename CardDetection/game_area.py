@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Game Area Region of Interest
+Maps the calibrated iPad game area into camera space so detection only
+processes the pixels that matter
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from Calibration.LoadCalibration_Smart import load_calibration
+
+
+class GameArea:
+    """Perspective-rectified crop of the iPad game area"""
+
+    def __init__(self, camera_corners: Sequence[Tuple[float, float]],
+                 ipad_bounds: Dict[str, float], scale: float = 1.0):
+        """
+        Initialize game area
+
+        Args:
+            camera_corners: Camera pixel positions of the game area corners,
+                            in order top-left, top-right, bottom-right,
+                            bottom-left (the corners of ipad_bounds)
+            ipad_bounds: iPad pixel bounds of the game area
+                         (same dict as CoordinateMapper.ipad_bounds)
+            scale: Rectified pixels per iPad pixel (< 1 processes fewer pixels)
+        """
+        self.ipad_bounds = dict(ipad_bounds)
+        self.scale = scale
+
+        ipad_w = ipad_bounds['x_max'] - ipad_bounds['x_min']
+        ipad_h = ipad_bounds['y_max'] - ipad_bounds['y_min']
+        self.size = (max(1, int(round(ipad_w * scale))),
+                     max(1, int(round(ipad_h * scale))))
+
+        self.camera_corners = np.array(camera_corners, dtype=np.float32).reshape(4, 2)
+        w, h = self.size
+        rectified_corners = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)
+
+        # camera → rectified, and back
+        self.warp = cv2.getPerspectiveTransform(self.camera_corners, rectified_corners)
+        self.unwarp = np.linalg.inv(self.warp)
+
+        # Camera pixels covered by one rectified pixel, used to keep
+        # area thresholds in camera units meaningful after rectification
+        camera_area = cv2.contourArea(self.camera_corners)
+        self.area_ratio = camera_area / float(w * h) if camera_area > 0 else 1.0
+
+    @classmethod
+    def from_calibration(cls, filename: str = 'calibration.json',
+                         scale: float = 1.0) -> Optional['GameArea']:
+        """
+        Create the game area from a calibration file
+
+        Requires 'camera_corners' in the calibration (camera pixel positions
+        of the ipad_bounds corners).
+        """
+        mapper = load_calibration(filename)
+        if mapper is None:
+            return None
+        if mapper.camera_corners is None:
+            print(f"❌ {filename} has no camera_corners - game area unknown")
+            return None
+        return cls(mapper.camera_corners, mapper.ipad_bounds, scale=scale)
+
+    def rectify(self, frame: np.ndarray) -> np.ndarray:
+        """Crop and perspective-correct the game area out of a camera frame"""
+        return cv2.warpPerspective(frame, self.warp, self.size, flags=cv2.INTER_LINEAR)
+
+    def pixel_fraction(self, frame_shape: Tuple[int, ...]) -> float:
+        """Rectified pixels as a fraction of the full camera frame"""
+        return (self.size[0] * self.size[1]) / float(frame_shape[0] * frame_shape[1])
+
+    def rectified_to_ipad(self, points: np.ndarray) -> np.ndarray:
+        """Rectified image pixels → iPad pixels (same space as CoordinateMapper)"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        offset = np.array([self.ipad_bounds['x_min'], self.ipad_bounds['y_min']])
+        return points / self.scale + offset
+
+    def ipad_to_camera(self, points: np.ndarray) -> np.ndarray:
+        """iPad pixels → camera pixels"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        offset = np.array([self.ipad_bounds['x_min'], self.ipad_bounds['y_min']])
+        rectified = (points - offset) * self.scale
+        return cv2.perspectiveTransform(rectified.reshape(-1, 1, 2), self.unwarp).reshape(-1, 2)
+
+    def camera_to_ipad(self, points: np.ndarray) -> np.ndarray:
+        """Camera pixels → iPad pixels"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        rectified = cv2.perspectiveTransform(points, self.warp).reshape(-1, 2)
+        return self.rectified_to_ipad(rectified)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Card Identity Cache
+Remembers (rank, suit, confidence) for card faces already identified, keyed
+by a perceptual hash of the card corner
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+from CardDetection.card_recognizer import normalize_corner
+
+
+def corner_hash(corner: np.ndarray, hash_size: int = 16, min_contrast: int = 8) -> Optional[int]:
+    """
+    Difference hash (dHash) of a card corner ROI
+
+    The corner is normalized (grayscale, cropped to its glyph ink) and shrunk
+    to (hash_size + 1) x hash_size; each bit records whether a pixel is
+    clearly brighter than its right neighbour. Cropping to the ink makes the
+    hash independent of bounding box jitter, and differences below
+    min_contrast count as "not brighter" so sensor noise on the flat card
+    background does not flip bits.
+
+    Args:
+        corner: BGR or grayscale corner ROI
+        hash_size: Bits per row/column (hash has hash_size**2 bits)
+        min_contrast: Gray-level difference needed to set a bit
+
+    Returns:
+        Hash as a Python int, or None for an empty or near-uniform corner
+        (no glyph edges) - such corners all look alike and must not share
+        a cache entry
+    """
+    if corner.size == 0:
+        return None
+    small = normalize_corner(corner, (hash_size + 1, hash_size)).astype(np.int16)
+    bits = (small[:, 1:] - small[:, :-1] > min_contrast).ravel()
+    if not bits.any():
+        return None
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class IdentityCache:
+    """Bounded LRU cache of card identities with hit/miss statistics"""
+
+    def __init__(self, max_size: int = 512, min_confidence: float = 0.6):
+        """
+        Args:
+            max_size: Maximum number of card faces remembered
+            min_confidence: Identities below this confidence are not stored,
+                            so an uncertain match is retried next frame
+        """
+        self.max_size = max_size
+        self.min_confidence = min_confidence
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, str, float]]:
+        """Look up an identity, marking it as recently used"""
+        identity = self._entries.get(key)
+        if identity is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return identity
+
+    def put(self, key: Optional[Hashable], identity: Tuple[str, str, float]) -> bool:
+        """
+        Store an identity, evicting the least recently used one if full
+
+        Only confident, fully identified cards are stored: no key (blank
+        corner), a '?' rank or suit, or a low confidence are skipped.
+
+        Returns:
+            True if the identity was stored
+        """
+        rank, suit, confidence = identity
+        if key is None or '?' in (rank, suit) or confidence < self.min_confidence:
+            return False
+        self._entries[key] = identity
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        """Drop all entries (statistics are kept)"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Cache statistics as a dict"""
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate
+        }
+
+    def __repr__(self):
+        return (f"IdentityCache({len(self._entries)}/{self.max_size}, "
+                f"hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%})")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Incremental Card Detection
+Keeps the last board and only re-detects the parts of the frame that changed
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from CardDetection.card_detector import Card, CardDetector
+
+
+Rect = Tuple[int, int, int, int]  # (x, y, width, height)
+
+
+@dataclass
+class IncrementalStats:
+    """What the last incremental update did"""
+    full_refresh: bool  # Whole board was re-detected
+    dirty_regions: int  # Changed regions that were re-detected
+    regions_skipped: int  # Previous cards reused without re-detection
+    cards_reidentified: int  # Cards found inside dirty regions
+    dirty_fraction: float  # Fraction of the image inside dirty regions
+
+    def __repr__(self):
+        if self.full_refresh:
+            return f"full refresh, {self.cards_reidentified} cards"
+        return (f"{self.dirty_regions} dirty regions ({self.dirty_fraction:.1%}), "
+                f"{self.regions_skipped} skipped, {self.cards_reidentified} re-identified")
+
+
+class IncrementalDetector:
+    """Stateful wrapper around CardDetector that only re-analyzes changed regions"""
+
+    def __init__(self, detector: CardDetector, diff_scale: float = 0.125,
+                 diff_threshold: int = 25, padding: int = 8,
+                 full_refresh_fraction: float = 0.5):
+        """
+        Initialize incremental detector
+
+        Args:
+            detector: Detector used for the actual contour analysis/identification
+            diff_scale: Downscale factor for the difference mask
+            diff_threshold: Gray-level change that counts as a changed pixel
+            padding: Pixels added around each dirty region
+            full_refresh_fraction: Re-detect the whole board when more than
+                                   this fraction of the image changed
+        """
+        self.detector = detector
+        self.diff_scale = diff_scale
+        self.diff_threshold = diff_threshold
+        self.padding = padding
+        self.full_refresh_fraction = full_refresh_fraction
+
+        self.last_stats = None
+        self.reset()
+
+    def reset(self):
+        """Forget the previous board; the next frame is fully re-detected"""
+        self._prev_small = None
+        self._prev_shape = None
+        self._cards = []  # In working-image coordinates
+
+    def detect_cards(self, frame: np.ndarray) -> List[Card]:
+        """
+        Detect cards, reusing unchanged cards from the previous frame
+
+        Args:
+            frame: BGR image from camera
+
+        Returns:
+            Full list of cards on the board (same coordinates as
+            CardDetector.detect_cards)
+        """
+        if frame is None:
+            return []
+
+        detector = self.detector
+        image, area_scale = detector._working_image(frame)
+        small = self._signature(image)
+
+        dirty = None
+        if self._prev_small is not None and image.shape == self._prev_shape:
+            dirty = self._dirty_regions(small, image.shape)
+
+        if dirty is None or self._area(dirty) > self.full_refresh_fraction * self._image_area(image):
+            # First frame, new geometry, or most of the board changed
+            cards = detector._detect_in_image(image, area_scale)
+            self.last_stats = IncrementalStats(
+                full_refresh=True, dirty_regions=0, regions_skipped=0,
+                cards_reidentified=len(cards), dirty_fraction=1.0
+            )
+        else:
+            cards = self._update_regions(image, area_scale, dirty)
+
+        self._prev_small = small
+        self._prev_shape = image.shape
+        self._cards = cards
+        return detector._finish_detection(image, cards)
+
+    def _update_regions(self, image: np.ndarray, area_scale: float,
+                        dirty: List[Rect]) -> List[Card]:
+        """Keep cards outside dirty regions, re-detect inside them"""
+        # Grow regions to cover any previous card they touch, so partly
+        # changed cards are re-detected whole
+        dirty = self._expand_to_cards(dirty, image.shape)
+
+        kept = [card for card in self._cards
+                if not any(_intersects(card.bbox, rect) for rect in dirty)]
+
+        found = []
+        for rx, ry, rw, rh in dirty:
+            crop = image[ry:ry + rh, rx:rx + rw]
+            for card in self.detector._detect_in_image(crop, area_scale):
+                x, y, w, h = card.bbox
+                found.append(Card(
+                    rank=card.rank,
+                    suit=card.suit,
+                    position=(card.position[0] + rx, card.position[1] + ry),
+                    bbox=(x + rx, y + ry, w, h),
+                    confidence=card.confidence
+                ))
+
+        self.last_stats = IncrementalStats(
+            full_refresh=False,
+            dirty_regions=len(dirty),
+            regions_skipped=len(kept),
+            cards_reidentified=len(found),
+            dirty_fraction=self._area(dirty) / self._image_area(image)
+        )
+        return kept + found
+
+    def _signature(self, image: np.ndarray) -> np.ndarray:
+        """Cheap downscaled grayscale copy for differencing"""
+        small = cv2.resize(image, None, fx=self.diff_scale, fy=self.diff_scale,
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def _dirty_regions(self, small: np.ndarray, shape: Tuple[int, ...]) -> List[Rect]:
+        """Bounding boxes (full resolution) of changed areas"""
+        diff = cv2.absdiff(small, self._prev_small)
+        mask = (diff > self.diff_threshold).astype(np.uint8)
+        if not mask.any():
+            return []
+
+        # Join nearby changed pixels into one region
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        height, width = shape[:2]
+        scale = 1.0 / self.diff_scale
+        regions = []
+        for x, y, w, h, _ in stats[1:]:
+            regions.append(_clip((int(x * scale) - self.padding,
+                                  int(y * scale) - self.padding,
+                                  int(np.ceil(w * scale)) + 2 * self.padding,
+                                  int(np.ceil(h * scale)) + 2 * self.padding),
+                                 width, height))
+        return _merge_overlapping(regions)
+
+    def _expand_to_cards(self, dirty: List[Rect], shape: Tuple[int, ...]) -> List[Rect]:
+        """
+        Union each dirty region with the previous cards it overlaps
+
+        Growing or merging a region can make it touch more cards, so this
+        repeats until nothing changes: every previous card a region touches
+        then lies wholly inside it and is re-detected.
+        """
+        height, width = shape[:2]
+        while True:
+            expanded = []
+            for rect in dirty:
+                for card in self._cards:
+                    if _intersects(card.bbox, rect):
+                        x, y, w, h = card.bbox
+                        rect = _union(rect, (x - self.padding, y - self.padding,
+                                             w + 2 * self.padding, h + 2 * self.padding))
+                expanded.append(_clip(rect, width, height))
+            expanded = _merge_overlapping(expanded)
+            if sorted(expanded) == sorted(dirty):
+                return expanded
+            dirty = expanded
+
+    @staticmethod
+    def _area(rects: List[Rect]) -> int:
+        return sum(w * h for _, _, w, h in rects)
+
+    @staticmethod
+    def _image_area(image: np.ndarray) -> int:
+        return image.shape[0] * image.shape[1]
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+def _union(a: Rect, b: Rect) -> Rect:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1 = max(a[0] + a[2], b[0] + b[2])
+    y1 = max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _clip(rect: Rect, width: int, height: int) -> Rect:
+    x0, y0 = max(rect[0], 0), max(rect[1], 0)
+    x1 = min(rect[0] + rect[2], width)
+    y1 = min(rect[1] + rect[3], height)
+    return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+
+def _merge_overlapping(rects: List[Rect]) -> List[Rect]:
+    """Merge rectangles until none overlap"""
+    merged = [r for r in rects if r[2] > 0 and r[3] > 0]
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        for rect in merged:
+            for i, other in enumerate(result):
+                if _intersects(rect, other):
+                    result[i] = _union(rect, other)
+                    changed = True
+                    break
+            else:
+                result.append(rect)
+        merged = result
+    return merged
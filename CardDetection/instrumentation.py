@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Detection Instrumentation
+Per-stage timers with rolling histograms, exportable as JSON or as a
+Prometheus-style text dump
+"""
+
+import json
+import time
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+# Histogram bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+
+
+class _NullStage:
+    """Context manager that does nothing (instrumentation disabled)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullInstrumentation:
+    """Default instrumentation: every call is a no-op"""
+    enabled = False
+
+    def stage(self, name: str) -> _NullStage:
+        return _NULL_STAGE
+
+    def record(self, name: str, seconds: float):
+        pass
+
+
+class _StageTimer:
+    """Times one stage and records it on exit"""
+    __slots__ = ('_instrumentation', '_name', '_start')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._instrumentation.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Instrumentation:
+    """Collects per-stage timings over a rolling window"""
+    enabled = True
+
+    def __init__(self, window: int = 1000,
+                 buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        """
+        Args:
+            window: Samples kept per stage
+            buckets_ms: Histogram bucket upper bounds (ms); an implicit
+                        +Inf bucket is added
+        """
+        self.window = window
+        self.buckets_ms = tuple(buckets_ms)
+        self._samples = {}  # stage → deque of ms
+        self._last = {}  # stage → ms of the most recent sample
+
+    def stage(self, name: str) -> _StageTimer:
+        """Context manager timing one stage"""
+        return _StageTimer(self, name)
+
+    def record(self, name: str, seconds: float):
+        """Add one timing sample"""
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        ms = seconds * 1000
+        samples.append(ms)
+        self._last[name] = ms
+
+    def last_ms(self) -> Dict[str, float]:
+        """Most recent timing of every stage"""
+        return dict(self._last)
+
+    def reset(self):
+        self._samples.clear()
+        self._last.clear()
+
+    def histogram(self, name: str) -> Optional[Dict]:
+        """Bucket counts (non-cumulative) for one stage over the window"""
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+        edges = np.array(self.buckets_ms + (np.inf,))
+        counts = np.bincount(np.searchsorted(edges, values, side='left'),
+                             minlength=len(edges))[:len(edges)]
+        return {
+            'buckets_ms': list(self.buckets_ms) + ['+Inf'],
+            'counts': counts.tolist(),
+            'sum_ms': float(values.sum()),
+            'count': len(values)
+        }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and percentiles per stage"""
+        result = {}
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {
+                'count': len(values),
+                'mean_ms': float(values.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(values.max())
+            }
+        return result
+
+    def to_json(self) -> str:
+        """Summary and histograms of every stage as JSON"""
+        return json.dumps({
+            'window': self.window,
+            'summary': self.summary(),
+            'histograms': {name: self.histogram(name) for name in self._samples}
+        }, indent=2)
+
+    def to_prometheus(self, metric: str = 'card_detector_stage_duration_ms') -> str:
+        """
+        Prometheus text exposition of the stage histograms
+
+        Buckets are cumulative, as Prometheus expects. Values cover the
+        rolling window only, not the whole process lifetime.
+        """
+        lines = [f"# HELP {metric} Detection stage duration over the last {self.window} samples",
+                 f"# TYPE {metric} histogram"]
+        for name in sorted(self._samples):
+            hist = self.histogram(name)
+            if hist is None:
+                continue
+            cumulative = np.cumsum(hist['counts'])
+            for bound, count in zip(hist['buckets_ms'], cumulative):
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {int(count)}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {hist["sum_ms"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {hist["count"]}')
+        return '\n'.join(lines) + '\n'
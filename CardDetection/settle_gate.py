@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Board Settle Gate
+Holds frames back from card detection until the board has stopped
+animating, using tiny grayscale signatures of consecutive frames
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def frame_signature(frame: np.ndarray, size: Tuple[int, int] = (64, 36),
+                    roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """
+    Low-resolution grayscale thumbnail of a frame
+
+    The frame is first point-sampled to 4x the signature size, then
+    area-averaged, so a 1080p frame costs well under a millisecond while
+    single-pixel sensor noise still averages out.
+
+    Args:
+        frame: BGR or grayscale image
+        size: Signature (width, height)
+        roi: Optional (x, y, width, height) crop, e.g. the game area. It is
+             clipped to the frame; if nothing is left (e.g. the camera
+             resolution changed) the whole frame is used
+
+    Returns:
+        int16 array of shape (height, width)
+    """
+    if roi is not None:
+        x, y, w, h = roi
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame.shape[1], x + w), min(frame.shape[0], y + h)
+        if x1 > x0 and y1 > y0:
+            frame = frame[y0:y1, x0:x1]
+    w, h = size
+    small = cv2.resize(frame, (4 * w, 4 * h), interpolation=cv2.INTER_NEAREST)
+    small = cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small.astype(np.int16)
+
+
+class SettleGate:
+    """Releases frames for detection once the board has been still for a while"""
+
+    def __init__(self, still_frames: int = 3, threshold: float = 2.0,
+                 timeout: float = 3.0, size: Tuple[int, int] = (64, 36),
+                 roi: Optional[Tuple[int, int, int, int]] = None, history: int = 200):
+        """
+        Initialize gate
+
+        Args:
+            still_frames: Consecutive unchanged frames needed to release
+            threshold: Mean absolute signature difference (gray levels)
+                       below which two frames count as unchanged
+            timeout: Seconds after arm() to release anyway, so a board with
+                     a constantly animating element can't stall the robot
+            size: Signature (width, height)
+            roi: Camera pixel (x, y, width, height) to watch; None = whole frame
+            history: Settle times kept for statistics
+        """
+        self.still_frames = still_frames
+        self.threshold = threshold
+        self.timeout = timeout
+        self.size = size
+        self.roi = roi
+
+        self._lock = threading.Lock()
+        self._previous = None
+        self._still = 0
+        self._armed_at = time.perf_counter()
+        self._settled = False
+
+        self.settle_times = deque(maxlen=history)  # Seconds from arm() to release
+        self.last_difference = 0.0
+        self.frames_checked = 0
+        self.timeouts = 0
+
+    @classmethod
+    def for_game_area(cls, game_area, margin: int = 10, **kwargs) -> 'SettleGate':
+        """Gate watching only the camera pixels of a calibrated GameArea"""
+        x, y, w, h = cv2.boundingRect(game_area.camera_corners.astype(np.float32))
+        x, y = max(0, x - margin), max(0, y - margin)
+        return cls(roi=(x, y, w + 2 * margin, h + 2 * margin), **kwargs)
+
+    def arm(self):
+        """Start waiting for the board to settle (call when motion ends)"""
+        with self._lock:
+            self._previous = None
+            self._still = 0
+            self._armed_at = time.perf_counter()
+            self._settled = False
+
+    @property
+    def settled(self) -> bool:
+        return self._settled
+
+    def update(self, frame: np.ndarray) -> bool:
+        """
+        Feed one frame
+
+        Returns:
+            True if the board is settled and the frame can be detected
+        """
+        signature = frame_signature(frame, self.size, self.roi)
+        with self._lock:
+            self.frames_checked += 1
+            if self._previous is not None:
+                self.last_difference = float(np.abs(signature - self._previous).mean())
+                if self.last_difference < self.threshold:
+                    self._still += 1
+                else:
+                    self._still = 0
+            self._previous = signature
+            if self._settled:
+                return True
+
+            elapsed = time.perf_counter() - self._armed_at
+            if self._still >= self.still_frames:
+                self._settled = True
+            elif elapsed >= self.timeout:
+                self._settled = True
+                self.timeouts += 1
+            if self._settled:
+                self.settle_times.append(elapsed)
+            return self._settled
+
+    @property
+    def last_settle_time(self) -> Optional[float]:
+        return self.settle_times[-1] if self.settle_times else None
+
+    def stats(self) -> dict:
+        """Settle time statistics over the history"""
+        times = np.array(self.settle_times, dtype=np.float64)
+        return {
+            'moves': len(times),
+            'mean_settle_ms': float(times.mean() * 1000) if len(times) else 0.0,
+            'p95_settle_ms': float(np.percentile(times, 95) * 1000) if len(times) else 0.0,
+            'timeouts': self.timeouts,
+            'frames_checked': self.frames_checked
+        }
+
+    def __repr__(self):
+        state = 'settled' if self._settled else f"waiting ({self._still}/{self.still_frames} still)"
+        return f"SettleGate({state}, diff={self.last_difference:.2f})"
+
+
+def main():
+    """Watch the camera and print how long the board takes to settle after motion"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure board settle times from the camera')
+    parser.add_argument('--camera', type=int, default=0, help='Camera index')
+    parser.add_argument('--still-frames', type=int, default=3, help='Unchanged frames to settle')
+    parser.add_argument('--threshold', type=float, default=2.0, help='Difference threshold')
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.camera)
+    if not cap.isOpened():
+        print(f"❌ Failed to open camera {args.camera}")
+        return
+
+    gate = SettleGate(still_frames=args.still_frames, threshold=args.threshold, timeout=60)
+    print("Move cards on the iPad; settle times are printed when the board is still.")
+    print("Press Ctrl+C to stop.\n")
+    moving = False
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            was_settled = gate.settled
+            settled = gate.update(frame)
+            if settled and not was_settled and moving:
+                print(f"✓ Settled after {gate.last_settle_time * 1000:.0f} ms")
+                moving = False
+            if settled and gate.last_difference >= args.threshold:
+                # Motion started again: measure the next settle from here
+                gate.arm()
+                moving = True
+                print(f"  Motion detected (diff {gate.last_difference:.1f})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+    print(f"\n📊 {gate.stats()}")
+
+
+if __name__ == "__main__":
+    main()
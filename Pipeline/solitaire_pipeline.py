@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+See → Solve → Tap Pipeline
+Runs capture, card detection, planning and plotter motion as concurrent
+stages connected by bounded queues, so the solver keeps searching while
+the plotter moves and the camera is ready the moment the board settles
+
+Usage (from the repository root):
+    python -m Pipeline.solitaire_pipeline --port COM3 --camera 0 --templates templates.npz
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from Calibration.solitaire_layout import SolitaireLayout
+from Calibration.tap_planner import TapPlanner
+from CardDetection.instrumentation import Instrumentation
+from CardDetection.settle_gate import SettleGate
+from Solver.game_state import GameState
+from Solver.position_db import PositionDB
+from Solver.session import SolverSession
+from Solver.solver import Solver, reveals_unknown, tap_sequence
+
+
+@dataclass
+class MoveBatch:
+    """Moves handed from the planner to the motion stage"""
+    moves: List[int]
+    taps: List[List[Tuple[str, int, int]]]  # Tap targets per move
+    board_time: float  # perf_counter() when the board they were planned on was captured
+
+
+def _put_latest(q: queue.Queue, item):
+    """Put into a size-1 queue, replacing a stale item nobody took yet"""
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    q.put(item)
+
+
+class SolitairePipeline:
+    """Camera → CardDetector → GameState → solver → SolitaireLayout → PenPlotter"""
+
+    def __init__(self, detector, plotter, layout: SolitaireLayout, session: SolverSession,
+                 tap_planner: TapPlanner, area: Tuple[float, float, float, float],
+                 draw_count: int = 1, position_db: Optional[PositionDB] = None,
+                 settle_gate: Optional[SettleGate] = None, max_batch: int = 3,
+                 settle_delay: float = 0.6, move_dwell: float = 0.25, max_moves: int = 500,
+                 park_position: Optional[Tuple[float, float]] = None,
+                 on_moves: Optional[Callable[[List[int]], None]] = None):
+        """
+        Initialize pipeline
+
+        Args:
+            detector: CardDetector with its camera started (threaded
+                      capture recommended) and the game area set
+            plotter: Connected PenPlotter
+            layout: Tap target table for the same calibration
+            session: Solver session (one per game)
+            tap_planner: Builds the G-code for each batch
+            area: Game area (x_min, y_min, x_max, y_max) in card coordinates
+            draw_count: Cards per stock draw
+            position_db: Solved positions to try before searching
+            settle_gate: Releases frames for detection once the board is
+                         still after motion; None waits settle_delay instead
+            max_batch: Most moves tapped before the board is detected again.
+                       A batch always ends at a move that exposes an unknown
+                       card, since the next plan depends on it
+            settle_delay: Seconds to wait after motion when there is no
+                          settle gate
+            move_dwell: Pause between moves of a batch (lets the app animate)
+            max_moves: Stop after this many moves
+            park_position: Plotter position (mm) out of the camera's view
+                           of the board, visited after every batch so the
+                           arm does not cover the cards being detected
+                           (None leaves the arm over the last tap)
+            on_moves: Called with each batch after it was tapped
+        """
+        self.detector = detector
+        self.plotter = plotter
+        self.layout = layout
+        self.session = session
+        self.tap_planner = tap_planner
+        self.area = area
+        self.draw_count = draw_count
+        self.position_db = position_db
+        self.settle_gate = settle_gate
+        self.max_batch = max_batch
+        self.settle_delay = settle_delay
+        self.move_dwell = move_dwell
+        self.max_moves = max_moves
+        self.park_position = park_position
+        self.on_moves = on_moves
+
+        self.instrumentation = Instrumentation()
+        self._frames = queue.Queue(maxsize=1)  # (epoch, time, frame)
+        self._boards = queue.Queue(maxsize=1)  # (time, GameState)
+        self._batches = queue.Queue(maxsize=1)  # MoveBatch or None (stop)
+        self._stop = threading.Event()
+        self._board_still = threading.Event()  # No motion or animation in progress
+        self._board_still.set()
+        self._epoch = 0  # Incremented after every batch of motion
+        self._threads = []
+
+        self.moves_played = 0
+        self.batches_played = 0
+        self.won = False
+        self.error = None
+        self._start_time = 0.0
+        self._plotter_position = None
+
+    # ------------------------------------------------------------------
+    # Stages
+
+    def _capture_loop(self):
+        """Read frames while the plotter is not moving"""
+        timer = self.instrumentation
+        while not self._stop.is_set():
+            if not self._board_still.wait(timeout=0.1):
+                continue
+            epoch = self._epoch
+            with timer.stage('capture'):
+                frame = self.detector.capture_frame()
+            if frame is None:
+                time.sleep(0.05)
+                continue
+            _put_latest(self._frames, (epoch, time.perf_counter(), frame))
+
+    def _detect_loop(self):
+        """Detect one board per still period"""
+        timer = self.instrumentation
+        detected_epoch = -1
+        while not self._stop.is_set():
+            try:
+                epoch, captured, frame = self._frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if epoch != self._epoch or epoch == detected_epoch or not self._board_still.is_set():
+                continue  # Taken before or during motion, or already seen
+            gate = self.settle_gate
+            if gate is not None and not gate.update(frame):
+                continue  # Cards still animating
+
+            with timer.stage('detect'):
+                cards = self.detector.detect_cards(frame)
+                state = GameState.from_cards(cards, self.area, draw_count=self.draw_count)
+            if not cards:
+                continue
+            detected_epoch = epoch
+            if gate is not None and epoch > 0:
+                timer.record('settle', gate.last_settle_time)
+            _put_latest(self._boards, (captured, state))
+
+    def _plan_loop(self):
+        """Turn each detected board into the next batch of moves"""
+        timer = self.instrumentation
+        session = self.session
+        started = False
+        while not self._stop.is_set():
+            try:
+                captured, observed = self._boards.get(timeout=0.05)
+            except queue.Empty:
+                # Keep improving the plan from the predicted board meanwhile
+                if started and not session.tree.solved and not session.tree.exhausted:
+                    with timer.stage('plan_background'):
+                        session.plan(0.05)
+                continue
+
+            with timer.stage('plan'):
+                if not started:
+                    session.reset(observed)
+                    started = True
+                else:
+                    session.update(observed)
+                if session.state.is_won():
+                    self.won = True
+                    break
+
+                # A database hit needs no search
+                moves = self.position_db.plan(session.state) if self.position_db else None
+                if moves:
+                    taps = tap_sequence(session.state, moves, session.foundation_slots)
+                else:
+                    result = session.plan()
+                    moves, taps = result.moves, result.taps
+                # An empty plan only means lost once the tree is searched out
+                while not moves and not session.tree.exhausted and not self._stop.is_set():
+                    result = session.plan()
+                    moves, taps = result.moves, result.taps
+                if not moves:
+                    if session.tree.exhausted:
+                        print("⚠ No moves left - no win or unknown card reachable")
+                    break
+
+                count = self._batch_length(session.state, moves)
+                batch = MoveBatch(moves[:count], taps[:count], captured)
+                session.commit(batch.moves)
+            self._batches.put(batch)
+            if self.moves_played + count >= self.max_moves:
+                break
+        self._batches.put(None)
+
+    def _batch_length(self, state: GameState, moves: Sequence[int]) -> int:
+        """Moves up to the first reveal, at most max_batch"""
+        state = state.copy()
+        for i, move in enumerate(moves[:self.max_batch]):
+            state.make_move(move)
+            if reveals_unknown(state, move) or state.is_won():
+                return i + 1
+        return min(len(moves), self.max_batch)
+
+    def _motion_loop(self):
+        """Tap out each batch, then let the board settle"""
+        timer = self.instrumentation
+        while not self._stop.is_set():
+            batch = self._batches.get()
+            if batch is None:
+                break
+
+            self._board_still.clear()
+            with timer.stage('motion'):
+                self._tap_batch(batch)
+            if self.settle_gate is not None:
+                self.settle_gate.arm()  # The detect stage waits for stillness
+            else:
+                with timer.stage('settle'):
+                    time.sleep(self.settle_delay)
+            self.moves_played += len(batch.moves)
+            self.batches_played += 1
+            timer.record('move', (time.perf_counter() - batch.board_time) / len(batch.moves))
+            if self.on_moves is not None:
+                self.on_moves(batch.moves)
+            self._epoch += 1
+            self._board_still.set()
+        self._stop.set()
+
+    def _tap_batch(self, batch: MoveBatch):
+        """Stream all taps of a batch, then the park move, as one G-code program"""
+        self.layout.refresh_if_changed()
+        model = self.tap_planner.model_for(self.plotter)
+        gcode = []
+        pen = self.plotter.pen_position
+        for i, targets in enumerate(batch.taps):
+            if i > 0 and self.move_dwell > 0:
+                gcode.append(f"G4 P{self.move_dwell:.3f}")
+            points = [self.layout.slot(*target) for target in targets]
+            plan = self.tap_planner.plan_plotter(points, start=self._plotter_position,
+                                                 pen_position=pen, plotter=self.plotter)
+            gcode += plan.gcode
+            pen = model.up_value
+            self._plotter_position = points[-1]
+        if self.park_position is not None:
+            x, y = self.park_position
+            # The dwell holds the last 'ok' until the arm has arrived
+            gcode += [f"G0 X{x:.2f} Y{y:.2f}", "G4 P0"]
+            self._plotter_position = self.park_position
+        self.plotter.stream_commands(gcode)
+        self.plotter.pen_position = model.up_value
+
+    # ------------------------------------------------------------------
+    # Control
+
+    def _run_stage(self, target: Callable):
+        try:
+            target()
+        except Exception as e:
+            self.error = e
+            print(f"❌ Pipeline stage {target.__name__} failed: {e}")
+            self._stop.set()
+            _put_latest(self._batches, None)
+
+    def run(self, report_interval: float = 10.0) -> dict:
+        """
+        Play until the game is won or lost, max_moves is reached or Ctrl+C
+
+        Args:
+            report_interval: Seconds between progress lines
+
+        Returns:
+            Report dict (see report())
+        """
+        self._start_time = time.perf_counter()
+        stages = [self._capture_loop, self._detect_loop, self._plan_loop, self._motion_loop]
+        self._threads = [threading.Thread(target=self._run_stage, args=(stage,),
+                                          name=stage.__name__.strip('_'), daemon=True)
+                         for stage in stages]
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            next_report = time.perf_counter() + report_interval
+            while not self._stop.is_set():
+                self._stop.wait(timeout=0.2)
+                if time.perf_counter() >= next_report:
+                    print(f"  {self.moves_played} moves, {self.moves_per_minute:.1f} moves/min")
+                    next_report += report_interval
+        except KeyboardInterrupt:
+            print("\n⚠ Interrupted")
+        finally:
+            self.stop()
+        return self.report()
+
+    def stop(self):
+        self._stop.set()
+        self._board_still.set()
+        _put_latest(self._batches, None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    @property
+    def moves_per_minute(self) -> float:
+        elapsed = time.perf_counter() - self._start_time
+        return self.moves_played / elapsed * 60 if elapsed > 0 else 0.0
+
+    def report(self) -> dict:
+        """Headline metrics: moves/minute and per-stage latency"""
+        return {
+            'moves': self.moves_played,
+            'batches': self.batches_played,
+            'won': self.won,
+            'elapsed_s': time.perf_counter() - self._start_time,
+            'moves_per_minute': self.moves_per_minute,
+            'stages': self.instrumentation.summary()
+        }
+
+
+def print_report(report: dict):
+    print("\n" + "=" * 60)
+    print("PIPELINE REPORT")
+    print("=" * 60)
+    print(f"{'✓ Game won' if report['won'] else '⚠ Game not won'}: {report['moves']} moves "
+          f"in {report['batches']} batches, {report['elapsed_s']:.1f}s")
+    print(f"🤖 {report['moves_per_minute']:.1f} moves/min")
+    print(f"\n{'stage':>16s} {'count':>6s} {'mean':>9s} {'p50':>9s} {'p95':>9s}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:>16s} {stats['count']:6d} {stats['mean_ms']:7.1f}ms "
+              f"{stats['p50_ms']:7.1f}ms {stats['p95_ms']:7.1f}ms")
+
+
+def main():
+    from Calibration.plotter_controller import PenPlotter
+    from CardDetection.card_detector import CardDetector
+    from CardDetection.card_recognizer import CardRecognizer
+    from CardDetection.game_area import GameArea
+
+    parser = argparse.ArgumentParser(description='Play iPad Solitaire end to end')
+    parser.add_argument('--port', default='COM3', help='Plotter serial port')
+    parser.add_argument('--camera', type=int, default=0, help='Camera index')
+    parser.add_argument('--calibration', default='calibration.json',
+                        help='Calibration with camera_corners')
+    parser.add_argument('--templates', default=None, help='Template bank cache (.npz)')
+    parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    parser.add_argument('--db', default=None, help='Solved position database')
+    parser.add_argument('--deadline', type=float, default=0.5, help='Seconds of search per move')
+    parser.add_argument('--batch', type=int, default=3, help='Most moves between detections')
+    parser.add_argument('--still-frames', type=int, default=3,
+                        help='Unchanged frames before a board is detected')
+    parser.add_argument('--fixed-settle', type=float, default=None,
+                        help='Wait this many seconds after motion instead of watching for stillness')
+    parser.add_argument('--max-moves', type=int, default=500, help='Stop after this many moves')
+    parser.add_argument('--park', type=float, nargs=2, default=None, metavar=('X', 'Y'),
+                        help="Plotter position (mm) off the board to wait at between batches "
+                             "(default: park_position from the calibration)")
+    args = parser.parse_args()
+
+    game_area = GameArea.from_calibration(args.calibration)
+    layout = SolitaireLayout(args.calibration)
+    if game_area is None:
+        return
+    park = tuple(args.park) if args.park else None
+    if park is None:
+        with open(args.calibration, 'r') as f:
+            park = json.load(f).get('park_position')
+    if park is None:
+        print("❌ No park position - pass --park X Y or run Calibration.auto_calibration")
+        return
+
+    recognizer = CardRecognizer.load(args.templates) if args.templates else None
+    detector = CardDetector(camera_index=args.camera, recognizer=recognizer, quiet=True)
+    detector.set_game_area(game_area)
+    if not detector.start_camera(threaded=True, latest_only=False):
+        return
+
+    plotter = PenPlotter(port=args.port)
+    plotter.start_streaming()
+    plotter.pen_up()
+
+    ib = game_area.ipad_bounds
+    session = SolverSession(Solver(max_nodes=100_000), move_deadline=args.deadline,
+                            foundation_slots=None)
+    pipeline = SolitairePipeline(
+        detector, plotter, layout, session, TapPlanner(layout.mapper),
+        area=(ib['x_min'], ib['y_min'], ib['x_max'], ib['y_max']), draw_count=args.draw,
+        position_db=PositionDB(args.db) if args.db else None,
+        settle_gate=None if args.fixed_settle is not None else
+        SettleGate.for_game_area(game_area, still_frames=args.still_frames),
+        max_batch=args.batch, settle_delay=args.fixed_settle or 0.0, max_moves=args.max_moves,
+        park_position=tuple(park))
+
+    print("🤖 Pipeline running (Ctrl+C to stop)")
+    try:
+        print_report(pipeline.run())
+    finally:
+        plotter.pen_up()
+        plotter.close()
+        detector.close()
+
+
+if __name__ == "__main__":
+    main()
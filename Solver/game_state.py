@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+Klondike Game State
+Compact solitaire position for search: cards are 6-bit ints, piles are
+preallocated bytearrays and the Zobrist hash is updated incrementally by
+make_move / unmake_move
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Same order as CardDetection.card_recognizer
+RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+SUITS = ['hearts', 'diamonds', 'clubs', 'spades']
+SUIT_SYMBOLS = '♥♦♣♠'
+
+# Card encoding: suit << 4 | rank (rank 1-13). Hearts and diamonds are
+# suits 0-1, so card >> 5 is the color (0 red, 1 black).
+EMPTY = 0
+UNKNOWN = 63  # Face-down or unrecognized card
+
+# Pile indices used in moves
+TABLEAU_COLUMNS = 7
+FOUNDATION = 7  # Foundations are 7-10, one per suit
+WASTE = 11
+STOCK = 12
+
+TABLEAU_DEPTH = 19  # 6 face-down + 13 face-up
+STOCK_SIZE = 24
+
+
+def make_card(rank: int, suit: int) -> int:
+    return suit << 4 | rank
+
+
+def card_rank(card: int) -> int:
+    return card & 15
+
+
+def card_suit(card: int) -> int:
+    return card >> 4
+
+
+def parse_card(rank: str, suit: str) -> int:
+    """Card int from CardDetector labels; UNKNOWN if either is unrecognized"""
+    if rank not in RANKS or suit not in SUITS:
+        return UNKNOWN
+    return make_card(RANKS.index(rank) + 1, SUITS.index(suit))
+
+
+def card_name(card: int) -> str:
+    if card == EMPTY:
+        return '--'
+    if card == UNKNOWN:
+        return '??'
+    return f"{RANKS[(card & 15) - 1]}{SUIT_SYMBOLS[card >> 4]}"
+
+
+# Moves are ints: src | dst << 4 | count << 8
+def encode_move(src: int, dst: int, count: int = 1) -> int:
+    return src | dst << 4 | count << 8
+
+
+def decode_move(move: int) -> Tuple[int, int, int]:
+    """(src, dst, count)"""
+    return move & 15, (move >> 4) & 15, move >> 8
+
+
+def _pile_name(pile: int) -> str:
+    if pile < TABLEAU_COLUMNS:
+        return f"T{pile + 1}"
+    if pile < WASTE:
+        return f"F{SUIT_SYMBOLS[pile - FOUNDATION]}"
+    return 'waste' if pile == WASTE else 'stock'
+
+
+def format_move(move: int) -> str:
+    src, dst, count = decode_move(move)
+    if src == STOCK:
+        return f"draw {count}"
+    if dst == STOCK:
+        return "redeal"
+    suffix = f" ({count} cards)" if count > 1 else ""
+    return f"{_pile_name(src)} → {_pile_name(dst)}{suffix}"
+
+
+# Deterministic Zobrist keys, so hashes are stable across processes and runs
+_rng = random.Random(0x5017A1BE)
+_Z_TABLEAU = [_rng.getrandbits(64) for _ in range(TABLEAU_COLUMNS * TABLEAU_DEPTH * 64)]
+_Z_FACE_DOWN = [_rng.getrandbits(64) for _ in range(TABLEAU_COLUMNS * TABLEAU_DEPTH)]
+_Z_FOUNDATION = [_rng.getrandbits(64) for _ in range(4 * 14)]
+_Z_STOCK = [_rng.getrandbits(64) for _ in range(STOCK_SIZE * 64)]
+_Z_WASTE = [_rng.getrandbits(64) for _ in range(STOCK_SIZE * 64)]
+_Z_DRAW = [_rng.getrandbits(64) for _ in range(4)]
+for _i in range(0, len(_Z_TABLEAU), 64):
+    _Z_TABLEAU[_i] = 0  # Empty slots contribute nothing
+for _i in range(0, len(_Z_STOCK), 64):
+    _Z_STOCK[_i] = 0
+    _Z_WASTE[_i] = 0
+for _i in range(0, len(_Z_FOUNDATION), 14):
+    _Z_FOUNDATION[_i] = 0
+del _rng, _i
+
+
+class GameState:
+    """Klondike position with fast move generation and make/unmake"""
+    __slots__ = ('tableau', 'heights', 'face_down', 'foundations',
+                 'stock', 'stock_len', 'waste', 'waste_len', 'draw_count', 'hash')
+
+    def __init__(self, draw_count: int = 1):
+        """
+        Create an empty position
+
+        Args:
+            draw_count: Cards turned from the stock per draw (1 or 3)
+        """
+        # Column c occupies tableau[c * TABLEAU_DEPTH:(c + 1) * TABLEAU_DEPTH],
+        # bottom card first; the lowest face_down[c] cards are face down
+        self.tableau = bytearray(TABLEAU_COLUMNS * TABLEAU_DEPTH)
+        self.heights = bytearray(TABLEAU_COLUMNS)
+        self.face_down = bytearray(TABLEAU_COLUMNS)
+        self.foundations = bytearray(4)  # Top rank per suit (0 = empty)
+        self.stock = bytearray(STOCK_SIZE)  # Top card last
+        self.stock_len = 0
+        self.waste = bytearray(STOCK_SIZE)  # Top card last
+        self.waste_len = 0
+        self.draw_count = draw_count
+        self.hash = _Z_DRAW[draw_count]
+
+    # ------------------------------------------------------------------
+    # Construction
+
+    @classmethod
+    def deal(cls, seed: Optional[int] = None, draw_count: int = 1) -> 'GameState':
+        """Standard fully known deal (column c has c face-down cards)"""
+        deck = [make_card(rank, suit) for suit in range(4) for rank in range(1, 14)]
+        random.Random(seed).shuffle(deck)
+        state = cls(draw_count)
+        for column in range(TABLEAU_COLUMNS):
+            cards = [deck.pop() for _ in range(column + 1)]
+            state.set_column(column, cards, face_down=column)
+        state.set_stock(deck)
+        return state
+
+    @classmethod
+    def from_cards(cls, cards: Sequence, area: Tuple[float, float, float, float],
+                   face_down: Optional[Sequence[int]] = None, draw_count: int = 1,
+                   top_row_fraction: float = 0.2, tableau_top_fraction: float = 0.22,
+                   face_down_offset_fraction: float = 0.012,
+                   stock_column: int = 0, waste_column: int = 1) -> 'GameState':
+        """
+        Build a position from CardDetector output
+
+        Cards are assigned to piles by position: the game area is split
+        into 7 equal columns, cards in the top band are stock / waste /
+        foundations and the rest form the tableau, ordered top to bottom.
+        Unseen cards (face-down, stock, covered waste) become UNKNOWN.
+
+        Args:
+            cards: Detected Card objects (rank, suit, position, bbox)
+            area: Game area (x_min, y_min, x_max, y_max) in the same
+                  coordinates as the card positions
+            face_down: Face-down cards per column; by default estimated
+                       from how far the first face-up card sits below
+                       the tableau top
+            draw_count: Cards per stock draw
+            top_row_fraction: Height of the stock/foundation band
+            tableau_top_fraction: Where the first tableau card starts
+            face_down_offset_fraction: Fan spacing of face-down cards
+            stock_column, waste_column: Top-row columns of stock and waste
+
+        Returns:
+            GameState
+        """
+        x_min, y_min, x_max, y_max = area
+        width = float(x_max - x_min)
+        height = float(y_max - y_min)
+
+        columns = [[] for _ in range(TABLEAU_COLUMNS)]
+        waste_cards = []
+        foundations = bytearray(4)
+        for card in cards:
+            x, y = card.position
+            column = min(TABLEAU_COLUMNS - 1, max(0, int((x - x_min) / width * TABLEAU_COLUMNS)))
+            value = parse_card(card.rank, card.suit)
+            if (y - y_min) / height < top_row_fraction:
+                if column == waste_column:
+                    waste_cards.append((x, value))
+                elif column != stock_column and value != UNKNOWN:
+                    suit = value >> 4
+                    foundations[suit] = max(foundations[suit], value & 15)
+            else:
+                columns[column].append((card.bbox[1], value))
+
+        state = cls(draw_count)
+        for suit in range(4):
+            state._set_foundation(suit, foundations[suit])
+
+        seen = sum(foundations)
+        for column, pile in enumerate(columns):
+            pile.sort()
+            face_up = [value for _, value in pile][:TABLEAU_DEPTH]
+            if face_down is not None:
+                hidden = face_down[column]
+            elif face_up:
+                top = (pile[0][0] - y_min) / height
+                hidden = int(round((top - tableau_top_fraction) / face_down_offset_fraction))
+            else:
+                hidden = 0
+            hidden = max(0, min(hidden, TABLEAU_DEPTH - len(face_up), TABLEAU_COLUMNS - 1))
+            state.set_column(column, [UNKNOWN] * hidden + face_up, face_down=hidden)
+            seen += hidden + len(face_up)
+
+        # Waste: only the top (right-most in a draw-3 fan) is known
+        if waste_cards:
+            waste_cards.sort()
+            state.set_waste([waste_cards[-1][1]])
+            seen += 1
+        state.set_stock([UNKNOWN] * max(0, min(STOCK_SIZE, 52 - seen)))
+        return state
+
+    def set_column(self, column: int, cards: Sequence[int], face_down: int = 0):
+        """Replace a tableau column (bottom card first)"""
+        base = column * TABLEAU_DEPTH
+        h = self.hash
+        for i in range(self.heights[column]):
+            h ^= _Z_TABLEAU[(base + i) << 6 | self.tableau[base + i]]
+            self.tableau[base + i] = EMPTY
+        h ^= _Z_FACE_DOWN[base + self.face_down[column]]
+        for i, card in enumerate(cards):
+            self.tableau[base + i] = card
+            h ^= _Z_TABLEAU[(base + i) << 6 | card]
+        self.heights[column] = len(cards)
+        self.face_down[column] = face_down
+        self.hash = h ^ _Z_FACE_DOWN[base + face_down]
+
+    def set_stock(self, cards: Sequence[int]):
+        """Replace the stock (top card last)"""
+        for i in range(self.stock_len):
+            self.hash ^= _Z_STOCK[i << 6 | self.stock[i]]
+        self.stock[:] = bytes(STOCK_SIZE)
+        for i, card in enumerate(cards):
+            self.stock[i] = card
+            self.hash ^= _Z_STOCK[i << 6 | card]
+        self.stock_len = len(cards)
+
+    def set_waste(self, cards: Sequence[int]):
+        """Replace the waste (top card last)"""
+        for i in range(self.waste_len):
+            self.hash ^= _Z_WASTE[i << 6 | self.waste[i]]
+        self.waste[:] = bytes(STOCK_SIZE)
+        for i, card in enumerate(cards):
+            self.waste[i] = card
+            self.hash ^= _Z_WASTE[i << 6 | card]
+        self.waste_len = len(cards)
+
+    def _set_foundation(self, suit: int, rank: int):
+        self.hash ^= _Z_FOUNDATION[suit * 14 + self.foundations[suit]] ^ _Z_FOUNDATION[suit * 14 + rank]
+        self.foundations[suit] = rank
+
+    def copy(self) -> 'GameState':
+        other = GameState.__new__(GameState)
+        other.tableau = bytearray(self.tableau)
+        other.heights = bytearray(self.heights)
+        other.face_down = bytearray(self.face_down)
+        other.foundations = bytearray(self.foundations)
+        other.stock = bytearray(self.stock)
+        other.stock_len = self.stock_len
+        other.waste = bytearray(self.waste)
+        other.waste_len = self.waste_len
+        other.draw_count = self.draw_count
+        other.hash = self.hash
+        return other
+
+    # ------------------------------------------------------------------
+    # Queries
+
+    def column(self, column: int) -> List[int]:
+        base = column * TABLEAU_DEPTH
+        return list(self.tableau[base:base + self.heights[column]])
+
+    def is_won(self) -> bool:
+        return sum(self.foundations) == 52
+
+    def waste_top(self) -> int:
+        return self.waste[self.waste_len - 1] if self.waste_len else EMPTY
+
+    def exposes_unknown(self) -> bool:
+        """True if a playable position (waste top, column top) holds an unknown card"""
+        if self.waste_len and self.waste[self.waste_len - 1] == UNKNOWN:
+            return True
+        tableau = self.tableau
+        for column in range(TABLEAU_COLUMNS):
+            h = self.heights[column]
+            if h and tableau[column * TABLEAU_DEPTH + h - 1] == UNKNOWN:
+                return True
+        return False
+
+    def __repr__(self):
+        lines = ["Foundations: " + ' '.join(
+            card_name(make_card(rank, suit)) if rank else '--'
+            for suit, rank in enumerate(self.foundations))]
+        lines.append(f"Stock: {self.stock_len}  Waste: {card_name(self.waste_top())} "
+                     f"({self.waste_len})")
+        for column in range(TABLEAU_COLUMNS):
+            cards = self.column(column)
+            hidden = self.face_down[column]
+            lines.append(f"T{column + 1}: " + ' '.join(
+                ['##'] * hidden + [card_name(c) for c in cards[hidden:]]))
+        return '\n'.join(lines)
+
+    # ------------------------------------------------------------------
+    # Move generation
+
+    def legal_moves(self) -> List[int]:
+        """
+        All legal moves, foundation moves first
+
+        Kings only move to the first empty column (the other empty columns
+        are equivalent), and never off an otherwise empty column.
+        """
+        moves = []
+        append = moves.append
+        tableau = self.tableau
+        heights = self.heights
+        face_down = self.face_down
+        foundations = self.foundations
+
+        # wants[rank | color << 4] lists the columns accepting such a card
+        wants = [None] * 32
+        first_empty = -1
+        for column in range(TABLEAU_COLUMNS):
+            h = heights[column]
+            if h == 0:
+                if first_empty < 0:
+                    first_empty = column
+                continue
+            top = tableau[column * TABLEAU_DEPTH + h - 1]
+            if top == UNKNOWN:
+                continue
+            rank = top & 15
+            if foundations[top >> 4] + 1 == rank:
+                append(column | (FOUNDATION + (top >> 4)) << 4 | 256)
+            if rank > 1:
+                key = (rank - 1) | (((top >> 5) ^ 1) << 4)
+                if wants[key] is None:
+                    wants[key] = [column]
+                else:
+                    wants[key].append(column)
+
+        waste_top = self.waste[self.waste_len - 1] if self.waste_len else EMPTY
+        if waste_top == UNKNOWN:
+            waste_top = EMPTY
+        if waste_top and foundations[waste_top >> 4] + 1 == waste_top & 15:
+            append(WASTE | (FOUNDATION + (waste_top >> 4)) << 4 | 256)
+
+        # Tableau → tableau (any face-up run)
+        for src in range(TABLEAU_COLUMNS):
+            h = heights[src]
+            base = src * TABLEAU_DEPTH
+            for i in range(face_down[src], h):
+                card = tableau[base + i]
+                if card == UNKNOWN:
+                    continue
+                if card & 15 == 13:
+                    if i and first_empty >= 0:
+                        append(src | first_empty << 4 | (h - i) << 8)
+                    continue
+                targets = wants[(card & 15) | (card >> 5) << 4]
+                if targets:
+                    for dst in targets:
+                        append(src | dst << 4 | (h - i) << 8)
+
+        # Waste → tableau
+        if waste_top:
+            if waste_top & 15 == 13:
+                if first_empty >= 0:
+                    append(WASTE | first_empty << 4 | 256)
+            else:
+                targets = wants[(waste_top & 15) | (waste_top >> 5) << 4]
+                if targets:
+                    for dst in targets:
+                        append(WASTE | dst << 4 | 256)
+
+        # Foundation → tableau (aces and twos never need to come back)
+        for suit in range(4):
+            rank = foundations[suit]
+            if rank > 2:
+                targets = wants[rank | (suit >> 1) << 4]
+                if targets:
+                    for dst in targets:
+                        append((FOUNDATION + suit) | dst << 4 | 256)
+
+        # Stock
+        if self.stock_len:
+            append(STOCK | WASTE << 4 | min(self.draw_count, self.stock_len) << 8)
+        elif self.waste_len:
+            append(WASTE | STOCK << 4 | self.waste_len << 8)
+        return moves
+
+    # ------------------------------------------------------------------
+    # Make / unmake
+
+    def _take(self, pile: int, count: int) -> bytes:
+        """Remove count cards from the top of a pile (returned bottom first)"""
+        if pile < TABLEAU_COLUMNS:
+            base = pile * TABLEAU_DEPTH
+            h = self.heights[pile]
+            start = base + h - count
+            cards = bytes(self.tableau[start:base + h])
+            hash_ = self.hash
+            for i, card in enumerate(cards):
+                hash_ ^= _Z_TABLEAU[(start + i) << 6 | card]
+            self.hash = hash_
+            self.tableau[start:base + h] = bytes(count)
+            self.heights[pile] = h - count
+            return cards
+        if pile < WASTE:
+            suit = pile - FOUNDATION
+            rank = self.foundations[suit]
+            self._set_foundation(suit, rank - 1)
+            return bytes((suit << 4 | rank,))
+        if pile == WASTE:
+            n = self.waste_len
+            cards = bytes(self.waste[n - count:n])
+            hash_ = self.hash
+            for i, card in enumerate(cards):
+                hash_ ^= _Z_WASTE[(n - count + i) << 6 | card]
+            self.hash = hash_
+            self.waste[n - count:n] = bytes(count)
+            self.waste_len = n - count
+            return cards
+        n = self.stock_len
+        cards = bytes(self.stock[n - count:n])
+        hash_ = self.hash
+        for i, card in enumerate(cards):
+            hash_ ^= _Z_STOCK[(n - count + i) << 6 | card]
+        self.hash = hash_
+        self.stock[n - count:n] = bytes(count)
+        self.stock_len = n - count
+        return cards
+
+    def _put(self, pile: int, cards: bytes):
+        """Place cards (bottom first) on top of a pile"""
+        count = len(cards)
+        if pile < TABLEAU_COLUMNS:
+            base = pile * TABLEAU_DEPTH
+            start = base + self.heights[pile]
+            self.tableau[start:start + count] = cards
+            hash_ = self.hash
+            for i, card in enumerate(cards):
+                hash_ ^= _Z_TABLEAU[(start + i) << 6 | card]
+            self.hash = hash_
+            self.heights[pile] += count
+        elif pile < WASTE:
+            self._set_foundation(pile - FOUNDATION, cards[0] & 15)
+        elif pile == WASTE:
+            n = self.waste_len
+            self.waste[n:n + count] = cards
+            hash_ = self.hash
+            for i, card in enumerate(cards):
+                hash_ ^= _Z_WASTE[(n + i) << 6 | card]
+            self.hash = hash_
+            self.waste_len = n + count
+        else:
+            n = self.stock_len
+            self.stock[n:n + count] = cards
+            hash_ = self.hash
+            for i, card in enumerate(cards):
+                hash_ ^= _Z_STOCK[(n + i) << 6 | card]
+            self.hash = hash_
+            self.stock_len = n + count
+
+    def make_move(self, move: int) -> int:
+        """
+        Apply a move
+
+        Returns:
+            Undo token for unmake_move (1 if a face-down card was turned)
+        """
+        src = move & 15
+        dst = (move >> 4) & 15
+        count = move >> 8
+
+        cards = self._take(src, count)
+        if src >= WASTE and dst >= WASTE:
+            cards = cards[::-1]  # Draw / redeal turns the cards over
+        self._put(dst, cards)
+
+        if src < TABLEAU_COLUMNS:
+            h = self.heights[src]
+            if h and h == self.face_down[src]:
+                base = src * TABLEAU_DEPTH
+                self.hash ^= _Z_FACE_DOWN[base + h] ^ _Z_FACE_DOWN[base + h - 1]
+                self.face_down[src] = h - 1
+                return 1
+        return 0
+
+    def unmake_move(self, move: int, undo: int):
+        """Revert a move made with make_move"""
+        src = move & 15
+        dst = (move >> 4) & 15
+        count = move >> 8
+
+        if undo:
+            base = src * TABLEAU_DEPTH
+            fd = self.face_down[src]
+            self.hash ^= _Z_FACE_DOWN[base + fd] ^ _Z_FACE_DOWN[base + fd + 1]
+            self.face_down[src] = fd + 1
+
+        cards = self._take(dst, count)
+        if src >= WASTE and dst >= WASTE:
+            cards = cards[::-1]
+        self._put(src, cards)
+
+    # ------------------------------------------------------------------
+    # Plotter interface
+
+    def tap_targets(self, move: int,
+                    foundation_slots: Optional[Sequence[int]] = None) -> List[Tuple[str, int, int]]:
+        """
+        Screen targets to tap for a move, before it is made
+
+        Args:
+            move: Legal move in this position
+            foundation_slots: Foundation slot of each suit on screen
+                              (default: suit order)
+
+        Returns:
+            (pile, index, depth) tuples, as accepted by SolitaireLayout.slot
+        """
+        slots = foundation_slots or range(4)
+        src, dst, count = decode_move(move)
+        if src == STOCK or dst == STOCK:
+            return [('stock', 0, 0)]
+
+        if src < TABLEAU_COLUMNS:
+            targets = [('tableau', src, self.heights[src] - count)]
+        elif src == WASTE:
+            targets = [('waste', 0, 0)]
+        else:
+            targets = [('foundation', slots[src - FOUNDATION], 0)]
+
+        if dst < TABLEAU_COLUMNS:
+            targets.append(('tableau', dst, max(0, self.heights[dst] - 1)))
+        else:
+            targets.append(('foundation', slots[dst - FOUNDATION], 0))
+        return targets
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Parallel Klondike Solver
+Splits the root moves of a position across worker processes, each running
+its own best-first search, with a shared best-solution bound and a stop
+signal so all workers quit as soon as one finds a win
+
+Usage (from the repository root):
+    python -m Solver.parallel_solver --seed 0 --deals 10 --compare
+    python -m Solver.parallel_solver --image frame.jpg --calibration calibration.json
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from Solver.game_state import GameState
+from Solver.solver import Solver, SolverResult, tap_sequence
+
+UNBOUNDED = 1 << 30
+
+# Shared with every worker by _init_worker
+_stop_event = None
+_bound = None
+
+
+def _init_worker(stop_event, bound):
+    global _stop_event, _bound
+    _stop_event = stop_event
+    _bound = bound
+
+
+def _search(task: Tuple[GameState, List[int], dict]) -> SolverResult:
+    """Search the subtree below some of the root moves"""
+    root, moves, settings = task
+    result = Solver(**settings).solve(root, root_moves=moves,
+                                      stop_event=_stop_event, bound=_bound)
+    if result.solved and settings.get('first_solution', True):
+        _stop_event.set()
+    result.taps = []  # Rebuilt by the parent for the chosen line
+    return result
+
+
+def split_moves(moves: Sequence[int], parts: int) -> List[List[int]]:
+    """
+    Deal root moves round-robin into parts
+
+    legal_moves() lists foundation and tableau moves before stock moves, so
+    dealing them out gives every worker a mix of promising moves.
+    """
+    parts = max(1, min(parts, len(moves)))
+    return [list(moves[i::parts]) for i in range(parts)]
+
+
+class ParallelSolver:
+    """Root-split best-first search over a process pool"""
+
+    def __init__(self, workers: Optional[int] = None, max_nodes: int = 200_000,
+                 time_limit: float = 10.0, weight: float = 2.0,
+                 table_size: int = 1_000_000, first_solution: bool = True):
+        """
+        Initialize solver (the pool is started on first use)
+
+        Args:
+            workers: Worker processes (default: CPU count)
+            max_nodes: Node budget per worker
+            time_limit: Seconds before giving up
+            weight: Heuristic weight (see Solver)
+            table_size: Transposition table capacity per worker
+            first_solution: Stop all workers at the first win; otherwise
+                            they keep searching for shorter wins, pruned by
+                            the shared bound, until the budget runs out
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.settings = {'max_nodes': max_nodes, 'time_limit': time_limit,
+                         'weight': weight, 'table_size': table_size,
+                         'first_solution': first_solution}
+        self.first_solution = first_solution
+        self._stop_event = mp.Event()
+        self._bound = mp.Value('i', UNBOUNDED)
+        self._pool = None
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = mp.Pool(self.workers, initializer=_init_worker,
+                                 initargs=(self._stop_event, self._bound))
+
+    def solve(self, root: GameState, foundation_slots=None) -> SolverResult:
+        """
+        Search for a winning line using all workers
+
+        Args:
+            root: Position to solve (not modified)
+            foundation_slots: Passed to GameState.tap_targets
+
+        Returns:
+            SolverResult for the best line found (nodes summed over workers)
+        """
+        start_time = time.perf_counter()
+        state, _ = Solver(**self.settings).prepare_root(root)
+        groups = split_moves(state.legal_moves(), self.workers)
+
+        if len(groups) <= 1:
+            result = Solver(**self.settings).solve(root, foundation_slots)
+            return result
+
+        self._ensure_pool()
+        self._stop_event.clear()
+        self._bound.value = UNBOUNDED
+        tasks = [(root, moves, self.settings) for moves in groups]
+
+        results = []
+        for result in self._pool.imap_unordered(_search, tasks):
+            results.append(result)
+        elapsed = time.perf_counter() - start_time
+
+        solved = [r for r in results if r.solved]
+        if solved:
+            best = min(solved, key=lambda r: len(r.moves))
+        else:
+            best = min(results, key=lambda r: (r.heuristic, len(r.moves)))
+
+        return SolverResult(moves=best.moves, solved=best.solved,
+                            nodes=sum(r.nodes for r in results), elapsed=elapsed,
+                            exhausted=all(r.exhausted for r in results),
+                            heuristic=best.heuristic, workers=len(groups),
+                            taps=tap_sequence(root, best.moves, foundation_slots))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compare(root: GameState, parallel: ParallelSolver) -> Tuple[SolverResult, SolverResult, float]:
+    """
+    Solve a position single-core and in parallel
+
+    Returns:
+        (single result, parallel result, speedup in wall time)
+    """
+    single = Solver(**parallel.settings).solve(root)
+    multi = parallel.solve(root)
+    speedup = single.elapsed / multi.elapsed if multi.elapsed > 0 else 0.0
+    return single, multi, speedup
+
+
+def state_from_image(image: str, calibration: str, templates: Optional[str],
+                     draw_count: int) -> Optional[GameState]:
+    """Detect cards in a camera image and build the game state"""
+    import cv2
+
+    from CardDetection.card_detector import CardDetector
+    from CardDetection.card_recognizer import CardRecognizer
+    from CardDetection.game_area import GameArea
+
+    frame = cv2.imread(image)
+    if frame is None:
+        print(f"❌ Could not read {image}")
+        return None
+    game_area = GameArea.from_calibration(calibration)
+    if game_area is None:
+        return None
+
+    recognizer = CardRecognizer.load(templates) if templates else None
+    detector = CardDetector(recognizer=recognizer)
+    detector.set_game_area(game_area)
+    cards = detector.detect_cards(frame)
+
+    ib = game_area.ipad_bounds
+    return GameState.from_cards(cards, (ib['x_min'], ib['y_min'], ib['x_max'], ib['y_max']),
+                                draw_count=draw_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve Klondike across CPU cores')
+    parser.add_argument('--image', default=None, help='Camera image of the board to solve')
+    parser.add_argument('--calibration', default='calibration.json',
+                        help='Calibration with camera_corners (for --image)')
+    parser.add_argument('--templates', default=None, help='Template bank cache (for --image)')
+    parser.add_argument('--seed', type=int, default=0, help='First deal seed (no --image)')
+    parser.add_argument('--deals', type=int, default=1, help='Number of random deals')
+    parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--nodes', type=int, default=200_000, help='Node budget per worker')
+    parser.add_argument('--time', type=float, default=10.0, help='Seconds per position')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also solve single-core and report the speedup')
+    args = parser.parse_args()
+
+    if args.image:
+        state = state_from_image(args.image, args.calibration, args.templates, args.draw)
+        if state is None:
+            return
+        print(state)
+        positions = [('image', state)]
+    else:
+        positions = [(f"Deal {seed}", GameState.deal(seed, args.draw))
+                     for seed in range(args.seed, args.seed + args.deals)]
+
+    with ParallelSolver(args.workers, max_nodes=args.nodes, time_limit=args.time) as solver:
+        print(f"🤖 Parallel solver: {solver.workers} workers")
+        single_time = 0.0
+        multi_time = 0.0
+        for name, state in positions:
+            if args.compare:
+                single, result, speedup = compare(state, solver)
+                single_time += single.elapsed
+                multi_time += result.elapsed
+                print(f"  {name}: single {single}")
+                print(f"  {' ' * len(name)}  multi  {result}  speedup {speedup:.2f}x")
+            else:
+                result = solver.solve(state)
+                print(f"  {name}: {result}")
+            if args.image:
+                print('   ' + ', '.join(result.describe()))
+
+        if args.compare and multi_time > 0:
+            print(f"\n📊 Overall speedup: {single_time / multi_time:.2f}x "
+                  f"({single_time:.2f}s single-core, {multi_time:.2f}s on {solver.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
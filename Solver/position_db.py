@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Solved Position Database
+Memory-mapped table of solved positions keyed by Zobrist hash, so boards
+seen before get their plan without a search
+
+File format: a 16-byte header (magic b'KLPD', u32 version, u64 record
+count) followed by 16-byte little-endian records sorted by hash:
+u64 hash, u32 best move, u16 moves to win, u16 flags.
+
+Usage (from the repository root):
+    python -m Solver.position_db build positions.kpdb --seed 0 --deals 1000
+    python -m Solver.position_db info positions.kpdb
+    python -m Solver.position_db lookup positions.kpdb --seed 42
+"""
+
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from Solver.game_state import TABLEAU_COLUMNS, UNKNOWN, GameState
+
+MAGIC = b'KLPD'
+VERSION = 1
+HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('count', '<u8')])
+RECORD_DTYPE = np.dtype([('hash', '<u8'), ('move', '<u4'), ('distance', '<u2'), ('flags', '<u2')])
+
+FLAG_SOLVED = 1  # move leads to a win in distance moves
+FLAG_UNSOLVABLE = 2  # No win exists from this position
+FLAG_VISIBLE = 4  # Keyed by visible_key() rather than the full hash
+
+NO_DISTANCE = 0xFFFF
+
+
+def visible_key(state: GameState) -> int:
+    """
+    Hash of only what the camera can see: face-up tableau cards, face-down
+    counts, foundations and the waste top
+
+    Boards built by GameState.from_cards and fully known boards of the
+    same position share this key. Different positions can share it too
+    (the stock is invisible), so moves found through it must be checked.
+    """
+    view = state.copy()
+    for column in range(TABLEAU_COLUMNS):
+        hidden = view.face_down[column]
+        if hidden:
+            cards = view.column(column)
+            view.set_column(column, [UNKNOWN] * hidden + cards[hidden:], hidden)
+    view.set_stock([])
+    view.set_waste([view.waste_top()] if view.waste_len else [])
+    return view.hash
+
+
+@dataclass
+class PositionEntry:
+    """What the database knows about a position"""
+    move: int  # Best move (0 if unsolvable)
+    distance: int  # Moves to win
+    flags: int
+
+    @property
+    def solved(self) -> bool:
+        return bool(self.flags & FLAG_SOLVED)
+
+    @property
+    def unsolvable(self) -> bool:
+        return bool(self.flags & FLAG_UNSOLVABLE)
+
+
+def line_records(root: GameState, moves: Sequence[int], solved: bool) -> np.ndarray:
+    """
+    Records for every position along a solver line
+
+    Args:
+        root: Position the line starts from (fully known)
+        moves: Winning line, or ignored if not solved
+        solved: False to record root as unsolvable
+
+    Returns:
+        Record array (unsorted), full-hash and visible-key records
+    """
+    if not solved:
+        records = np.zeros(1, dtype=RECORD_DTYPE)
+        records[0] = (root.hash, 0, NO_DISTANCE, FLAG_UNSOLVABLE)
+        return records
+
+    records = np.zeros(2 * len(moves), dtype=RECORD_DTYPE)
+    state = root.copy()
+    for i, move in enumerate(moves):
+        distance = len(moves) - i
+        records[2 * i] = (state.hash, move, distance, FLAG_SOLVED)
+        records[2 * i + 1] = (visible_key(state), move, distance, FLAG_SOLVED | FLAG_VISIBLE)
+        state.make_move(move)
+    return records
+
+
+def write_db(path: str, records: np.ndarray):
+    """
+    Write records as a database file (sorted, one record per hash)
+
+    Duplicate hashes keep the record with the shortest distance. The file
+    is written next to path and renamed, so readers never see a partial
+    file.
+    """
+    order = np.lexsort((records['distance'], records['hash']))
+    records = records[order]
+    if len(records):
+        first = np.ones(len(records), dtype=bool)
+        first[1:] = records['hash'][1:] != records['hash'][:-1]
+        records = records[first]
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0] = (MAGIC, VERSION, len(records))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(records.tobytes())
+    os.replace(tmp_path, path)
+
+
+class PositionDB:
+    """Read-only, memory-mapped solved position lookup"""
+
+    def __init__(self, path: str):
+        """
+        Open a database file (an empty database if it doesn't exist)
+
+        Args:
+            path: Database file written by write_db
+        """
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) <= HEADER_DTYPE.itemsize:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+            if header['magic'] != MAGIC or header['version'] != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} position database")
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r',
+                                     offset=HEADER_DTYPE.itemsize, shape=(int(header['count']),))
+        self._hashes = self.records['hash']
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, key: int) -> Optional[PositionEntry]:
+        """Record stored under a hash, or None"""
+        i = int(np.searchsorted(self._hashes, np.uint64(key)))
+        if i == len(self._hashes) or int(self._hashes[i]) != key:
+            return None
+        record = self.records[i]
+        return PositionEntry(int(record['move']), int(record['distance']), int(record['flags']))
+
+    def probe(self, state: GameState) -> Optional[PositionEntry]:
+        """
+        Entry for a board: exact position first, then by what is visible
+
+        A visible-key match is only returned if its move is legal here.
+        """
+        entry = self.lookup(state.hash)
+        if entry is not None:
+            return entry
+        entry = self.lookup(visible_key(state))
+        if entry is not None and entry.move in state.legal_moves():
+            return entry
+        return None
+
+    def plan(self, state: GameState, max_moves: int = 500) -> Optional[List[int]]:
+        """
+        Stored line from a board, or None if the board is unknown
+
+        Follows best moves while positions are found. From a fully known
+        board this is the whole winning line; from a partly seen board it
+        stops where the next position can't be identified.
+
+        Returns:
+            Moves ([] if the position is stored as unsolvable)
+        """
+        entry = self.probe(state)
+        if entry is None:
+            return None
+        if entry.unsolvable:
+            return []
+
+        state = state.copy()
+        moves = []
+        while entry is not None and entry.solved and len(moves) < max_moves:
+            moves.append(entry.move)
+            state.make_move(entry.move)
+            if entry.distance <= 1:
+                break
+            entry = self.lookup(state.hash)
+        return moves
+
+    def close(self):
+        if isinstance(self.records, np.memmap):
+            self.records._mmap.close()
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._hashes = self.records['hash']
+
+
+def _solve_deal(task) -> np.ndarray:
+    """Solve one deal and return its records (worker process)"""
+    from Solver.solver import Solver
+
+    seed, draw_count, max_nodes, time_limit = task
+    root = GameState.deal(seed, draw_count)
+    result = Solver(max_nodes=max_nodes, time_limit=time_limit).solve(root)
+    if not result.solved and not result.exhausted:
+        return np.zeros(0, dtype=RECORD_DTYPE)  # Budget ran out, nothing proven
+    return line_records(root, result.moves, result.solved)
+
+
+def build(path: str, seeds: Sequence[int], draw_count: int = 1, max_nodes: int = 200_000,
+          time_limit: float = 10.0, workers: Optional[int] = None, merge: bool = True) -> dict:
+    """
+    Solve deals in parallel and add their lines to a database
+
+    Args:
+        path: Database file (created or extended)
+        seeds: GameState.deal seeds to solve
+        draw_count: Cards per draw
+        max_nodes, time_limit: Solver budget per deal
+        workers: Worker processes (default: CPU count)
+        merge: Keep the records already in the file
+
+    Returns:
+        Summary dict
+    """
+    chunks = []
+    if merge and os.path.exists(path):
+        db = PositionDB(path)
+        chunks.append(np.array(db.records))
+        db.close()
+
+    solved = unsolvable = 0
+    start = time.perf_counter()
+    tasks = [(seed, draw_count, max_nodes, time_limit) for seed in seeds]
+    with Pool(workers) as pool:
+        for records in pool.imap_unordered(_solve_deal, tasks):
+            chunks.append(records)
+            if len(records) == 1:
+                unsolvable += 1
+            elif len(records):
+                solved += 1
+    elapsed = time.perf_counter() - start
+
+    write_db(path, np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE))
+    db = PositionDB(path)
+    size = len(db)
+    db.close()
+    return {'deals': len(tasks), 'solved': solved, 'unsolvable': unsolvable,
+            'records': size, 'elapsed_s': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solved Klondike position database')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = sub.add_parser('build', help='Solve deals and store their lines')
+    build_parser.add_argument('db', help='Database file')
+    build_parser.add_argument('--seed', type=int, default=0, help='First deal seed')
+    build_parser.add_argument('--deals', type=int, default=100, help='Number of deals')
+    build_parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    build_parser.add_argument('--nodes', type=int, default=200_000, help='Node budget per deal')
+    build_parser.add_argument('--time', type=float, default=10.0, help='Seconds per deal')
+    build_parser.add_argument('-j', '--workers', type=int, default=None,
+                              help='Worker processes (default: CPU count)')
+    build_parser.add_argument('--fresh', action='store_true', help='Discard existing records')
+
+    info_parser = sub.add_parser('info', help='Show database statistics')
+    info_parser.add_argument('db', help='Database file')
+
+    lookup_parser = sub.add_parser('lookup', help='Look up a deal')
+    lookup_parser.add_argument('db', help='Database file')
+    lookup_parser.add_argument('--seed', type=int, default=0, help='Deal seed')
+    lookup_parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        seeds = range(args.seed, args.seed + args.deals)
+        print(f"💾 Building {args.db} from {args.deals} deals...")
+        summary = build(args.db, seeds, args.draw, args.nodes, args.time,
+                        args.workers, merge=not args.fresh)
+        print(f"✓ {summary['solved']} solved, {summary['unsolvable']} unsolvable, "
+              f"{summary['deals'] - summary['solved'] - summary['unsolvable']} over budget "
+              f"({summary['elapsed_s']:.1f}s)")
+        print(f"  {summary['records']} records, {os.path.getsize(args.db) / 1024:.0f} KB")
+
+    elif args.command == 'info':
+        db = PositionDB(args.db)
+        flags = db.records['flags']
+        print(f"📊 {args.db}: {len(db)} records, {os.path.getsize(args.db) / 1024:.0f} KB")
+        print(f"  Solved positions:     {int(np.count_nonzero(flags & FLAG_SOLVED))}")
+        print(f"  Unsolvable positions: {int(np.count_nonzero(flags & FLAG_UNSOLVABLE))}")
+        print(f"  Visible-key records:  {int(np.count_nonzero(flags & FLAG_VISIBLE))}")
+        db.close()
+
+    elif args.command == 'lookup':
+        from Solver.game_state import format_move
+
+        db = PositionDB(args.db)
+        state = GameState.deal(args.seed, args.draw)
+        start = time.perf_counter()
+        moves = db.plan(state)
+        elapsed = time.perf_counter() - start
+        if moves is None:
+            print(f"❌ Deal {args.seed} not in database")
+        elif not moves:
+            print(f"❌ Deal {args.seed} is unsolvable")
+        else:
+            print(f"✓ Deal {args.seed}: {len(moves)} moves in {elapsed * 1e6:.0f} µs")
+            print('   ' + ', '.join(format_move(move) for move in moves))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
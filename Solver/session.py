@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Solver Session
+Anytime re-planning across the moves of one game: the search tree and
+transposition table are carried from move to move, and each observed
+board is merged with what was already known about the game
+
+Usage (from the repository root, simulated camera):
+    python -m Solver.session --seed 0 --deadline 0.5
+"""
+
+import argparse
+import time
+from typing import Optional, Sequence
+
+from Solver.game_state import TABLEAU_COLUMNS, TABLEAU_DEPTH, UNKNOWN, GameState
+from Solver.solver import SearchTree, Solver, SolverResult
+
+
+def merge_observation(predicted: GameState, observed: GameState) -> GameState:
+    """
+    Combine the predicted board with a freshly observed one
+
+    The camera cannot see stock cards, covered waste cards or (of course)
+    face-down cards, but the session may know them from earlier in the
+    game. Where the two boards agree on the layout, unknown cards in either
+    are filled in from the other. Any real disagreement means the
+    prediction is wrong, and the observation is returned as is.
+
+    Args:
+        predicted: Board expected after the moves played
+        observed: Board built from the camera (GameState.from_cards)
+
+    Returns:
+        Merged board (a new GameState)
+    """
+    if (predicted.foundations != observed.foundations
+            or predicted.heights != observed.heights
+            or predicted.face_down != observed.face_down):
+        return observed.copy()
+
+    merged = predicted.copy()
+    for column in range(TABLEAU_COLUMNS):
+        base = column * TABLEAU_DEPTH
+        cards = []
+        for i in range(predicted.heights[column]):
+            known = predicted.tableau[base + i]
+            seen = observed.tableau[base + i]
+            if known == UNKNOWN:
+                cards.append(seen)
+            elif seen == UNKNOWN or seen == known:
+                cards.append(known)
+            else:
+                return observed.copy()
+        merged.set_column(column, cards, predicted.face_down[column])
+
+    # Only the waste top is visible: keep the remembered stock and waste
+    # if the top agrees with them
+    known_top = predicted.waste_top()
+    seen_top = observed.waste_top()
+    if (predicted.waste_len > 0) != (observed.waste_len > 0) or \
+            (known_top != seen_top and UNKNOWN not in (known_top, seen_top)):
+        merged.set_waste(observed.waste[:observed.waste_len])
+        merged.set_stock(observed.stock[:observed.stock_len])
+    elif known_top == UNKNOWN and seen_top != UNKNOWN:
+        waste = bytearray(predicted.waste[:predicted.waste_len])
+        waste[-1] = seen_top
+        merged.set_waste(waste)
+    return merged
+
+
+class SolverSession:
+    """Keeps one best-first search alive for a whole game"""
+
+    def __init__(self, solver: Optional[Solver] = None, move_deadline: float = 0.5,
+                 foundation_slots=None):
+        """
+        Initialize session
+
+        Args:
+            solver: Search settings (max_nodes is the budget per plan() call)
+            move_deadline: Default seconds of search per plan() call
+            foundation_slots: Passed to GameState.tap_targets
+        """
+        self.solver = solver or Solver()
+        self.move_deadline = move_deadline
+        self.foundation_slots = foundation_slots
+        self.state = None
+        self.tree = None
+        self.ply = 0  # Moves played since start()
+        self.reused = 0  # Times the search tree was re-rooted and kept
+        self.restarts = 0  # Times a new tree was started mid-game
+
+    def start(self, state: GameState, deadline: Optional[float] = None) -> SolverResult:
+        """Begin a game from an observed board and plan for it"""
+        self.reset(state)
+        return self.plan(deadline)
+
+    def reset(self, state: GameState):
+        """Begin a game from an observed board without searching yet"""
+        self.state = state.copy()
+        self.ply = 0
+        self.tree = SearchTree(self.solver, self.state)
+
+    def plan(self, deadline: Optional[float] = None) -> SolverResult:
+        """
+        Search a while longer and return the best line so far
+
+        Can be called repeatedly (e.g. while the plotter is moving) to keep
+        improving the plan; a solved line is returned without searching.
+
+        Args:
+            deadline: Seconds to search (default move_deadline)
+
+        Returns:
+            SolverResult from the current board
+        """
+        start_time = time.perf_counter()
+        seconds = self.move_deadline if deadline is None else deadline
+        nodes = 0
+        if not self.tree.solved and not self.tree.exhausted:
+            nodes = self.tree.run(self.solver.max_nodes, start_time + seconds)
+        return self.tree.result(self.state, time.perf_counter() - start_time,
+                                self.foundation_slots, nodes)
+
+    def commit(self, moves: Sequence[int]):
+        """
+        Play moves from the front of the last plan without re-detecting
+
+        The tree is re-rooted at the predicted position, so plan() can keep
+        searching from there while the plotter carries the moves out.
+        """
+        if not moves:
+            return
+        predicted = self.state.copy()
+        for move in moves:
+            predicted.make_move(move)
+        self.ply += len(moves)
+        if self.tree.advance(moves):
+            self.reused += 1
+        else:
+            self.tree = SearchTree(self.solver, predicted, ply=self.ply)
+            self.restarts += 1
+        self.state = predicted
+
+    def observe(self, observed: GameState, played: Sequence[int] = (),
+                deadline: Optional[float] = None) -> SolverResult:
+        """
+        Update the session after moves were played and the board re-detected
+
+        If the board looks as predicted, the tree is re-rooted at the new
+        position and keeps its explored subtree. A newly revealed card
+        changes the hash of every position below it, so a new tree is
+        started from the merged board (the transposition table is kept).
+        Each observation counts once, as a reuse or a restart.
+
+        Args:
+            observed: Board detected after the moves
+            played: Moves played since the last observe() / commit(), from
+                    the front of the last plan
+
+        Returns:
+            Updated plan (see plan())
+        """
+        self.update(observed, played)
+        return self.plan(deadline)
+
+    def update(self, observed: GameState, played: Sequence[int] = ()) -> GameState:
+        """
+        observe() without the search, e.g. to try a position database first
+
+        Returns:
+            The merged board (also in self.state)
+        """
+        predicted = self.state.copy()
+        for move in played:
+            predicted.make_move(move)
+        merged = merge_observation(predicted, observed)
+        if merged.hash == predicted.hash:
+            self.commit(played)
+        else:
+            self.ply += len(played)
+            self.tree = SearchTree(self.solver, merged, ply=self.ply)
+            self.restarts += 1
+        self.state = merged
+        return merged
+
+    def __repr__(self):
+        return (f"SolverSession(reused={self.reused}, restarts={self.restarts}, "
+                f"table={len(self.solver.table)})")
+
+
+def camera_view(state: GameState) -> GameState:
+    """What the camera sees of a fully known board (for simulation)"""
+    view = state.copy()
+    for column in range(TABLEAU_COLUMNS):
+        cards = view.column(column)
+        hidden = view.face_down[column]
+        view.set_column(column, [UNKNOWN] * hidden + cards[hidden:], hidden)
+    view.set_stock([UNKNOWN] * view.stock_len)
+    if view.waste_len:
+        top = view.waste_top()
+        view.set_waste([UNKNOWN] * (view.waste_len - 1) + [top])
+    return view
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a simulated game with re-planning')
+    parser.add_argument('--seed', type=int, default=0, help='Deal seed')
+    parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    parser.add_argument('--deadline', type=float, default=0.5, help='Seconds of search per move')
+    parser.add_argument('--nodes', type=int, default=50_000, help='Node budget per move')
+    parser.add_argument('--max-moves', type=int, default=400, help='Give up after this many moves')
+    args = parser.parse_args()
+
+    board = GameState.deal(args.seed, args.draw)
+    session = SolverSession(Solver(max_nodes=args.nodes), move_deadline=args.deadline)
+    result = session.start(camera_view(board))
+
+    moves = 0
+    plan_time = 0.0
+    while not board.is_won() and result.moves and moves < args.max_moves:
+        move = result.moves[0]
+        board.make_move(move)
+        moves += 1
+        result = session.observe(camera_view(board), [move])
+        plan_time += result.elapsed
+
+    mark = '✓' if board.is_won() else '⚠'
+    print(f"{mark} Deal {args.seed}: {'won' if board.is_won() else 'not won'} in {moves} moves")
+    if not board.is_won() and not result.moves:
+        print("  Searched out: no win or unknown card reachable" if result.exhausted
+              else "  Stopped with an empty plan")
+    print(f"  {session}")
+    if moves:
+        print(f"  Mean planning time per move: {plan_time / moves * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
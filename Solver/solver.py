@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+Klondike Solver
+Weighted best-first search over GameState with a bounded transposition
+table, automatic safe foundation moves and a node / time budget
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from Solver.game_state import (FOUNDATION, STOCK, TABLEAU_COLUMNS, TABLEAU_DEPTH,
+                               UNKNOWN, WASTE, GameState, format_move)
+
+
+class TranspositionTable:
+    """Bounded LRU table of position hash -> shallowest depth reached"""
+
+    def __init__(self, max_size: int = 1_000_000):
+        """
+        Args:
+            max_size: Maximum number of positions remembered
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def check(self, key: int, depth: int) -> bool:
+        """
+        Record a visit at depth
+
+        Returns:
+            True if the position is new or now reached in fewer moves
+        """
+        best = self._entries.get(key)
+        if best is not None:
+            self._entries.move_to_end(key)
+            if best <= depth:
+                self.hits += 1
+                return False
+        else:
+            self.misses += 1
+        self._entries[key] = depth
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        """Drop all entries (statistics are kept)"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: int):
+        return key in self._entries
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return (f"TranspositionTable({len(self._entries)}/{self.max_size}, "
+                f"hits={self.hits}, evictions={self.evictions})")
+
+
+@dataclass
+class SolverResult:
+    """Outcome of a search"""
+    moves: List[int]  # Encoded moves, in play order
+    solved: bool  # True if the moves win the game
+    nodes: int  # Positions expanded
+    elapsed: float  # Seconds
+    exhausted: bool = False  # Whole reachable space searched
+    heuristic: int = 0  # heuristic() of the position the moves lead to
+    workers: int = 1  # Processes that searched
+    taps: List[List[Tuple[str, int, int]]] = field(default_factory=list)  # Screen targets per move
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def describe(self) -> List[str]:
+        return [format_move(move) for move in self.moves]
+
+    def __repr__(self):
+        status = 'solved' if self.solved else ('unsolvable' if self.exhausted and not self.moves
+                                               else 'partial')
+        return (f"SolverResult({status}, {len(self.moves)} moves, {self.nodes} nodes, "
+                f"{self.elapsed:.2f}s, {self.nodes_per_sec:,.0f} nodes/s)")
+
+
+# Score credit for a line that ends by exposing an unknown card
+REVEAL_BONUS = 2
+
+
+def heuristic(state: GameState) -> int:
+    """
+    Estimated remaining effort (lower is better)
+
+    Cards still to reach the foundations, with extra weight on face-down
+    cards (each needs the cards above it moved first) and on stock cards.
+    """
+    return (2 * (52 - sum(state.foundations)) + 3 * sum(state.face_down)
+            + (state.stock_len + state.waste_len) // 2)
+
+
+def safe_foundation_move(state: GameState) -> int:
+    """
+    A foundation move that can never hurt, or 0
+
+    A card is safe to play up when no card could still need it as a
+    tableau target: aces and twos always, otherwise when both foundations
+    of the opposite color already hold rank - 1.
+    """
+    foundations = state.foundations
+    tableau = state.tableau
+    heights = state.heights
+    for src in range(TABLEAU_COLUMNS + 1):
+        if src == TABLEAU_COLUMNS:
+            if not state.waste_len:
+                break
+            card = state.waste[state.waste_len - 1]
+            src = WASTE
+        else:
+            h = heights[src]
+            if not h:
+                continue
+            card = tableau[src * TABLEAU_DEPTH + h - 1]
+        if card == UNKNOWN:
+            continue
+        rank = card & 15
+        suit = card >> 4
+        if foundations[suit] + 1 != rank:
+            continue
+        opposite = 0 if suit >= 2 else 2
+        if rank <= 2 or min(foundations[opposite], foundations[opposite + 1]) >= rank - 1:
+            return src | (FOUNDATION + suit) << 4 | 256
+    return 0
+
+
+def reveals_unknown(state: GameState, move: int) -> bool:
+    """True if a move just made exposed an unknown card (flip, draw or uncovered waste)"""
+    src = move & 15
+    if src < TABLEAU_COLUMNS:
+        h = state.heights[src]
+        return h > 0 and state.tableau[src * TABLEAU_DEPTH + h - 1] == UNKNOWN
+    if src == WASTE or src == STOCK:
+        return state.waste_len > 0 and state.waste[state.waste_len - 1] == UNKNOWN
+    return False
+
+
+class Solver:
+    """Weighted best-first (A*) Klondike solver"""
+
+    def __init__(self, max_nodes: int = 200_000, time_limit: float = 10.0,
+                 weight: float = 2.0, table_size: int = 1_000_000,
+                 auto_foundation: bool = True, first_solution: bool = True):
+        """
+        Initialize solver
+
+        Args:
+            max_nodes: Positions to expand before giving up
+            time_limit: Seconds before giving up
+            weight: Heuristic weight (1 = A*, larger is greedier and faster)
+            table_size: Transposition table capacity
+            auto_foundation: Play safe foundation moves without branching
+            first_solution: Stop at the first win; otherwise keep looking
+                            for shorter ones until the budget runs out
+        """
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.weight = weight
+        self.table = TranspositionTable(table_size)
+        self.auto_foundation = auto_foundation
+        self.first_solution = first_solution
+
+    def _apply(self, state: GameState, move: int, stack: list) -> bool:
+        """
+        Make a move plus any safe follow-up foundation moves
+
+        Made moves are pushed onto stack as (move, undo) for _revert.
+
+        Returns:
+            True if an unknown card was exposed (search stops there)
+        """
+        stack.append((move, state.make_move(move)))
+        if reveals_unknown(state, move):
+            return True
+        if self.auto_foundation:
+            follow = safe_foundation_move(state)
+            while follow:
+                stack.append((follow, state.make_move(follow)))
+                if reveals_unknown(state, follow):
+                    return True
+                follow = safe_foundation_move(state)
+        return False
+
+    @staticmethod
+    def _revert(state: GameState, stack: list):
+        while stack:
+            move, undo = stack.pop()
+            state.unmake_move(move, undo)
+
+    def prepare_root(self, root: GameState) -> Tuple[GameState, List[int]]:
+        """
+        Root position searched from: a copy of root with safe foundation
+        moves already played
+
+        Returns:
+            (state, moves played)
+        """
+        state = root.copy()
+        moves = []
+        if self.auto_foundation and not root.exposes_unknown():
+            self._apply_auto(state, moves)
+        return state, moves
+
+    def solve(self, root: GameState, foundation_slots=None,
+              root_moves: Optional[Sequence[int]] = None,
+              stop_event=None, bound=None) -> SolverResult:
+        """
+        Search for a winning line
+
+        Positions where an unknown card (face-down, stock or waste) gets
+        exposed are leaves: the line can't be planned past them until the
+        card is seen. If no win is found, the moves to the most promising
+        leaf (or expanded position) are returned with solved=False.
+
+        Args:
+            root: Position to solve (not modified)
+            foundation_slots: Passed to GameState.tap_targets
+            root_moves: Only search these first moves (legal moves of
+                        prepare_root(root)); default all
+            stop_event: Event-like object; the search stops once it is set
+            bound: Shared best solution length (multiprocessing.Value);
+                   longer lines are pruned and shorter wins update it
+
+        Returns:
+            SolverResult
+        """
+        start_time = time.perf_counter()
+        tree = SearchTree(self, root, root_moves)
+        tree.run(self.max_nodes, start_time + self.time_limit, stop_event, bound)
+        return tree.result(root, time.perf_counter() - start_time, foundation_slots)
+
+    def _apply_auto(self, state: GameState, moves: List[int]):
+        """Play safe foundation moves on state in place"""
+        follow = safe_foundation_move(state)
+        while follow:
+            state.make_move(follow)
+            moves.append(follow)
+            if reveals_unknown(state, follow):
+                return
+            follow = safe_foundation_move(state)
+
+
+class SearchTree:
+    """
+    Frontier and best lines of one best-first search
+
+    The search can be resumed with more budget (run) and moved down the
+    tree after moves are played (advance), keeping the explored subtree.
+    """
+
+    def __init__(self, solver: Solver, root: GameState,
+                 root_moves: Optional[Sequence[int]] = None, ply: Optional[int] = None):
+        """
+        Args:
+            solver: Settings and transposition table to search with
+            root: Position to search from (not modified)
+            root_moves: Only search these first moves; default all
+            ply: Moves already played in the game before root. Given, the
+                 transposition table is kept: entries are stored by game
+                 ply, so positions reached earlier in the game are not
+                 searched again. None starts from an empty table
+        """
+        self.solver = solver
+        self.base, self.prefix = solver.prepare_root(root)
+        self.root_moves = root_moves
+        if ply is None:
+            solver.table.clear()
+        # Carried-over entries can hide positions whose subtrees were
+        # dropped with an earlier tree, so they can't prove exhaustion
+        self.inherited = len(solver.table) > 0
+        self.ply = (ply or 0) + len(self.prefix)  # Game ply of base
+        solver.table.check(self.base.hash, self.ply)
+
+        # Frontier entries: (priority, tiebreak, depth, hash, parent state, node)
+        # A node is a linked path (moves, parent node) back to the root
+        # (None). Children are materialized from their parent state only
+        # when popped, so memory grows with expanded positions rather than
+        # generated ones.
+        self.frontier = [(0.0, 0, 0, self.base.hash, self.base, None)]
+        self.counter = 1
+        self.nodes = 0
+        # (score, depth, node) of the best place to stop without a win;
+        # staying put scores the root heuristic
+        self.best = (heuristic(self.base), 0, None)
+        # (score, depth, node) of the best line exposing an unknown card
+        self.reveal = None
+        # Step played when no line beats staying put (see _fallback)
+        self.fallback = None
+        self.solved_path = None
+        self.limit = float('inf')  # Length of the shortest win found
+        self.exhausted = False
+
+    @property
+    def solved(self) -> bool:
+        return self.solved_path is not None
+
+    def line(self) -> List[int]:
+        """Moves of the best line found so far"""
+        return self.prefix + _unwind(self._line_node())
+
+    def _line_node(self):
+        if self.solved_path is not None:
+            return self.solved_path
+        return self.best[2] if self.best[2] is not None else self.fallback
+
+    def run(self, max_nodes: int, deadline: float, stop_event=None, bound=None) -> int:
+        """
+        Expand positions until a win, the budget or the deadline
+
+        Args:
+            max_nodes: Positions to expand in this call
+            deadline: time.perf_counter() value to stop at
+            stop_event: Event-like object; the search stops once it is set
+            bound: Shared best solution length (see Solver.solve)
+
+        Returns:
+            Positions expanded
+        """
+        solver = self.solver
+        weight = solver.weight
+        check = solver.table.check
+        apply = solver._apply
+        revert = solver._revert
+        frontier = self.frontier
+        root_moves = self.root_moves
+        offset = len(self.prefix)
+        best = self.best
+        reveal = self.reveal
+        solved_path = self.solved_path
+        limit = self.limit
+        if bound is not None:
+            limit = min(limit, bound.value - offset)
+        counter = self.counter
+        ply = self.ply
+        stack = []
+        nodes = 0
+
+        while nodes < max_nodes:
+            if not frontier:
+                if self.inherited:
+                    # Search again without the entries of earlier trees
+                    # before calling the position exhausted
+                    self.inherited = False
+                    solver.table.clear()
+                    check(self.base.hash, ply)
+                    frontier.append((0.0, counter, 0, self.base.hash, self.base, None))
+                    counter += 1
+                    continue
+                # Lines exposing an unknown card are not searched out yet
+                self.exhausted = reveal is None
+                break
+            if nodes and not nodes & 255:
+                if time.perf_counter() > deadline or (stop_event is not None and stop_event.is_set()):
+                    break
+                if bound is not None:
+                    limit = min(limit, bound.value - offset)
+
+            _, _, depth, _, parent, path = heapq.heappop(frontier)
+            nodes += 1
+            if path is not None:
+                state = parent.copy()
+                for move in path[0]:
+                    state.make_move(move)
+                legal = state.legal_moves()
+            else:
+                state = parent
+                legal = state.legal_moves()
+                if root_moves is not None:
+                    legal = [move for move in legal if move in root_moves]
+            if depth + 1 >= limit:
+                continue
+
+            for move in legal:
+                revealed = apply(state, move, stack)
+                key = state.hash
+                child_depth = depth + len(stack)
+                if state.is_won():
+                    if child_depth < limit:
+                        limit = child_depth
+                        solved_path = (tuple(m for m, _ in stack), path)
+                    revert(state, stack)
+                    break
+                h = heuristic(state)
+                if revealed:
+                    # Seeing a new card is worth a little progress
+                    score = (h - REVEAL_BONUS, child_depth)
+                    if reveal is None or score < reveal[:2]:
+                        reveal = score + ((tuple(m for m, _ in stack), path),)
+                        if score < best[:2]:
+                            best = reveal
+                elif check(key, ply + child_depth):
+                    node = (tuple(m for m, _ in stack), path)
+                    heapq.heappush(frontier, (child_depth + weight * h, counter, child_depth, key,
+                                              state, node))
+                    counter += 1
+                    if (h, child_depth) < best[:2]:
+                        best = (h, child_depth, node)
+                revert(state, stack)
+            if solved_path is not None and solver.first_solution:
+                break
+
+        if solved_path is not None and bound is not None:
+            with bound.get_lock():
+                if offset + limit < bound.value:
+                    bound.value = offset + limit
+
+        self.best = best
+        self.reveal = reveal
+        self.solved_path = solved_path
+        if solved_path is None and best[2] is None and not self.exhausted:
+            self.fallback = self._fallback()
+        else:
+            self.fallback = None
+        self.limit = limit
+        self.counter = counter
+        self.nodes += nodes
+        return nodes
+
+    def _fallback(self):
+        """
+        Line to play when no position searched so far beats staying put
+
+        Stopping there would end the game early although the tree isn't
+        searched out (e.g. on a plateau where only stock cycling leads
+        anywhere). The best line exposing an unknown card is taken if
+        there is one, else the first step toward the most promising
+        frontier position, else a stock draw or recycle.
+        """
+        if self.reveal is not None:
+            return self.reveal[2]
+        if self.frontier:
+            node = self.frontier[0][5]
+            if node is not None:
+                while node[1] is not None:
+                    node = node[1]
+                return node
+        for move in self.base.legal_moves():
+            if STOCK in (move & 15, move >> 4 & 15) and \
+                    (self.root_moves is None or move in self.root_moves):
+                return (move,), None
+        return None
+
+    def advance(self, moves: Sequence[int]) -> bool:
+        """
+        Re-root the tree after playing the first moves of line()
+
+        Frontier positions below the new root are kept (with their depths
+        and paths rebased); the rest are dropped. Transposition entries are
+        stored by game ply and stay valid.
+
+        Args:
+            moves: Moves played, a prefix of line()
+
+        Returns:
+            False if nothing below the new root is left to search (start
+            a new tree instead)
+        """
+        moves = list(moves)
+        offset = len(self.prefix)
+        if len(moves) < offset or moves != self.line()[:len(moves)]:
+            return False
+        played = len(moves) - offset
+        if not played:
+            self.prefix = []
+            return True
+
+        # Find the node the played moves end at
+        chain = []
+        node = self._line_node()
+        while node is not None:
+            chain.append(node)
+            node = node[1]
+        new_root = None
+        length = 0
+        for node in reversed(chain):
+            length += len(node[0])
+            new_root = node
+            if length >= played:
+                break
+        if length != played:
+            return False  # Played moves end inside an automatic move sequence
+
+        memo = {}
+        kept = []
+        for priority, tiebreak, depth, key, parent, node in self.frontier:
+            rebased = _rebase(node, new_root, memo)
+            if rebased is False:
+                continue
+            if rebased is None:
+                # The new root itself was still waiting in the frontier
+                parent = parent.copy()
+                for move in node[0]:
+                    parent.make_move(move)
+            kept.append((priority - played, tiebreak, depth - played, key, parent, rebased))
+        if not kept:
+            return False
+        heapq.heapify(kept)
+        self.frontier = kept
+
+        self.ply += played
+        state = self.base.copy()
+        for move in moves[offset:]:
+            state.make_move(move)
+        self.base = state
+        self.prefix = []
+        self.root_moves = None
+        if self.solved_path is not None:
+            self.solved_path = _rebase(self.solved_path, new_root, memo)
+        best = _rebase(self.best[2], new_root, memo)
+        if best is False or best is None:
+            self.best = (heuristic(state), 0, None)
+        else:
+            self.best = (self.best[0], self.best[1] - played, best)
+        reveal = self.reveal and _rebase(self.reveal[2], new_root, memo)
+        if reveal:
+            self.reveal = (self.reveal[0], self.reveal[1] - played, reveal)
+        else:
+            self.reveal = None
+        self.fallback = None
+        self.limit -= played
+        return True
+
+    def result(self, root: GameState, elapsed: float, foundation_slots=None,
+               nodes: Optional[int] = None) -> SolverResult:
+        """SolverResult for the best line, with tap targets played from root"""
+        line = self.line()
+        return SolverResult(moves=line, solved=self.solved,
+                            nodes=self.nodes if nodes is None else nodes,
+                            elapsed=elapsed, exhausted=self.exhausted and not self.solved,
+                            heuristic=0 if self.solved else self.best[0],
+                            taps=tap_sequence(root, line, foundation_slots))
+
+
+def _rebase(path, new_root, memo: dict):
+    """
+    Path relative to new_root (None if it is new_root), or False if it
+    does not pass through new_root
+
+    memo maps id(node) to its rebased path, so shared ancestors are only
+    walked once.
+    """
+    chain = []
+    node = path
+    while node is not None and node is not new_root and id(node) not in memo:
+        chain.append(node)
+        node = node[1]
+    if node is new_root:
+        rebased = None
+    elif node is None:
+        rebased = False
+    else:
+        rebased = memo[id(node)]
+    for node in reversed(chain):
+        rebased = False if rebased is False else (node[0], rebased)
+        memo[id(node)] = rebased
+    return rebased
+
+
+def _unwind(path) -> List[int]:
+    """Flatten a (moves, previous) linked path into a move list"""
+    chunks = []
+    while path is not None:
+        moves, path = path
+        chunks.append(moves)
+    return [move for moves in reversed(chunks) for move in moves]
+
+
+def tap_sequence(root: GameState, moves: List[int],
+                 foundation_slots=None) -> List[List[Tuple[str, int, int]]]:
+    """Screen tap targets for each move of a line played from root"""
+    state = root.copy()
+    taps = []
+    for move in moves:
+        taps.append(state.tap_targets(move, foundation_slots))
+        state.make_move(move)
+    return taps
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Solve random Klondike deals')
+    parser.add_argument('--seed', type=int, default=0, help='First deal seed')
+    parser.add_argument('--deals', type=int, default=1, help='Number of deals')
+    parser.add_argument('--draw', type=int, default=1, choices=[1, 3], help='Cards per draw')
+    parser.add_argument('--nodes', type=int, default=200_000, help='Node budget per deal')
+    parser.add_argument('--time', type=float, default=10.0, help='Seconds per deal')
+    parser.add_argument('--weight', type=float, default=2.0, help='Heuristic weight')
+    parser.add_argument('--show', action='store_true', help='Print the winning moves')
+    args = parser.parse_args()
+
+    solved = 0
+    total_nodes = 0
+    total_time = 0.0
+    for seed in range(args.seed, args.seed + args.deals):
+        solver = Solver(max_nodes=args.nodes, time_limit=args.time, weight=args.weight)
+        result = solver.solve(GameState.deal(seed, args.draw))
+        solved += result.solved
+        total_nodes += result.nodes
+        total_time += result.elapsed
+        mark = '✓' if result.solved else ('❌' if result.exhausted else '⚠')
+        print(f"{mark} Deal {seed}: {result}")
+        if args.show and result.solved:
+            print('   ' + ', '.join(result.describe()))
+
+    print(f"\n🤖 Solved {solved}/{args.deals} deals, "
+          f"{total_nodes / total_time if total_time else 0:,.0f} nodes/s overall")
+
+
+if __name__ == "__main__":
+    main()